@@ -0,0 +1,110 @@
+import os, json, hashlib, shutil
+from typing import List, Dict, Any, Tuple, Optional
+import numpy as np
+
+from .loader import _atomic_write, _load
+from .event_cache import _source_signature
+from .xt_model import XTModel
+from .store import SequenceStore
+
+ARTIFACT_VERSION = 3
+ARTIFACT_DIR = "artifacts"
+
+
+def data_fingerprint(local_dir: str, matches: List[Dict[str, Any]], validate: str = "mtime") -> str:
+    '''
+    Hash of the input data: the ordered match ids and each raw event file's signature (size + mtime, or
+    content hash with validate="hash", as for the event cache). Any added, removed, reordered or
+    changed match gives a new fingerprint.
+    '''
+    h = hashlib.sha1()
+    for m in matches:
+        src = os.path.join(local_dir, "events", f"{m['match_id']}.json")
+        h.update(json.dumps([m["match_id"], _source_signature(src, validate)], sort_keys=True).encode("utf-8"))
+    return h.hexdigest()
+
+
+def stage_key(*parts) -> str:
+    '''Content address of a stage: hash of everything it depends on (upstream keys, parameters).'''
+    return hashlib.sha1(json.dumps([ARTIFACT_VERSION, *parts], sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class ArtifactCache:
+    '''
+    Stage outputs under root/<stage>/<key>/, each directory holding the arrays (.npz) and meta.json.
+    meta.json is written last, so a directory without it is an interrupted write and is ignored.
+      xt:        fitted V plus fit statistics (not the counts)
+      sequences: a SequenceStore
+      patterns:  mined (pattern, support) pairs
+    '''
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _dir(self, stage: str, key: str) -> str:
+        return os.path.join(self.root, stage, key)
+
+    def _meta(self, stage: str, key: str) -> Optional[Dict[str, Any]]:
+        path = os.path.join(self._dir(stage, key), "meta.json")
+        if not os.path.exists(path):
+            return None
+        try:
+            return _load(path)
+        except ValueError:
+            return None
+
+    def _save(self, stage: str, key: str, meta: Dict[str, Any], **arrays):
+        d = self._dir(stage, key)
+        if os.path.isdir(d):
+            shutil.rmtree(d)
+        os.makedirs(d)
+        if arrays:
+            np.savez(os.path.join(d, "arrays.npz"), **arrays)
+        _atomic_write(os.path.join(d, "meta.json"), json.dumps(meta).encode("utf-8"))
+
+    def _arrays(self, stage: str, key: str) -> Dict[str, np.ndarray]:
+        with np.load(os.path.join(self._dir(stage, key), "arrays.npz")) as z:
+            return {k: z[k] for k in z.files}
+
+    def load_xt(self, key: str) -> Optional[XTModel]:
+        '''A fitted XTModel with V and fit statistics restored (counts are not stored), or None.'''
+        meta = self._meta("xt", key)
+        if meta is None:
+            return None
+        a = self._arrays("xt", key)
+        xt = XTModel(nx=meta["nx"], ny=meta["ny"], gamma=meta["gamma"], solver=meta["solver"])
+        xt.V = a["V"]
+        xt.trace = a["trace"].tolist()
+        xt.n_iter, xt.delta, xt.converged = meta["n_iter"], meta["delta"], meta["converged"]
+        return xt
+
+    def save_xt(self, key: str, xt: XTModel):
+        meta = {"nx": xt.nx, "ny": xt.ny, "gamma": xt.gamma, "solver": xt.solver, "n_iter": xt.n_iter,
+                "delta": xt.delta, "converged": xt.converged}
+        self._save("xt", key, meta, V=np.asarray(xt.V), trace=np.asarray(xt.trace, dtype=np.float64))
+
+    def load_sequences(self, key: str) -> Optional[SequenceStore]:
+        meta = self._meta("sequences", key)
+        if meta is None:
+            return None
+        a = self._arrays("sequences", key)
+        return SequenceStore(meta["vocab"], a["items"], a["cells"], a["event_idx"], a["seq_match"], a["offsets"],
+                             tuple(meta["grid_shape"]), a["times"])
+
+    def save_sequences(self, key: str, store: SequenceStore):
+        self._save("sequences", key, {"vocab": store.vocab, "grid_shape": [store.nx, store.ny]},
+                   items=store.items, cells=store.cells, event_idx=store.event_idx, seq_match=store.seq_match,
+                   offsets=store.offsets, times=store.times)
+
+    def load_patterns(self, key: str) -> Optional[List[Tuple[List[str], int]]]:
+        meta = self._meta("patterns", key)
+        if meta is None:
+            return None
+        return [(list(p), int(s)) for p, s in meta["patterns"]]
+
+    def save_patterns(self, key: str, patterns: List[Tuple[List[str], int]], stats: Dict[str, int] = None):
+        self._save("patterns", key, {"patterns": patterns, "stats": stats or {}})
+
+    def pattern_stats(self, key: str) -> Dict[str, int]:
+        meta = self._meta("patterns", key)
+        return (meta or {}).get("stats", {})
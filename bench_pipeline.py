@@ -0,0 +1,153 @@
+import argparse, json, os, platform, subprocess, time, tracemalloc
+from typing import Dict, Any, Callable
+import numpy as np
+
+from .loader import ensure_matches, iter_events
+from .synthetic import write_synthetic_dataset, WORLD_CUP_MATCHES
+from .main import xt_columns_from_events
+from .xt_model import XTModel
+from .sequences import build_possession_sequences
+from .store import SequenceStore
+from .prefixspan import prefixspan
+from .scoring import score_patterns
+
+STAGES = ("load", "build_xt", "fit", "build_sequences", "prefixspan", "score_patterns")
+
+
+class _Stage:
+    '''
+    Accumulates the wall time of one stage or, with memory=True, its tracemalloc peak above the allocation
+    at stage start. Timings and peaks come from separate runs so tracing overhead stays out of the timings.
+    '''
+
+    def __init__(self, memory: bool):
+        self.memory = memory
+        self.seconds = 0.0
+        self.peak = 0
+
+    def run(self, fn: Callable[[], Any]):
+        if not self.memory:
+            t0 = time.perf_counter()
+            out = fn()
+            self.seconds += time.perf_counter() - t0
+            return out
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        out = fn()
+        self.peak = max(self.peak, tracemalloc.get_traced_memory()[1] - base)
+        tracemalloc.stop()
+        return out
+
+    def result(self) -> Dict[str, float]:
+        return {"peak_mb": self.peak / 1e6} if self.memory else {"seconds": self.seconds}
+
+
+def _git_commit() -> str:
+    try:
+        here = os.path.dirname(os.path.abspath(__file__))
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=here, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def dataset_dir(work_dir: str, n_matches: int, args) -> str:
+    return os.path.join(work_dir, f"m{n_matches}_p{args.possessions}_l{args.mean_len}_s{args.skew}_seed{args.seed}")
+
+
+def run_scale(data_dir: str, matches, args, memory: bool = False) -> Dict[str, Any]:
+    '''
+    Run every stage once over data_dir, timing it or (memory=True) tracing its peak allocation.
+    Loading, xT counting and tokenization go chunk_matches matches at a time, like the streaming pipeline.
+    '''
+    st = {name: _Stage(memory) for name in STAGES}
+    nx, ny = args.grid_x, args.grid_y
+    xt = XTModel(nx=nx, ny=ny, gamma=1.0, tol=1e-6, max_iter=500, solver=args.xt_solver)
+    seqs, grids, n_events = [], [], 0
+    for k in range(0, len(matches), args.chunk_matches):
+        chunk = matches[k:k + args.chunk_matches]
+        events = st["load"].run(lambda: list(iter_events(data_dir, chunk)))
+        n_events += len(events)
+        st["build_xt"].run(lambda: xt.add_batch(*xt_columns_from_events(events)))
+        s, g, _ = st["build_sequences"].run(lambda: build_possession_sequences(events, (nx, ny), keep_events=False))
+        seqs.extend(s)
+        grids.extend(g)
+        del events
+    V = st["fit"].run(lambda: xt.fit())
+    store = SequenceStore.from_lists(seqs, grids, (nx, ny))
+    del seqs, grids
+    patterns = st["prefixspan"].run(lambda: prefixspan(store, minsup_ratio=args.minsup, maxlen=args.maxlen,
+                                                       workers=args.workers))
+    scores = st["score_patterns"].run(lambda: score_patterns(store, None, patterns, xt_grid=np.array(V)))
+    return {"n_matches": len(matches), "n_events": n_events, "n_sequences": len(store), "n_steps": store.n_steps,
+            "n_patterns": len(patterns), "n_rules": len(scores), "xt_iterations": xt.n_iter,
+            "stages": {name: s.result() for name, s in st.items()}}
+
+
+def compare(new: Dict[str, Any], old: Dict[str, Any]):
+    '''Print new/old time ratios per scale and stage (values < 1 are speedups).'''
+    old_runs = {r["scale"]: r for r in old["runs"]}
+    for r in new["runs"]:
+        o = old_runs.get(r["scale"])
+        if o is None:
+            continue
+        parts = []
+        for name, s in r["stages"].items():
+            if name in o["stages"] and o["stages"][name]["seconds"] > 0:
+                parts.append(f"{name}={s['seconds'] / o['stages'][name]['seconds']:.2f}x")
+        print(f"scale={r['scale']} vs {old['meta'].get('commit', '')[:10]}: " + ", ".join(parts))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Time and memory-profile each pipeline stage on synthetic data")
+    ap.add_argument("--work_dir", default="bench_data", help="where synthetic datasets are generated and kept")
+    ap.add_argument("--scales", default="1,10,100", help=f"comma-separated multiples of {WORLD_CUP_MATCHES} matches")
+    ap.add_argument("--possessions", type=int, default=180, help="possessions per match")
+    ap.add_argument("--mean_len", type=float, default=5.0)
+    ap.add_argument("--skew", type=float, default=1.0)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--grid_x", type=int, default=12)
+    ap.add_argument("--grid_y", type=int, default=8)
+    ap.add_argument("--xt_solver", default="dense")
+    ap.add_argument("--minsup", type=float, default=0.005)
+    ap.add_argument("--maxlen", type=int, default=5)
+    ap.add_argument("--workers", type=int, default=1, help="processes for PrefixSpan")
+    ap.add_argument("--chunk_matches", type=int, default=64, help="matches loaded and processed at a time")
+    ap.add_argument("--memory", type=int, default=1,
+                    help="1=also measure per-stage tracemalloc peaks (in a second, untimed run)")
+    ap.add_argument("--out", default="bench_results.json")
+    ap.add_argument("--compare", default="", help="earlier results JSON to compare against")
+    args = ap.parse_args()
+
+    result = {"meta": {"commit": _git_commit(), "python": platform.python_version(), "numpy": np.__version__,
+                       "machine": platform.machine(), "cpus": os.cpu_count(), "params": vars(args)},
+              "runs": []}
+    for scale in [float(s) for s in args.scales.split(",")]:
+        n = max(1, int(round(scale * WORLD_CUP_MATCHES)))
+        d = dataset_dir(args.work_dir, n, args)
+        gen_s = 0.0
+        if not os.path.exists(os.path.join(d, "manifest.json")):
+            t0 = time.perf_counter()
+            write_synthetic_dataset(d, n, seed=args.seed, n_possessions=args.possessions, mean_len=args.mean_len,
+                                    skew=args.skew)
+            gen_s = time.perf_counter() - t0
+        matches = ensure_matches(d, [(43, 3)])
+        run = {"scale": scale, "generate_s": gen_s}
+        run.update(run_scale(d, matches, args))
+        if args.memory:
+            peaks = run_scale(d, matches, args, memory=True)["stages"]
+            for name, r in peaks.items():
+                run["stages"][name].update(r)
+        result["runs"].append(run)
+        print(f"scale={scale}: {run['n_events']} events, {run['n_sequences']} sequences, {run['n_patterns']} patterns; "
+              + ", ".join(f"{k}={v['seconds']:.2f}s" + (f"/{v['peak_mb']:.0f}MB" if "peak_mb" in v else "")
+                          for k, v in run["stages"].items()))
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(result, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
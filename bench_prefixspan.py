@@ -0,0 +1,63 @@
+import argparse, json, time
+import numpy as np
+
+from .prefixspan import prefixspan
+
+TOKENS = ["PSF", "PSL", "PSB", "PMF", "PML", "PMB", "PLF", "PLL", "PLB", "PLLW", "PMFT", "PMFX",
+          "KSF", "KSL", "KSB", "KMF", "KML", "KLF", "KSD", "PSF_B", "PMFX_B", "KSF_B", "KMF_B", "SHOT", "GOAL"]
+
+
+def synthetic_sequences(n: int, mean_len: float = 5.0, skew: float = 1.2, seed: int = 0):
+    '''n possession token sequences; lengths ~ 1 + Poisson(mean_len - 1), tokens Zipf-skewed over TOKENS.'''
+    rng = np.random.default_rng(seed)
+    weights = 1.0 / np.arange(1, len(TOKENS) + 1) ** skew
+    weights /= weights.sum()
+    lengths = 1 + rng.poisson(mean_len - 1, size=n)
+    flat = rng.choice(len(TOKENS), size=int(lengths.sum()), p=weights)
+    out, k = [], 0
+    for L in lengths:
+        out.append([TOKENS[t] for t in flat[k:k + L]])
+        k += L
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare PrefixSpan engines on synthetic possession corpora")
+    ap.add_argument("--sizes", default="10000,100000,1000000", help="comma-separated possession counts")
+    ap.add_argument("--minsup", type=float, default=0.005)
+    ap.add_argument("--maxlen", type=int, default=5)
+    ap.add_argument("--python_max", type=int, default=100000, help="skip the python engine above this size")
+    ap.add_argument("--workers", type=int, default=1, help="processes for the numpy engine")
+    ap.add_argument("--out", default="", help="optional JSON results path")
+    args = ap.parse_args()
+
+    rows = []
+    for n in [int(s) for s in args.sizes.split(",")]:
+        seqs = synthetic_sequences(n)
+        row = {"n_sequences": n, "n_tokens": sum(len(s) for s in seqs)}
+        ref = None
+        for engine in ("numpy", "python"):
+            if engine == "python" and n > args.python_max:
+                row["python_s"] = None
+                continue
+            t0 = time.perf_counter()
+            res = prefixspan(seqs, minsup_ratio=args.minsup, maxlen=args.maxlen, engine=engine,
+                             workers=args.workers if engine == "numpy" else 1)
+            row[f"{engine}_s"] = time.perf_counter() - t0
+            row["n_patterns"] = len(res)
+            if ref is None:
+                ref = res
+            elif res != ref:
+                raise AssertionError(f"engine outputs differ at n={n}")
+        if row.get("python_s"):
+            row["speedup"] = row["python_s"] / row["numpy_s"]
+        rows.append(row)
+        print(", ".join(f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}" for k, v in row.items()))
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
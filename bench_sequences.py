@@ -0,0 +1,50 @@
+import argparse, json, time
+
+from .loader import ensure_matches, parse_comp_seasons, iter_events, RAW_BASE
+from .event_cache import ensure_event_cache, iter_match_columns
+from .sequences import build_possession_sequences, build_possession_sequences_columns
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare dict-based and vectorized possession tokenization")
+    ap.add_argument("--data_dir", default="open_data_cache")
+    ap.add_argument("--competitions", default="43:3")
+    ap.add_argument("--base_url", default=RAW_BASE)
+    ap.add_argument("--grid_x", type=int, default=12)
+    ap.add_argument("--grid_y", type=int, default=8)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--out", default="", help="optional JSON results path")
+    args = ap.parse_args()
+
+    matches = ensure_matches(args.data_dir, parse_comp_seasons(args.competitions), base_url=args.base_url)
+    ensure_event_cache(args.data_dir, matches)
+    grid = (args.grid_x, args.grid_y)
+
+    # load both inputs once outside the timings so both paths are measured on tokenization alone
+    events = list(iter_events(args.data_dir, matches))
+    columns = list(iter_match_columns(args.data_dir, matches, mmap=False))
+    runs = {
+        "dict": lambda: build_possession_sequences(events, grid, keep_events=False),
+        "columns": lambda: build_possession_sequences_columns(columns, grid, keep_events=False),
+    }
+    result = {"n_matches": len(matches), "n_events": len(events)}
+    outputs = {}
+    for name, fn in runs.items():
+        best = float("inf")
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            outputs[name] = fn()
+            best = min(best, time.perf_counter() - t0)
+        result[f"{name}_s"] = best
+    if outputs["dict"][:2] != outputs["columns"][:2]:
+        raise AssertionError("tokenization paths differ")
+    result["n_sequences"] = len(outputs["dict"][0])
+    result["speedup"] = result["dict_s"] / result["columns_s"]
+    print(", ".join(f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}" for k, v in result.items()))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Tuple
+import numpy as np
+
+from .event_cache import load_match_columns
+from .xt_model import SOLVERS, XTModel, batch_counts
+from .pipeline import xt_columns_from_cache
+
+
+def match_counts(data_dir: str, match_id, grids: List[Tuple[int, int]]) -> List[Dict[str, np.ndarray]]:
+    '''xt_model.batch_counts of one match for every (nx, ny) in grids, from one read of its cached columns.'''
+    cols = xt_columns_from_cache(load_match_columns(data_dir, match_id))
+    return [batch_counts(*cols, nx, ny) for nx, ny in grids]
+
+
+def _match_counts(args):
+    return match_counts(*args)
+
+
+class CountTensors:
+    '''
+    Per-match xT counts of one grid, stacked over matches (M matches, N = nx * ny cells):
+      entries, shots, shot_xg  (M, N) dense, flattened like XTModel.V (gx * ny + gy)
+      trans                    (M, N * N) CSR, columns the flat transition index of batch_counts
+    Any weighting of matches (a bootstrap resample, a subset) aggregates to XTModel counts by weighted sums.
+    '''
+
+    def __init__(self, nx: int, ny: int, parts: List[Dict[str, np.ndarray]]):
+        from scipy import sparse
+        self.nx, self.ny, self.N = nx, ny, nx * ny
+        M = len(parts)
+        self.entries = np.stack([p["entries"].reshape(-1) for p in parts]) if M else np.zeros((0, self.N))
+        self.shots = np.zeros((M, self.N), dtype=np.float64)
+        self.shot_xg = np.zeros((M, self.N), dtype=np.float64)
+        rows, cols, vals = [], [], []
+        for m, p in enumerate(parts):
+            cell = p["shot_gx"] * ny + p["shot_gy"]
+            self.shots[m] = np.bincount(cell, minlength=self.N)
+            self.shot_xg[m] = np.bincount(cell, weights=p["shot_xg"], minlength=self.N)
+            rows.append(np.full(len(p["trans_flat"]), m, dtype=np.int64))
+            cols.append(p["trans_flat"])
+            vals.append(p["trans_count"].astype(np.float64))
+        if M:
+            rows, cols, vals = np.concatenate(rows), np.concatenate(cols), np.concatenate(vals)
+        self.trans = sparse.csr_matrix((vals, (rows, cols)), shape=(M, self.N * self.N))
+
+    def __len__(self) -> int:
+        return self.entries.shape[0]
+
+    def aggregate(self, W: np.ndarray):
+        '''
+        (entries, shots, shot_xg, trans) for weight rows W (B, M): (B, N) arrays and a (B, N * N) CSR, so memory
+        stays O(B * nnz) however fine the grid.
+        '''
+        from scipy import sparse
+        W = np.asarray(W, dtype=np.float64)
+        return W @ self.entries, W @ self.shots, W @ self.shot_xg, sparse.csr_matrix(W) @ self.trans
+
+    def model(self, w: np.ndarray, **kwargs) -> XTModel:
+        '''Unfitted XTModel (kwargs: gamma, tol, max_iter, solver) holding the counts of match weights w (M,).'''
+        entries, shots, shot_xg, trans = self.aggregate(np.asarray(w, dtype=np.float64)[None])
+        xt = XTModel(self.nx, self.ny, **kwargs)
+        xt.entries, xt.shots = entries.reshape(self.nx, self.ny), shots.reshape(self.nx, self.ny)
+        xt.shot_xg = shot_xg.reshape(self.nx, self.ny)
+        trans = trans.reshape((self.N, self.N)).tocsr()
+        xt.trans = trans if xt.sparse else trans.toarray()
+        return xt
+
+
+def bootstrap_weights(n_matches: int, n_boot: int, seed: int = 0) -> np.ndarray:
+    '''(n_boot, n_matches) multinomial counts: how often each match is drawn in each resample.'''
+    rng = np.random.default_rng(seed)
+    return rng.multinomial(n_matches, np.full(n_matches, 1.0 / n_matches), size=n_boot).astype(np.float64)
+
+
+def fit_batch(entries: np.ndarray, shots: np.ndarray, shot_xg: np.ndarray, trans, gamma: float = 1.0,
+              tol: float = 1e-6, max_iter: int = 500, solver: str = "sparse"):
+    '''
+    XTModel's fit for B models at once (arrays as returned by CountTensors.aggregate). The B row-normalised
+    transition matrices form one block-diagonal (B * N, B * N) CSR P, so V = r + gamma P V costs one sparse
+    mat-vec product per iteration for all models and memory is O(nnz). With value iteration ("dense" /
+    "sparse") each model stops updating once its own max |V_new - V| falls below tol, so every V equals what
+    XTModel.fit gives for its counts; "direct" solves (I - gamma P) V = r with one sparse LU (gamma < 1).
+    Returns (V (B, N), iterations (B,), converged (B,)).
+    '''
+    from scipy import sparse
+    from scipy.sparse.linalg import spsolve
+    if solver not in SOLVERS:
+        raise ValueError(f"Unknown xT solver: {solver}")
+    B, N = entries.shape
+    ent = np.where(entries == 0, 1.0, entries)
+    avg_xg = np.divide(shot_xg, shots, out=np.zeros_like(shot_xg), where=shots > 0)
+    reward = (shots / ent * avg_xg).reshape(-1)
+    t = sparse.csr_matrix(trans).tocoo()
+    rows, cols = t.row * N + t.col // N, t.row * N + t.col % N
+    row_sum = np.bincount(rows, weights=t.data, minlength=B * N)
+    row_sum[row_sum == 0] = 1.0
+    P = sparse.csr_matrix((t.data / row_sum[rows], (rows, cols)), shape=(B * N, B * N))
+
+    if solver == "direct":
+        if gamma >= 1.0:
+            raise ValueError("solver='direct' needs gamma < 1; use 'sparse' value iteration for gamma = 1")
+        V = spsolve((sparse.identity(B * N, format="csc") - gamma * P).tocsc(), reward)
+        return V.reshape(B, N), np.zeros(B, dtype=np.int64), np.ones(B, dtype=bool)
+
+    V = np.zeros(B * N, dtype=np.float64)
+    n_iter = np.zeros(B, dtype=np.int64)
+    converged = np.zeros(B, dtype=bool)
+    active = np.ones(B, dtype=bool)
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        V_new = reward + gamma * (P @ V)
+        delta = np.max(np.abs(V_new - V).reshape(B, N), axis=1)
+        upd = np.repeat(active, N)
+        V[upd] = V_new[upd]
+        n_iter[active] += 1
+        done = active & (delta < tol)
+        converged |= done
+        active &= ~done
+    return V.reshape(B, N), n_iter, converged
+
+
+class XTEnsemble:
+    '''
+    Bootstrap / grid-sensitivity ensemble of xT models. Per-match count tensors are accumulated once per
+    grid (collect); each resample's counts are then a weighted sum over matches, and all resamples of a
+    grid are fitted together by fit_batch, batch_size models at a time (P holds batch_size * nnz entries).
+
+      ens = XTEnsemble.collect(data_dir, matches, [(12, 8), (16, 12)])
+      res = ens.fit(n_boot=200)
+      res[(12, 8)]["mean"], res[(12, 8)]["lo"], res[(12, 8)]["hi"]
+
+    Resamples draw matches with replacement (bootstrap_weights); the point estimate (every match once)
+    is an XTModel fit with the given solver, so it equals the main xT grid up to float summation order.
+    '''
+
+    def __init__(self, tensors: Dict[Tuple[int, int], CountTensors], gamma: float = 1.0, tol: float = 1e-6,
+                 max_iter: int = 500, solver: str = "dense"):
+        if solver not in SOLVERS:
+            raise ValueError(f"Unknown xT solver: {solver}")
+        if solver == "direct" and gamma >= 1.0:
+            raise ValueError("solver='direct' needs gamma < 1; use 'sparse' value iteration for gamma = 1")
+        self.tensors = tensors
+        self.gamma, self.tol, self.max_iter, self.solver = gamma, tol, max_iter, solver
+
+    @classmethod
+    def collect(cls, data_dir: str, matches: List[Dict[str, Any]], grids: List[Tuple[int, int]],
+                workers: int = 1, **kwargs) -> "XTEnsemble":
+        grids = [tuple(g) for g in grids]
+        jobs = [(data_dir, m["match_id"], grids) for m in matches]
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                parts = list(pool.map(_match_counts, jobs, chunksize=max(1, len(jobs) // (8 * workers))))
+        else:
+            parts = [_match_counts(j) for j in jobs]
+        tensors = {g: CountTensors(g[0], g[1], [p[k] for p in parts]) for k, g in enumerate(grids)}
+        return cls(tensors, **kwargs)
+
+    @property
+    def n_matches(self) -> int:
+        return len(next(iter(self.tensors.values()))) if self.tensors else 0
+
+    def fit_weights(self, grid: Tuple[int, int], W: np.ndarray, batch_size: int = 64):
+        '''V (B, nx, ny), iterations and convergence flags of the models with match weights W (B, M).'''
+        t = self.tensors[tuple(grid)]
+        Vs, its, conv = [], [], []
+        for k in range(0, len(W), batch_size):
+            V, n_iter, converged = fit_batch(*t.aggregate(W[k:k + batch_size]), gamma=self.gamma, tol=self.tol,
+                                             max_iter=self.max_iter, solver=self.solver)
+            Vs.append(V)
+            its.append(n_iter)
+            conv.append(converged)
+        return (np.concatenate(Vs).reshape(len(W), t.nx, t.ny), np.concatenate(its), np.concatenate(conv))
+
+    def fit(self, n_boot: int = 200, ci: float = 0.95, seed: int = 0, batch_size: int = 64
+            ) -> Dict[Tuple[int, int], Dict[str, Any]]:
+        '''
+        Per grid: "point" (all matches), "samples" (n_boot, nx, ny), "mean", "std", "lo"/"hi" (percentile
+        interval of level ci), "iterations" and "converged" per resample. The same resamples are used for
+        every grid, so grids are compared on identical data.
+        '''
+        W = bootstrap_weights(self.n_matches, n_boot, seed)
+        q = 100.0 * (1.0 - ci) / 2.0
+        out = {}
+        for grid in self.tensors:
+            t = self.tensors[grid]
+            point = t.model(np.ones(self.n_matches), gamma=self.gamma, tol=self.tol, max_iter=self.max_iter,
+                            solver=self.solver).fit()
+            V, n_iter, converged = self.fit_weights(grid, W, batch_size)
+            out[grid] = {"point": point, "samples": V, "mean": V.mean(axis=0), "std": V.std(axis=0),
+                         "lo": np.percentile(V, q, axis=0), "hi": np.percentile(V, 100.0 - q, axis=0),
+                         "iterations": n_iter, "converged": converged, "ci": ci}
+        return out
+
+
+def pattern_dxt_intervals(index, cells: np.ndarray, patterns: List[Tuple[List[str], int]], samples: np.ndarray,
+                          ci: float = 0.95, point: np.ndarray = None):
+    '''
+    avg ΔxT of every rule scored by score_patterns, under each xT grid in samples (B, nx, ny), summarised as
+    mean and percentile interval. The matched steps are fixed (index / cells of the mined store, on the
+    same grid); only the xT values vary, so this is the rule's ΔxT uncertainty due to the xT model.
+    avg ΔxT is linear in the grid, so all samples cost one sparse-dense product (scoring.dxt_coefficients).
+    '''
+    import pandas as pd
+    from .scoring import dxt_coefficients
+    B = len(samples)
+    flat = samples.reshape(B, -1)
+    names, C = dxt_coefficients(index, cells, patterns, flat.shape[1])
+    D = np.asarray(C @ flat.T)  # (rules, B)
+    q = 100.0 * (1.0 - ci) / 2.0
+    df = pd.DataFrame({"pattern": names})
+    if point is not None:
+        df["avg_dxt"] = C @ np.asarray(point, dtype=np.float64).reshape(-1)
+    df["avg_dxt_mean"] = D.mean(axis=1) if B else np.nan
+    df["avg_dxt_lo"] = np.percentile(D, q, axis=1) if B else np.nan
+    df["avg_dxt_hi"] = np.percentile(D, 100.0 - q, axis=1) if B else np.nan
+    return df
@@ -0,0 +1,183 @@
+import os, json, hashlib
+from typing import List, Dict, Any, Iterable, Iterator, Tuple
+import numpy as np
+from tqdm import tqdm
+
+from .loader import _atomic_write, _load
+from .utils import timestamp_seconds, format_timestamp
+
+SCHEMA_VERSION = 2
+CACHE_DIR = "columnar"
+
+# event type codes; every other type is OTHER (it still counts as an xT entry when it has a location)
+TYPE_CODES = {"Pass": 0, "Carry": 1, "Shot": 2, "Dribble": 3}
+TYPE_NAMES = {v: k for k, v in TYPE_CODES.items()}
+OTHER = -1
+# pass type codes used by utils.token_for_pass
+PASS_TYPE_CODES = {"Cross": 1, "Through Ball": 2, "Cut Back": 3}
+PASS_TYPE_NAMES = {v: k for k, v in PASS_TYPE_CODES.items()}
+
+COLUMNS = {
+    "index": np.int64,
+    "possession": np.int64,
+    "team_id": np.int64,
+    "type": np.int8,
+    "x": np.float64,
+    "y": np.float64,
+    "end_x": np.float64,
+    "end_y": np.float64,
+    "pass_ok": np.bool_,
+    "pass_type": np.int8,
+    "cross": np.bool_,
+    "xg": np.float64,
+    "goal": np.bool_,
+    "timestamp": np.float64,
+}
+
+
+def _xy(loc):
+    if loc and len(loc) >= 2:
+        return float(loc[0]), float(loc[1])
+    return np.nan, np.nan
+
+
+def events_to_columns(evs: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    '''
+    Reduce one match's raw events to the columns the pipeline reads. Coordinates stay float64
+    so grid cells and token bins are bit-identical to the dict path; missing values are NaN / -1.
+    '''
+    cols = {k: [] for k in COLUMNS}
+    for i, e in enumerate(evs):
+        tname = e.get("type", {}).get("name")
+        code = TYPE_CODES.get(tname, OTHER)
+        sub = {0: e.get("pass"), 1: e.get("carry"), 3: e.get("dribble"), 2: e.get("shot")}.get(code) or {}
+        x, y = _xy(e.get("location"))
+        x1, y1 = _xy(sub.get("end_location")) if code in (0, 1, 3) else (np.nan, np.nan)
+        ptype = sub.get("type", {}) if code == 0 else {}
+        pname = ptype.get("name", "") if isinstance(ptype, dict) else ""
+        team = e.get("team", {}).get("id")
+        pid = e.get("possession")
+        cols["index"].append(e.get("index", i))
+        cols["possession"].append(-1 if pid is None else pid)
+        cols["team_id"].append(-1 if team is None else team)
+        cols["type"].append(code)
+        cols["x"].append(x)
+        cols["y"].append(y)
+        cols["end_x"].append(x1)
+        cols["end_y"].append(y1)
+        cols["pass_ok"].append(code == 0 and sub.get("outcome") is None)
+        cols["pass_type"].append(PASS_TYPE_CODES.get(pname, 0))
+        cols["cross"].append(bool(code == 0 and sub.get("cross")))
+        cols["xg"].append(float(sub.get("statsbomb_xg", 0.0)) if code == 2 else 0.0)
+        cols["goal"].append(code == 2 and (sub.get("outcome") or {}).get("name", "") == "Goal")
+        cols["timestamp"].append(timestamp_seconds(e.get("timestamp")))
+    return {k: np.asarray(v, dtype=COLUMNS[k]) for k, v in cols.items()}
+
+
+def columns_to_events(cols: Dict[str, np.ndarray], match_id) -> Iterator[Dict[str, Any]]:
+    '''Minimal event dicts rebuilt from columns, accepted by build_xt and build_possession_sequences.'''
+    for r in range(len(cols["index"])):
+        code = int(cols["type"][r])
+        e = {"match_id": match_id, "index": int(cols["index"][r]), "possession": int(cols["possession"][r]),
+             "team": {"id": int(cols["team_id"][r])}, "type": {"name": TYPE_NAMES.get(code, "Other")}}
+        if not np.isnan(cols["timestamp"][r]):
+            e["timestamp"] = format_timestamp(float(cols["timestamp"][r]))
+        if not np.isnan(cols["x"][r]):
+            e["location"] = [float(cols["x"][r]), float(cols["y"][r])]
+        sub = {}
+        if code in (0, 1, 3) and not np.isnan(cols["end_x"][r]):
+            sub["end_location"] = [float(cols["end_x"][r]), float(cols["end_y"][r])]
+        if code == 0:
+            if not cols["pass_ok"][r]:
+                sub["outcome"] = {}
+            if cols["pass_type"][r]:
+                sub["type"] = {"name": PASS_TYPE_NAMES[int(cols["pass_type"][r])]}
+            if cols["cross"][r]:
+                sub["cross"] = True
+            e["pass"] = sub
+        elif code == 1:
+            e["carry"] = sub
+        elif code == 3:
+            e["dribble"] = sub
+        elif code == 2:
+            e["shot"] = {"statsbomb_xg": float(cols["xg"][r]),
+                         "outcome": {"name": "Goal" if cols["goal"][r] else ""}}
+        yield e
+
+
+def _source_signature(path: str, validate: str) -> Dict[str, Any]:
+    st = os.stat(path)
+    sig = {"version": SCHEMA_VERSION, "size": st.st_size}
+    if validate == "hash":
+        h = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        sig["sha1"] = h.hexdigest()
+    else:
+        sig["mtime_ns"] = st.st_mtime_ns
+    return sig
+
+
+def _match_dir(local_dir: str, match_id) -> str:
+    return os.path.join(local_dir, CACHE_DIR, str(match_id))
+
+
+def _is_fresh(mdir: str, sig: Dict[str, Any]) -> bool:
+    meta_path = os.path.join(mdir, "meta.json")
+    if not os.path.exists(meta_path):
+        return False
+    try:
+        meta = _load(meta_path)
+    except ValueError:
+        return False
+    return all(meta.get(k) == v for k, v in sig.items())
+
+
+def build_match_cache(src_path: str, mdir: str, sig: Dict[str, Any]):
+    '''Convert one raw event file; meta.json is written last and marks the cache entry as complete.'''
+    os.makedirs(mdir, exist_ok=True)
+    meta_path = os.path.join(mdir, "meta.json")
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    cols = events_to_columns(_load(src_path))
+    for k, arr in cols.items():
+        np.save(os.path.join(mdir, f"{k}.npy"), arr)
+    _atomic_write(meta_path, json.dumps(dict(sig, n=len(cols["index"]))).encode("utf-8"))
+
+
+def ensure_event_cache(local_dir: str, matches: Iterable[Dict[str, Any]], validate: str = "mtime") -> int:
+    '''
+    Build or refresh the columnar cache (local_dir/columnar/<match_id>/<column>.npy) for matches.
+    An entry is rebuilt when its source file changed, judged by size + mtime (validate="mtime")
+    or by content hash (validate="hash"). Returns the number of matches converted.
+    '''
+    stale = []
+    for m in matches:
+        mid = m["match_id"]
+        src = os.path.join(local_dir, "events", f"{mid}.json")
+        sig = _source_signature(src, validate)
+        mdir = _match_dir(local_dir, mid)
+        if not _is_fresh(mdir, sig):
+            stale.append((src, mdir, sig))
+    for src, mdir, sig in tqdm(stale, desc="Building event cache", disable=not stale):
+        build_match_cache(src, mdir, sig)
+    return len(stale)
+
+
+def load_match_columns(local_dir: str, match_id, mmap: bool = True) -> Dict[str, np.ndarray]:
+    mdir = _match_dir(local_dir, match_id)
+    return {k: np.load(os.path.join(mdir, f"{k}.npy"), mmap_mode="r" if mmap else None) for k in COLUMNS}
+
+
+def iter_match_columns(local_dir: str, matches: Iterable[Dict[str, Any]], mmap: bool = True) -> Iterator[
+        Tuple[Any, Dict[str, np.ndarray]]]:
+    '''Lazily yield (match_id, columns) from the cache, one memory-mapped match at a time.'''
+    for m in matches:
+        yield m["match_id"], load_match_columns(local_dir, m["match_id"], mmap=mmap)
+
+
+def iter_cached_events(local_dir: str, matches: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    '''Drop-in replacement for loader.iter_events that reads the columnar cache instead of raw JSON.'''
+    for mid, cols in iter_match_columns(local_dir, matches):
+        yield from columns_to_events(cols, mid)
@@ -0,0 +1,177 @@
+import argparse, os, json
+from typing import List, Dict, Any, Tuple
+import numpy as np
+import pandas as pd
+
+from .loader import ensure_matches, parse_comp_seasons, RAW_BASE
+from .event_cache import ensure_event_cache, iter_match_columns, iter_cached_events
+from .xt_model import XTModel, SOLVERS
+from .sequences import build_possession_sequences
+from .prefixspan import prefixspan, encode_sequences, prefixspan_encoded
+from .seq_index import SequenceIndex
+from .scoring import score_patterns
+from .pipeline import xt_columns_from_cache
+
+STATE_VERSION = 1
+
+
+def save_state(path: str, xt: XTModel, seqs: List[List[str]], grids: List[List[tuple]], match_ids: List[Any],
+               patterns: List[Tuple[List[str], int]], params: Dict[str, Any]):
+    '''
+    Persist everything a refresh needs in one .npz: xT counts (transitions as COO triples), the fitted V
+    and its convergence flag, the encoded sequences with their grid cells, and the mined patterns.
+    '''
+    vocab, items, offsets = encode_sequences(seqs)
+    cells = np.array([c for g in grids for c in g], dtype=np.int16).reshape(-1, 2)
+    trans = xt.transitions()
+    if xt.sparse:
+        coo = trans.tocoo()
+        t_rows, t_cols, t_vals = coo.row, coo.col, coo.data
+    else:
+        t_rows, t_cols = np.nonzero(trans)
+        t_vals = trans[t_rows, t_cols]
+    meta = {"version": STATE_VERSION, "params": params, "vocab": vocab, "match_ids": list(match_ids),
+            "patterns": patterns, "converged": bool(xt.converged)}
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, meta=np.array(json.dumps(meta)), entries=xt.entries, shots=xt.shots, shot_xg=xt.shot_xg, V=xt.V,
+             t_rows=t_rows, t_cols=t_cols, t_vals=t_vals, items=items, offsets=offsets, cells=cells)
+    os.replace(tmp, path)
+
+
+def load_state(path: str) -> Dict[str, Any]:
+    with np.load(path) as z:
+        meta = json.loads(str(z["meta"]))
+        if meta.get("version") != STATE_VERSION:
+            raise ValueError(f"Unsupported state version in {path}")
+        p = meta["params"]
+        xt = XTModel(nx=p["nx"], ny=p["ny"], gamma=p["gamma"], tol=1e-6, max_iter=500, solver=p["solver"])
+        xt.entries, xt.shots, xt.shot_xg, xt.V = z["entries"], z["shots"], z["shot_xg"], z["V"]
+        xt.converged = meta["converged"]
+        rows, cols, vals = z["t_rows"], z["t_cols"], z["t_vals"]
+        if xt.sparse:
+            from scipy import sparse
+            xt.trans = sparse.csr_matrix((vals, (rows, cols)), shape=(xt.N, xt.N))
+        else:
+            xt.trans[rows, cols] = vals
+        vocab, items, offsets, cells = meta["vocab"], z["items"], z["offsets"], z["cells"]
+    seqs = [[vocab[t] for t in items[offsets[i]:offsets[i + 1]]] for i in range(len(offsets) - 1)]
+    grids = [[(int(a), int(b)) for a, b in cells[offsets[i]:offsets[i + 1]]] for i in range(len(offsets) - 1)]
+    patterns = [(list(p), int(s)) for p, s in meta["patterns"]]
+    return {"xt": xt, "seqs": seqs, "grids": grids, "match_ids": meta["match_ids"], "patterns": patterns,
+            "params": p}
+
+
+def update_patterns(old_seqs: List[List[str]], new_seqs: List[List[str]], old_patterns: List[Tuple[List[str], int]],
+                    minsup_ratio: float, maxlen: int, max_candidates: int = 200000):
+    '''
+    Frequent patterns of old_seqs + new_seqs from the frequent patterns of old_seqs (FUP-style).
+    A pattern that was infrequent before had at most minsup_old - 1 old occurrences, so it can only become
+    frequent with at least minsup_new - minsup_old + 1 occurrences in the new sequences: those candidates
+    are mined from the new sequences alone and counted on the old ones with a SequenceIndex. Supports of
+    previously frequent patterns are updated the same way. Falls back to a full re-mine when the candidate
+    set exceeds max_candidates. Returns (patterns, remined).
+    '''
+    all_seqs = old_seqs + new_seqs
+    n_old, n_all = len(old_seqs), len(all_seqs)
+    minsup_old = max(1, int(minsup_ratio * n_old + 1e-9))
+    minsup_new = max(1, int(minsup_ratio * n_all + 1e-9))
+    if n_old == 0 or not new_seqs:
+        if not new_seqs:
+            return [(p, s) for p, s in old_patterns if s >= minsup_new], False
+        return prefixspan(all_seqs, minsup_ratio=minsup_ratio, maxlen=maxlen), True
+
+    vocab, items, offsets = encode_sequences(new_seqs)
+    need = max(1, minsup_new - minsup_old + 1)
+    # maxlen <= 0 means no length limit, as in prefixspan
+    cands = prefixspan_encoded(items, offsets, need, maxlen if maxlen > 0 else float("inf"))
+    if len(cands) > max_candidates:
+        return prefixspan(all_seqs, minsup_ratio=minsup_ratio, maxlen=maxlen), True
+
+    new_index = SequenceIndex(new_seqs)
+    old_index = SequenceIndex(old_seqs)
+    support = {}
+    for p, s in old_patterns:
+        support[tuple(p)] = s + new_index.support(p)
+    for ids, s_new in cands:
+        key = tuple(vocab[t] for t in ids)
+        if key not in support:
+            support[key] = s_new + old_index.support(list(key))
+    found = [(k, v) for k, v in support.items() if v >= minsup_new]
+    found.sort(key=lambda x: (-x[1], x[0]))
+    return [(list(k), v) for k, v in found], False
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Add newly available matches to a saved xT/pattern state")
+    ap.add_argument("--state", default="outputs/state.npz")
+    ap.add_argument("--data_dir", default="open_data_cache")
+    ap.add_argument("--output_dir", default="outputs")
+    ap.add_argument("--competitions", default="43:3")
+    ap.add_argument("--base_url", default=RAW_BASE)
+    ap.add_argument("--download_workers", type=int, default=8)
+    ap.add_argument("--grid_x", type=int, default=12)
+    ap.add_argument("--grid_y", type=int, default=8)
+    ap.add_argument("--xt_solver", default="dense", choices=list(SOLVERS))
+    ap.add_argument("--xt_gamma", type=float, default=1.0,
+                    help="xT discount; refreshes warm-start the xT fit from the saved V only when < 1")
+    ap.add_argument("--minsup", type=float, default=0.005)
+    ap.add_argument("--maxlen", type=int, default=5)
+    ap.add_argument("--top_k", type=int, default=30)
+    args = ap.parse_args()
+    if args.xt_solver == "direct" and args.xt_gamma >= 1.0:
+        ap.error("--xt_solver direct needs --xt_gamma < 1 (the gamma = 1 fixed point is not unique); "
+                 "use --xt_solver sparse or dense")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    params = {"nx": args.grid_x, "ny": args.grid_y, "solver": args.xt_solver, "gamma": args.xt_gamma,
+              "minsup": args.minsup, "maxlen": args.maxlen}
+    matches = ensure_matches(args.data_dir, parse_comp_seasons(args.competitions), base_url=args.base_url,
+                             concurrency=args.download_workers)
+    ensure_event_cache(args.data_dir, matches)
+
+    state = load_state(args.state) if os.path.exists(args.state) else None
+    data_params = ("nx", "ny", "solver", "gamma")
+    if state is not None and any(state["params"][k] != params[k] for k in data_params):
+        print("Grid/solver changed since the state was saved; rebuilding from scratch.")
+        state = None
+    if state is None:
+        state = {"xt": XTModel(nx=args.grid_x, ny=args.grid_y, gamma=args.xt_gamma, tol=1e-6, max_iter=500,
+                               solver=args.xt_solver),
+                 "seqs": [], "grids": [], "match_ids": [], "patterns": [], "params": params}
+
+    seen = set(state["match_ids"])
+    new = [m for m in matches if m["match_id"] not in seen]
+    print(f"{len(new)} new matches ({len(seen)} already in state).")
+    xt = state["xt"]
+    # at gamma >= 1 value iteration is not a contraction (the move matrix is row-stochastic) and on a full
+    # tournament stops at max_iter, so a saved V is no fixed point to resume from: only gamma < 1 refreshes
+    # are warm-started
+    warm = xt.converged and len(seen) > 0 and xt.gamma < 1.0
+    if new and len(seen) > 0 and xt.gamma >= 1.0:
+        print("xT warm start needs --xt_gamma < 1 (value iteration need not converge at gamma 1); fitting from zeros.")
+    V0 = xt.V if warm else None
+    for _, cols in iter_match_columns(args.data_dir, new):
+        xt.add_batch(*xt_columns_from_cache(cols))
+    if new or not len(seen):
+        xt.fit(V0=V0)
+        print(f"xT fit: {xt.n_iter} iterations, delta={xt.delta:.3g}, warm start={warm}.")
+
+    new_seqs, new_grids, _ = build_possession_sequences(iter_cached_events(args.data_dir, new),
+                                                        (args.grid_x, args.grid_y), keep_events=False)
+    same_mining = all(state["params"][k] == params[k] for k in ("minsup", "maxlen")) and len(seen) > 0
+    if same_mining:
+        patterns, remined = update_patterns(state["seqs"], new_seqs, state["patterns"], args.minsup, args.maxlen)
+    else:
+        patterns, remined = prefixspan(state["seqs"] + new_seqs, minsup_ratio=args.minsup, maxlen=args.maxlen), True
+    seqs, grids = state["seqs"] + new_seqs, state["grids"] + new_grids
+    print(f"{len(seqs)} sequences, {len(patterns)} patterns ({'full re-mine' if remined else 'incremental'}).")
+
+    save_state(args.state, xt, seqs, grids, state["match_ids"] + [m["match_id"] for m in new], patterns, params)
+    pd.DataFrame(xt.V).to_csv(os.path.join(args.output_dir, "xt_grid.csv"), index=False)
+    scores = score_patterns(seqs, grids, patterns, xt_grid=np.array(xt.V))
+    pd.DataFrame(scores).head(args.top_k).to_csv(os.path.join(args.output_dir, "patterns.csv"), index=False)
+    print(f"Saved state to {args.state}")
+
+
+if __name__ == "__main__":
+    main()
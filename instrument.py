@@ -0,0 +1,106 @@
+import functools, json, os, platform, sys, time
+from contextlib import contextmanager
+from typing import Dict, Any, List
+
+try:
+    import resource
+except ImportError:  # unavailable on Windows
+    resource = None
+
+
+def _rss_mb() -> float:
+    '''Current resident set size in MB (Linux /proc; 0 where unavailable).'''
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError):
+        return 0.0
+
+
+def _reset_peak_rss() -> bool:
+    '''Reset the kernel's RSS high-water mark (Linux clear_refs), so the next peak is per stage.'''
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb() -> float:
+    '''RSS high-water mark in MB: VmHWM where available, else ru_maxrss (process lifetime).'''
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024 / 1e6
+    except OSError:
+        pass
+    if resource is None:
+        return 0.0
+    scale = 1.0 if sys.platform == "darwin" else 1024.0  # bytes on macOS, KiB elsewhere
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1e6
+
+
+def _children_peak_rss_mb() -> float:
+    if resource is None:
+        return 0.0
+    scale = 1.0 if sys.platform == "darwin" else 1024.0
+    return resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale / 1e6
+
+
+class RunReport:
+    '''
+    Lightweight run instrumentation: stage() times a block and records RSS and any counts the block
+    sets; add() stores other sections (fit traces, miner statistics, parameters). write() dumps JSON.
+    peak_rss_mb is the high-water mark within the stage where the kernel allows resetting it
+    (peak_scope "stage"), else the process peak so far (peak_scope "process"). Worker processes
+    show up in children_peak_rss_mb (largest finished child).
+    '''
+
+    def __init__(self, meta: Dict[str, Any] = None):
+        self.meta = {"python": platform.python_version(), "argv": sys.argv, "started": time.time()}
+        self.meta.update(meta or {})
+        self.stages: List[Dict[str, Any]] = []
+        self.sections: Dict[str, Any] = {}
+        self._t0 = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str, verbose: bool = False):
+        '''with report.stage("mine") as counts: ...; counts["n_patterns"] = len(patterns)'''
+        counts: Dict[str, Any] = {}
+        scope = "stage" if _reset_peak_rss() else "process"
+        t0 = time.perf_counter()
+        try:
+            yield counts
+        finally:
+            rec = {"name": name, "seconds": time.perf_counter() - t0, "rss_mb": _rss_mb(),
+                   "peak_rss_mb": _peak_rss_mb(), "peak_scope": scope,
+                   "children_peak_rss_mb": _children_peak_rss_mb()}
+            rec.update(counts)
+            self.stages.append(rec)
+            if verbose:
+                print(f"[{name}] {rec['seconds']:.2f}s, peak RSS {rec['peak_rss_mb']:.0f} MB")
+
+    def timed(self, name: str = None):
+        '''Decorator form of stage(); the stage is named after the function by default.'''
+        def deco(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.stage(name or fn.__name__):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return deco
+
+    def add(self, section: str, data: Any):
+        self.sections[section] = data
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = {"meta": self.meta, "total_seconds": time.perf_counter() - self._t0, "stages": self.stages}
+        out.update(self.sections)
+        return out
+
+    def write(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
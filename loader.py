@@ -1,35 +1,218 @@
-import os, time, json, requests
-from typing import List, Dict, Any, Tuple
+import os, time, json, tempfile, threading, requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Tuple, Iterable, Iterator
+from requests.adapters import HTTPAdapter
 from tqdm import tqdm
 
 RAW_BASE = "https://raw.githubusercontent.com/statsbomb/open-data/master/data"
+MANIFEST = "manifest.json"
 
 
-def _get_json(url, retries=5, sleep=1.0):
-    for i in range(retries):
+def _atomic_write(path: str, data: bytes):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class Downloader:
+    '''
+    Mirrors open-data files into local_dir over a pooled requests.Session.
+      - files are fetched concurrently (up to `concurrency` in flight) with exponential backoff
+      - each body is checked to be valid JSON and written atomically (temp file + rename)
+      - manifest.json records every completed file with its size, ETag and Last-Modified, so an
+        interrupted run resumes where it stopped and never trusts a partial file; it is rewritten
+        (atomically) every save_every new entries and after each fetch / fetch_many, and a file
+        whose entry was not yet saved is re-adopted next run if it parses
+      - revalidate=True re-checks cached files with If-None-Match / If-Modified-Since (304 = keep)
+    base_url can point at any server with the open-data layout, e.g. a local HTTP stand-in.
+    '''
+
+    def __init__(self, local_dir: str, base_url: str = RAW_BASE, concurrency: int = 8, retries: int = 5,
+                 backoff: float = 0.5, timeout: float = 30.0, revalidate: bool = False, save_every: int = 100):
+        self.local_dir = local_dir
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = max(1, concurrency)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.revalidate = revalidate
+        self.save_every = max(1, save_every)
+        self._unsaved = 0
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = "sbxt/1.0"
+        adapter = HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        os.makedirs(local_dir, exist_ok=True)
+        self.manifest_path = os.path.join(local_dir, MANIFEST)
+        self.manifest = {}
+        if os.path.exists(self.manifest_path):
+            try:
+                with open(self.manifest_path, "r", encoding="utf-8") as f:
+                    self.manifest = json.load(f)
+            except ValueError:
+                self.manifest = {}
+
+    def _save_manifest(self):
+        _atomic_write(self.manifest_path, json.dumps(self.manifest, indent=1, sort_keys=True).encode("utf-8"))
+
+    def _record(self, rel: str, entry: Dict[str, Any]):
+        with self._lock:
+            self.manifest[rel] = entry
+            self._unsaved += 1
+            if self._unsaved >= self.save_every:
+                self._save_manifest()
+                self._unsaved = 0
+
+    def flush(self):
+        '''Write manifest.json if it has entries not yet on disk.'''
+        with self._lock:
+            if self._unsaved:
+                self._save_manifest()
+                self._unsaved = 0
+
+    def _is_complete(self, rel: str, path: str) -> bool:
+        if not os.path.exists(path):
+            return False
+        entry = self.manifest.get(rel)
+        if entry is not None:
+            return entry.get("size") == os.path.getsize(path)
+        # cached by an older run without a manifest: adopt it only if it parses
         try:
-            r = requests.get(url, headers={"User-Agent": "sbxt/1.0"}, timeout=30)
-            if r.status_code == 200:
-                return r.json()
-        except Exception:
-            pass
-        time.sleep(sleep * (i + 1))
-    raise RuntimeError(f"Failed to GET {url}")
+            with open(path, "r", encoding="utf-8") as f:
+                json.load(f)
+        except ValueError:
+            return False
+        self._record(rel, {"size": os.path.getsize(path)})
+        return True
+
+    def fetch(self, rel: str) -> str:
+        '''Ensure base_url/rel is mirrored at local_dir/rel; returns the local path.'''
+        try:
+            return self._fetch(rel)
+        finally:
+            self.flush()
+
+    def _fetch(self, rel: str) -> str:
+        path = os.path.join(self.local_dir, *rel.split("/"))
+        complete = self._is_complete(rel, path)
+        if complete and not self.revalidate:
+            return path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        headers = {}
+        entry = self.manifest.get(rel, {}) if complete else {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+        url = f"{self.base_url}/{rel}"
+        last_err = None
+        for i in range(self.retries):
+            try:
+                r = self.session.get(url, headers=headers, timeout=self.timeout)
+                if r.status_code == 304 and complete:
+                    return path
+                if r.status_code == 200:
+                    data = r.content
+                    json.loads(data)
+                    _atomic_write(path, data)
+                    self._record(rel, {"size": len(data), "etag": r.headers.get("ETag"),
+                                       "last_modified": r.headers.get("Last-Modified")})
+                    return path
+                last_err = f"HTTP {r.status_code}"
+                if 400 <= r.status_code < 500 and r.status_code != 429:
+                    break
+            except (requests.RequestException, ValueError) as e:
+                last_err = repr(e)
+            time.sleep(self.backoff * (2 ** i))
+        raise RuntimeError(f"Failed to GET {url}: {last_err}")
+
+    def fetch_many(self, rels: List[str], desc: str = "Downloading") -> List[str]:
+        '''Fetch rels concurrently; returns local paths in the order of rels.'''
+        paths = [None] * len(rels)
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                futs = {pool.submit(self._fetch, rel): k for k, rel in enumerate(rels)}
+                for fut in tqdm(as_completed(futs), total=len(futs), desc=desc):
+                    paths[futs[fut]] = fut.result()
+        finally:
+            self.flush()
+        return paths
+
+
+def _load(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
 
 
-def ensure_worldcup_2018(local_dir: str):
+def parse_comp_seasons(spec: str) -> List[Tuple[int, int]]:
+    '''"43:3,55:43" -> [(43, 3), (55, 43)]; "all" -> [] (meaning every pair in competitions.json).'''
+    if spec.strip().lower() == "all":
+        return []
+    pairs = []
+    for part in spec.split(","):
+        if part.strip():
+            c, s = part.split(":")
+            pairs.append((int(c), int(s)))
+    return pairs
+
+
+def ensure_matches(local_dir: str, comp_seasons: List[Tuple[int, int]], base_url: str = RAW_BASE,
+                   concurrency: int = 8, revalidate: bool = False) -> List[Dict[str, Any]]:
+    '''
+    Download match lists and event files for the given (competition_id, season_id) pairs
+    (empty list = every pair in competitions.json). Returns the match dicts, in pair order;
+    events stay on disk, read them lazily with iter_events.
+    '''
+    dl = Downloader(local_dir, base_url=base_url, concurrency=concurrency, revalidate=revalidate)
+    if not comp_seasons:
+        comps = _load(dl.fetch("competitions.json"))
+        comp_seasons = [(c["competition_id"], c["season_id"]) for c in comps]
+    matches = []
+    for comp_id, season_id in comp_seasons:
+        matches.extend(_load(dl.fetch(f"matches/{comp_id}/{season_id}.json")))
+    dl.fetch_many([f"events/{m['match_id']}.json" for m in matches], desc="Downloading events")
+    return matches
+
+
+def iter_match_events(local_dir: str, matches: Iterable[Dict[str, Any]]) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+    '''Lazily yield (match_id, events) one parsed match file at a time.'''
+    for m in matches:
+        mid = m["match_id"]
+        evs = _load(os.path.join(local_dir, "events", f"{mid}.json"))
+        for i, e in enumerate(evs):
+            e["match_id"] = mid
+            if "index" not in e:
+                e["index"] = i
+        yield mid, evs
+
+
+def iter_events(local_dir: str, matches: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    '''
+    Lazy event stream over matches, in match order, tagged with match_id/index like main.extract_events.
+    Only one match file is parsed and held at a time.
+    '''
+    for _, evs in iter_match_events(local_dir, matches):
+        yield from evs
+
+
+def ensure_worldcup_2018(local_dir: str, base_url: str = RAW_BASE, concurrency: int = 8, revalidate: bool = False):
     '''
     Download competitions/matches/events for 2018 FIFA World Cup (comp_id=43, season_id=3).
     Cache to local_dir. Returns (competitions, matches, events_by_match).
     '''
-    os.makedirs(local_dir, exist_ok=True)
-    comp_path = os.path.join(local_dir, "competitions.json")
-    if not os.path.exists(comp_path):
-        comps = _get_json(f"{RAW_BASE}/competitions.json")
-        with open(comp_path, "w", encoding="utf-8") as f:
-            json.dump(comps, f)
-    else:
-        comps = json.load(open(comp_path, "r", encoding="utf-8"))
+    dl = Downloader(local_dir, base_url=base_url, concurrency=concurrency, revalidate=revalidate)
+    comps = _load(dl.fetch("competitions.json"))
     comp_id, season_id = None, None
     for c in comps:
         if str(c.get("competition_name")).lower().startswith("fifa world cup") and str(c.get("season_name")).startswith(
@@ -40,26 +223,7 @@ def ensure_worldcup_2018(local_dir: str):
     if comp_id is None:
         comp_id, season_id = 43, 3
 
-    matches_path = os.path.join(local_dir, f"matches_{comp_id}_{season_id}.json")
-    if not os.path.exists(matches_path):
-        matches = _get_json(f"{RAW_BASE}/matches/{comp_id}/{season_id}.json")
-        with open(matches_path, "w", encoding="utf-8") as f:
-            json.dump(matches, f)
-    else:
-        matches = json.load(open(matches_path, "r", encoding="utf-8"))
-
-    events_by_match = {}
-    ev_dir = os.path.join(local_dir, "events")
-    os.makedirs(ev_dir, exist_ok=True)
-
-    for m in tqdm(matches, desc="Downloading events"):
-        mid = m["match_id"]
-        ep = os.path.join(ev_dir, f"{mid}.json")
-        if not os.path.exists(ep):
-            ev = _get_json(f"{RAW_BASE}/events/{mid}.json")
-            with open(ep, "w", encoding="utf-8") as f:
-                json.dump(ev, f)
-        else:
-            ev = json.load(open(ep, "r", encoding="utf-8"))
-        events_by_match[mid] = ev
+    matches = _load(dl.fetch(f"matches/{comp_id}/{season_id}.json"))
+    paths = dl.fetch_many([f"events/{m['match_id']}.json" for m in matches], desc="Downloading events")
+    events_by_match = {m["match_id"]: _load(p) for m, p in zip(matches, paths)}
     return comps, matches, events_by_match
@@ -1,14 +1,26 @@
 import argparse, os, json
+from itertools import islice
 import numpy as np
 import pandas as pd
 from tqdm import tqdm
 
-from .loader import ensure_worldcup_2018
-from .xt_model import XTModel
+from .loader import ensure_matches, iter_events, parse_comp_seasons, RAW_BASE
+from .event_cache import ensure_event_cache, iter_cached_events
+from .pipeline import preprocess_matches
+from .xt_model import XTModel, KIND_ENTRY, KIND_MOVE, KIND_SHOT, SOLVERS
+from .ensemble import XTEnsemble, pattern_dxt_intervals
 from .sequences import build_possession_sequences
-from .prefixspan import prefixspan
-from .scoring import score_patterns
-from .viz import plot_xt_heatmap, plot_example_path
+from .store import SequenceStore
+from .prefixspan import prefixspan, MODES
+from .seq_index import SequenceIndex
+from .scoring import score_patterns_index, iter_scores, mine_and_score
+from .results import ResultWriter, stream_top_k
+from .query import INDEX_FILE
+from .occurrences import OccurrenceIndex
+from .instrument import RunReport
+from .sweep import parse_values, sweep_table
+from .artifacts import ArtifactCache, ARTIFACT_DIR, data_fingerprint, stage_key
+from .viz import plot_xt_heatmap, render_examples, RENDER_MODES
 from .utils import pitch_to_grid
 
 
@@ -25,32 +37,44 @@ def extract_events(matches, events_by_match):
     return events
 
 
-def build_xt(events, nx, ny):
-    xt = XTModel(nx=nx, ny=ny, gamma=1.0, tol=1e-6, max_iter=500)
+def xt_columns_from_events(events):
+    '''One Python pass over event dicts -> add_batch arrays (x0, y0, x1, y1, kind, xg).'''
+    x0s, y0s, x1s, y1s, kinds, xgs = [], [], [], [], [], []
     for e in events:
-        tname = e.get("type", {}).get("name")
         loc = e.get("location")
         if not loc or len(loc) < 2:
             continue
-        x0, y0 = float(loc[0]), float(loc[1])
-        xt.add_entry(x0, y0)
-        if tname == "Pass":
-            p = e.get("pass", {})
-            if p.get("outcome") is None:
-                end_loc = p.get("end_location")
-                if end_loc and len(end_loc) >= 2:
-                    x1, y1 = float(end_loc[0]), float(end_loc[1])
-                    xt.add_transition(x0, y0, x1, y1)
-        elif tname == "Carry":
-            c = e.get("carry", {})
-            end_loc = c.get("end_location")
-            if end_loc and len(end_loc) >= 2:
-                x1, y1 = float(end_loc[0]), float(end_loc[1])
-                xt.add_transition(x0, y0, x1, y1)
+        tname = e.get("type", {}).get("name")
+        kind, x1, y1, xg = KIND_ENTRY, 0.0, 0.0, 0.0
+        if tname == "Pass" or tname == "Carry":
+            sub = e.get("pass" if tname == "Pass" else "carry", {})
+            end_loc = sub.get("end_location")
+            if (tname == "Carry" or sub.get("outcome") is None) and end_loc and len(end_loc) >= 2:
+                kind, x1, y1 = KIND_MOVE, float(end_loc[0]), float(end_loc[1])
         elif tname == "Shot":
-            s = e.get("shot", {})
-            xg = float(s.get("statsbomb_xg", 0.0))
-            xt.add_shot(x0, y0, xg)
+            kind, xg = KIND_SHOT, float(e.get("shot", {}).get("statsbomb_xg", 0.0))
+        x0s.append(float(loc[0]))
+        y0s.append(float(loc[1]))
+        x1s.append(x1)
+        y1s.append(y1)
+        kinds.append(kind)
+        xgs.append(xg)
+    return (np.array(x0s, dtype=np.float64), np.array(y0s, dtype=np.float64), np.array(x1s, dtype=np.float64),
+            np.array(y1s, dtype=np.float64), np.array(kinds, dtype=np.int8), np.array(xgs, dtype=np.float64))
+
+
+def build_xt(events, nx, ny, chunk: int = 200000, solver: str = "dense", gamma: float = 1.0):
+    '''
+    events: any iterable of event dicts, including a lazy loader.iter_events stream.
+    Columns are extracted chunk by chunk and accumulated with XTModel.add_batch.
+    '''
+    xt = XTModel(nx=nx, ny=ny, gamma=gamma, tol=1e-6, max_iter=500, solver=solver)
+    it = iter(events)
+    while True:
+        block = list(islice(it, chunk))
+        if not block:
+            break
+        xt.add_batch(*xt_columns_from_events(block))
     xt.fit()
     return xt
 
@@ -60,63 +84,303 @@ def main():
     ap.add_argument("--data_dir", default="open_data_cache", help="Where to cache StatsBomb data")
     ap.add_argument("--output_dir", default="outputs")
     ap.add_argument("--download", type=int, default=1, help="1=download open-data (first run)")
+    ap.add_argument("--competitions", default="43:3",
+                    help="comma-separated competition_id:season_id pairs, or 'all' (default: 2018 World Cup)")
+    ap.add_argument("--base_url", default=RAW_BASE, help="open-data mirror root (e.g. a local HTTP stand-in)")
+    ap.add_argument("--download_workers", type=int, default=8, help="concurrent downloads")
+    ap.add_argument("--revalidate", type=int, default=0, help="1=re-check cached files with ETag/If-Modified-Since")
+    ap.add_argument("--event_cache", type=int, default=1,
+                    help="1=read events from the columnar .npy cache (built once from the raw JSON)")
+    ap.add_argument("--cache_validate", default="mtime", choices=["mtime", "hash"],
+                    help="how to detect changed source files when reusing the event cache")
     ap.add_argument("--grid_x", type=int, default=12)
     ap.add_argument("--grid_y", type=int, default=8)
+    ap.add_argument("--xt_solver", default="dense", choices=list(SOLVERS),
+                    help="dense | sparse (CSR value iteration) | direct (sparse linear solve, needs --xt_gamma < 1)")
+    ap.add_argument("--xt_gamma", type=float, default=1.0)
+    ap.add_argument("--xt_bootstrap", type=int, default=0,
+                    help="bootstrap resamples of matches for xT confidence intervals (0 = off; needs --event_cache 1)")
+    ap.add_argument("--xt_grids", default="", help="extra grids for the bootstrap ensemble, e.g. '16x12,24x16'")
+    ap.add_argument("--xt_ci", type=float, default=0.95, help="confidence level of the bootstrap intervals")
     ap.add_argument("--minsup", type=float, default=0.005, help="min support ratio for PrefixSpan")
-    ap.add_argument("--maxlen", type=int, default=5)
+    ap.add_argument("--maxlen", type=int, default=5, help="max pattern length (0 = unlimited)")
+    ap.add_argument("--pattern_mode", default="all", choices=list(MODES),
+                    help="all frequent patterns, or only closed / maximal ones plus every rule whose antecedent "
+                         "is closed (same rows as 'all' for those rules)")
+    ap.add_argument("--max_gap", type=int, default=0,
+                    help="max steps between consecutive pattern tokens, 1 = adjacent (0 = unconstrained)")
+    ap.add_argument("--max_window", type=float, default=0.0,
+                    help="max seconds between a pattern's first and last step (0 = unconstrained)")
     ap.add_argument("--top_k", type=int, default=30)
+    ap.add_argument("--workers", type=int, default=1,
+                    help="processes for per-match preprocessing, PrefixSpan and plots (PrefixSpan runs in one "
+                         "process with --score_during_mining 1)")
+    ap.add_argument("--score_during_mining", type=int, default=0,
+                    help="1=score rules inside PrefixSpan and prune subtrees that cannot reach the top_k; mining "
+                         "then runs in one process whatever --workers is")
+    ap.add_argument("--min_lift", type=float, default=0.0, help="drop rules with lift below this")
+    ap.add_argument("--plot_top", type=int, default=5, help="top patterns to plot examples for")
+    ap.add_argument("--plot_examples", type=int, default=1, help="example paths plotted per top pattern")
+    ap.add_argument("--plot_mode", default="png", choices=list(RENDER_MODES),
+                    help="png=one file per example, pdf=one multi-page PDF, sheet=one contact-sheet PNG")
+    ap.add_argument("--plot_dpi", type=int, default=200, help="resolution of the example plots (200 = the paper figures)")
+    ap.add_argument("--export_occurrences", type=int, default=0,
+                    help="1=write every occurrence of the reported patterns to occurrences.csv")
+    ap.add_argument("--full_results", default="",
+                    help="stream every scored rule to this file in --output_dir (.csv, or .parquet with pyarrow)")
+    ap.add_argument("--memmap_results", type=int, default=0,
+                    help="1=also keep the numeric rule columns as memory-mapped .npy files next to --full_results")
+    ap.add_argument("--sweep_minsup", default="", help="comma-separated minsup values; enables sweep mode")
+    ap.add_argument("--sweep_maxlen", default="", help="comma-separated maxlen values; enables sweep mode")
+    ap.add_argument("--sweep_top_k", default="", help="comma-separated top_k values; enables sweep mode")
+    ap.add_argument("--query_index", type=int, default=0,
+                    help=f"1=save the sequence index to {INDEX_FILE} for python -m sbxt.query lookups")
+    ap.add_argument("--artifacts", type=int, default=1,
+                    help="1=reuse the xT grid, sequences and patterns cached in --output_dir when inputs match")
+    ap.add_argument("--report", default="run_report.json", help="JSON run report, relative to --output_dir")
+    ap.add_argument("--profile", default="", help="write cProfile stats of the whole run to this path")
     args = ap.parse_args()
+    if args.xt_solver == "direct" and args.xt_gamma >= 1.0:
+        ap.error("--xt_solver direct needs --xt_gamma < 1 (the gamma = 1 fixed point is not unique); "
+                 "use --xt_solver sparse or dense")
+    if args.score_during_mining and (args.pattern_mode != "all" or args.maxlen <= 0):
+        ap.error("--score_during_mining needs --pattern_mode all and --maxlen > 0")
+    if (args.max_gap > 0 or args.max_window > 0) and (args.pattern_mode != "all" or args.score_during_mining):
+        ap.error("--max_gap / --max_window need --pattern_mode all and --score_during_mining 0")
+    if args.xt_bootstrap and not args.event_cache:
+        ap.error("--xt_bootstrap needs --event_cache 1")
 
     os.makedirs(args.output_dir, exist_ok=True)
-    comps, matches, events_by_match = ensure_worldcup_2018(args.data_dir)
-    events = extract_events(matches, events_by_match)
+    report = RunReport({"params": vars(args)})
+    prof = None
+    if args.profile:
+        import cProfile
+        prof = cProfile.Profile()
+        prof.enable()
+    try:
+        run(args, report)
+    finally:
+        if prof is not None:
+            prof.disable()
+            prof.dump_stats(args.profile)
+            print(f"Saved cProfile stats to {args.profile}")
+        report.write(os.path.join(args.output_dir, args.report))
+
+
+def run(args, report: RunReport):
+    with report.stage("matches") as st:
+        matches = ensure_matches(args.data_dir, parse_comp_seasons(args.competitions), base_url=args.base_url,
+                                 concurrency=args.download_workers, revalidate=bool(args.revalidate))
+        st["n_matches"] = len(matches)
+    if args.event_cache:
+        with report.stage("event_cache"):
+            ensure_event_cache(args.data_dir, matches, validate=args.cache_validate)
+    source = iter_cached_events if args.event_cache else iter_events
+    n_events = [0]
 
-    print(f"Loaded {len(matches)} matches, {sum(len(v) for v in events_by_match.values())} events.")
+    def _events():
+        # lazy, one match at a time; each stage makes its own pass
+        for e in source(args.data_dir, matches):
+            n_events[0] += 1
+            yield e
 
-    xt = build_xt(events, args.grid_x, args.grid_y)
+    cache = ArtifactCache(os.path.join(args.output_dir, ARTIFACT_DIR)) if args.artifacts else None
+    with report.stage("fingerprint"):
+        fp = data_fingerprint(args.data_dir, matches, args.cache_validate) if cache else ""
+    # the dict path only records step timestamps when a time window needs them
+    with_times = bool(args.event_cache or args.max_window > 0)
+    seq_key = stage_key("sequences", fp, args.grid_x, args.grid_y, *([] if with_times else ["no_times"]))
+    xt_key = stage_key("xt", fp, args.grid_x, args.grid_y, args.xt_solver, args.xt_gamma)
+    xt = cache.load_xt(xt_key) if cache else None
+    store = cache.load_sequences(seq_key) if cache else None
+    if xt is not None:
+        print(f"Reusing fitted xT grid {xt_key[:12]}.")
+    if store is not None:
+        print(f"Reusing possession sequences {seq_key[:12]}.")
+
+    if args.event_cache and (xt is None or store is None):
+        # per-match map (process pool with --workers) + in-order reduce
+        with report.stage("preprocess") as st:
+            xt_new, store_new = preprocess_matches(args.data_dir, matches, args.grid_x, args.grid_y,
+                                                   workers=args.workers, solver=args.xt_solver, gamma=args.xt_gamma)
+            st["n_sequences"], st["n_steps"] = len(store_new), store_new.n_steps
+        if store is None:
+            store = store_new
+            if cache:
+                cache.save_sequences(seq_key, store)
+        if xt is None:
+            with report.stage("xt_fit") as st:
+                xt = xt_new
+                xt.fit()
+                st["iterations"] = xt.n_iter
+            if cache:
+                cache.save_xt(xt_key, xt)
+        print(f"Loaded {len(matches)} matches.")
+    elif not args.event_cache:
+        if xt is None:
+            with report.stage("build_xt") as st:
+                xt = build_xt(_events(), args.grid_x, args.grid_y, solver=args.xt_solver, gamma=args.xt_gamma)
+                st["n_events"], st["iterations"] = n_events[0], xt.n_iter
+            if cache:
+                cache.save_xt(xt_key, xt)
+        if store is None:
+            with report.stage("build_sequences") as st:
+                times = [] if with_times else None
+                seqs, grids, _ = build_possession_sequences(_events(), (args.grid_x, args.grid_y), keep_events=False,
+                                                            times=times)
+                store = SequenceStore.from_lists(seqs, grids, (args.grid_x, args.grid_y), times)
+                del seqs, grids, times
+                st["n_sequences"], st["n_steps"] = len(store), store.n_steps
+            if cache:
+                cache.save_sequences(seq_key, store)
+        print(f"Loaded {len(matches)} matches.")
+    report.add("xt_fit", {"solver": xt.solver, "iterations": xt.n_iter, "delta": xt.delta,
+                          "converged": xt.converged, "trace": xt.trace})
     xt_grid = xt.V
-    pd.DataFrame(xt_grid).to_csv(os.path.join(args.output_dir, "xt_grid.csv"), index=False)
-    plot_xt_heatmap(xt_grid, os.path.join(args.output_dir, "plots/xt_heatmap.png"))
+    with report.stage("write_xt"):
+        pd.DataFrame(xt_grid).to_csv(os.path.join(args.output_dir, "xt_grid.csv"), index=False)
+        plot_xt_heatmap(xt_grid, os.path.join(args.output_dir, "plots/xt_heatmap.png"))
+
+    ens = None
+    if args.xt_bootstrap:
+        grids = [(args.grid_x, args.grid_y)]
+        for g in parse_values(args.xt_grids, str) if args.xt_grids else []:
+            nx, ny = (int(v) for v in g.lower().split("x"))
+            if (nx, ny) not in grids:
+                grids.append((nx, ny))
+        with report.stage("xt_ensemble") as st:
+            ens = XTEnsemble.collect(args.data_dir, matches, grids, workers=args.workers, gamma=args.xt_gamma,
+                                     solver=args.xt_solver)
+            ens = ens.fit(n_boot=args.xt_bootstrap, ci=args.xt_ci)
+            rows = []
+            for (nx, ny), r in ens.items():
+                gx, gy = np.meshgrid(np.arange(nx), np.arange(ny), indexing="ij")
+                rows.append(pd.DataFrame({"grid": f"{nx}x{ny}", "gx": gx.ravel(), "gy": gy.ravel(),
+                                          **{k: r[k].ravel() for k in ("point", "mean", "std", "lo", "hi")}}))
+            pd.concat(rows, ignore_index=True).to_csv(os.path.join(args.output_dir, "xt_ensemble.csv"), index=False)
+            st["n_grids"], st["n_fits"] = len(grids), len(grids) * (args.xt_bootstrap + 1)
+        report.add("xt_ensemble", {f"{nx}x{ny}": {"iterations": r["iterations"].tolist(),
+                                                  "converged": int(r["converged"].sum())}
+                                   for (nx, ny), r in ens.items()})
+        print(f"Fitted {args.xt_bootstrap} bootstrap xT grids for {len(grids)} grid size(s).")
+
+    print(f"Built {len(store)} possession sequences ({store.n_steps} steps, {store.nbytes / 1e6:.1f} MB).")
 
-    seqs, grids, used_events = build_possession_sequences(events, (args.grid_x, args.grid_y))
-    print(f"Built {len(seqs)} possession sequences.")
+    with report.stage("index"):
+        index = SequenceIndex(store, xt_grid=np.array(xt_grid), max_gap=args.max_gap, max_window=args.max_window)
+    if args.query_index:
+        with report.stage("query_index"):
+            index.save(os.path.join(args.output_dir, INDEX_FILE))
 
-    patterns = prefixspan(seqs, minsup_ratio=args.minsup, maxlen=args.maxlen)
-    print(f"Mined {len(patterns)} patterns with minsup={args.minsup}.")
+    def _mine(minsup: float, maxlen: int):
+        key = stage_key("patterns", seq_key, minsup, maxlen, args.pattern_mode, args.max_gap, args.max_window)
+        patterns = cache.load_patterns(key) if cache else None
+        if patterns is not None:
+            stats = cache.pattern_stats(key)
+            print(f"Reusing mined patterns {key[:12]}.")
+        else:
+            stats = {}
+            with report.stage("prefixspan") as st:
+                patterns = prefixspan(store, minsup_ratio=minsup, maxlen=maxlen, workers=args.workers, stats=stats,
+                                      mode=args.pattern_mode, max_gap=args.max_gap, max_window=args.max_window)
+                st["n_patterns"] = len(patterns)
+            if cache:
+                cache.save_patterns(key, patterns, stats)
+        report.add("prefixspan", stats)
+        return patterns
 
-    scores = score_patterns(seqs, grids, patterns, xt_grid=np.array(xt_grid))
+    if args.sweep_minsup or args.sweep_maxlen or args.sweep_top_k:
+        # mine once at the loosest setting, score once, filter per configuration
+        minsups = parse_values(args.sweep_minsup, float) if args.sweep_minsup else [args.minsup]
+        maxlens = parse_values(args.sweep_maxlen, int) if args.sweep_maxlen else [args.maxlen]
+        top_ks = parse_values(args.sweep_top_k, int) if args.sweep_top_k else [args.top_k]
+        # closed sets (and the kept rules) filter down by minsup and maxlen, maximal sets only by maxlen
+        # (a pattern can become maximal at a higher minsup), so maximal mode mines once per minsup
+        if args.pattern_mode == "maximal":
+            groups = [([ms], maxlens) for ms in minsups]
+        else:
+            groups = [(minsups, maxlens)]
+        mined, support = [], {}
+        for g_minsups, g_maxlens in groups:
+            loosest = 0 if 0 in g_maxlens else max(g_maxlens)
+            patterns = _mine(min(g_minsups), loosest)
+            print(f"Mined {len(patterns)} patterns with minsup={min(g_minsups)}, maxlen={loosest}.")
+            mined.append((patterns, g_minsups, g_maxlens))
+            support.update((tuple(p), s) for p, s in patterns)
+        union = [(list(p), s) for p, s in sorted(support.items(), key=lambda x: (-x[1], x[0]))]
+        with report.stage("score_patterns") as st:
+            scores = score_patterns_index(index, union)
+            st["n_rules"] = len(scores)
+        with report.stage("sweep") as st:
+            table = pd.concat([sweep_table(p, scores, len(store), g_minsups, g_maxlens, top_ks, min_lift=args.min_lift)
+                               for p, g_minsups, g_maxlens in mined], ignore_index=True)
+            st["n_configs"], st["n_rows"] = len(minsups) * len(maxlens) * len(top_ks), len(table)
+        out_csv = os.path.join(args.output_dir, "sweep.csv")
+        table.to_csv(out_csv, index=False)
+        print(f"Saved {len(minsups) * len(maxlens) * len(top_ks)} configurations to {out_csv}")
+        return
+    if args.score_during_mining:
+        with report.stage("mine_and_score") as st:
+            scores = mine_and_score(store, None, None, minsup_ratio=args.minsup, maxlen=args.maxlen,
+                                    min_lift=args.min_lift, top_k=args.top_k, index=index)
+            st["n_rules"] = len(scores)
+        print(f"Mined and scored {len(scores)} rules with minsup={args.minsup}"
+              f"{' (single process; --workers only applies to preprocessing and plots here)' if args.workers > 1 else ''}.")
+    else:
+        patterns = _mine(args.minsup, args.maxlen)
+        print(f"Mined {len(patterns)} {args.pattern_mode} patterns with minsup={args.minsup}.")
+        writer = None
+        if args.full_results:
+            # every rule row streamed to disk; only the top_k are kept in memory
+            path = os.path.join(args.output_dir, args.full_results)
+            writer = ResultWriter(path, fmt="parquet" if path.endswith(".parquet") else "csv",
+                                  memmap_dir=os.path.splitext(path)[0] + "_columns" if args.memmap_results else None)
+        with report.stage("score_patterns") as st:
+            try:
+                scores, st["n_rules"] = stream_top_k(iter_scores(index, patterns), args.top_k, args.min_lift, writer)
+            finally:
+                if writer is not None:
+                    writer.close()
+        if writer is not None:
+            print(f"Saved all {writer.n_rows} rules to {writer.path}")
     df = pd.DataFrame(scores)
     if len(df) == 0:
         print("No patterns met the criteria. Try lowering minsup or increasing maxlen.")
         return
 
     df_top = df.head(args.top_k)
+    if ens is not None:
+        # ΔxT intervals of the reported rules under the bootstrap xT grids (same matched steps)
+        r = ens[(args.grid_x, args.grid_y)]
+        iv = pattern_dxt_intervals(index, store.cells, [(p.split(), 0) for p in df_top["pattern"]], r["samples"],
+                                   ci=args.xt_ci)
+        df_top = df_top.merge(iv, on="pattern", how="left")
     out_csv = os.path.join(args.output_dir, "patterns.csv")
     df_top.to_csv(out_csv, index=False)
     print(f"Saved top patterns to {out_csv}")
 
-    os.makedirs(os.path.join(args.output_dir, "plots"), exist_ok=True)
-    count = 0
-    for _, row in df_top.head(5).iterrows():
-        pat = row["pattern"].split()
-        for s, g in zip(seqs, grids):
-            idxs = []
-            i = 0
-            for j, tok in enumerate(s):
-                if tok == pat[i]:
-                    idxs.append(j)
-                    i += 1
-                    if i == len(pat):
-                        break
-            if i == len(pat):
-                grids_sub = [g[k] for k in idxs]
-                tokens_sub = [s[k] for k in idxs]
-                save_path = os.path.join(args.output_dir, f"plots/pattern_{count + 1}.png")
-                plot_example_path(xt_grid, grids_sub, tokens_sub, save_path, title=row["pattern"])
-                count += 1
-                break
-        if count >= 5:
-            break
+    with report.stage("occurrences") as st:
+        occ = OccurrenceIndex(index, df_top["pattern"].tolist())
+        if args.export_occurrences:
+            occ_csv = os.path.join(args.output_dir, "occurrences.csv")
+            occ.to_csv(occ_csv, store)
+            print(f"Saved pattern occurrences to {occ_csv}")
+        st["n_patterns"] = len(occ)
+
+    with report.stage("plots") as st:
+        plot_dir = os.path.join(args.output_dir, "plots")
+        examples = []
+        for k, pat in enumerate(df_top["pattern"].head(args.plot_top)):
+            for j, (_, flat) in enumerate(occ.examples(pat, args.plot_examples)):
+                tokens_sub, grids_sub = store.take(flat)
+                name = f"pattern_{k + 1}.png" if args.plot_examples == 1 else f"pattern_{k + 1}_{j + 1}.png"
+                examples.append((grids_sub, tokens_sub, pat, name))
+        out = {"png": plot_dir, "pdf": os.path.join(plot_dir, "patterns.pdf"),
+               "sheet": os.path.join(plot_dir, "patterns_sheet.png")}[args.plot_mode]
+        written = render_examples(xt_grid, examples, out, mode=args.plot_mode, workers=args.workers,
+                                  dpi=args.plot_dpi)
+        st["n_plots"] = len(examples)
+    print(f"Rendered {len(examples)} example plots to {out if written and args.plot_mode != 'png' else plot_dir}")
 
 
 if __name__ == "__main__":
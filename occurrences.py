@@ -0,0 +1,58 @@
+from typing import List, Tuple, Dict, Iterable
+import numpy as np
+import pandas as pd
+
+from .seq_index import SequenceIndex
+from .store import SequenceStore
+
+
+class OccurrenceIndex:
+    '''
+    Where each reported pattern occurs: the ids of the sequences containing it and the flat positions of
+    its greedy leftmost match (SequenceIndex.match_positions, the same matching the plots always used).
+    Built once after ranking from the index used for scoring, so only reported patterns are stored and
+    looking up examples is a dict access plus a slice instead of a rescan of the database.
+    '''
+
+    def __init__(self, index: SequenceIndex, patterns: Iterable[str]):
+        self.offsets = index.offsets
+        self.patterns: List[str] = []
+        self._occ: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for pat in patterns:
+            if pat in self._occ:
+                continue
+            self.patterns.append(pat)
+            self._occ[pat] = index.match_positions(pat.split())
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def count(self, pattern: str) -> int:
+        return len(self._occ[pattern][0])
+
+    def examples(self, pattern: str, n: int = 1) -> List[Tuple[int, np.ndarray]]:
+        '''Up to n (sequence id, flat positions) occurrences of pattern, in sequence order.'''
+        sids, pos = self._occ[pattern]
+        return list(zip(sids[:n].tolist(), pos[:n]))
+
+    def to_frame(self, pattern: str, store: SequenceStore = None) -> pd.DataFrame:
+        '''
+        One row per occurrence: sequence id, step positions within the sequence and, with a store, the
+        match id and event indices of the matched steps (-1 where the store does not know them).
+        '''
+        sids, pos = self._occ[pattern]
+        steps = pos - self.offsets[sids][:, None]
+        df = pd.DataFrame({"pattern": pattern, "seq_id": sids,
+                           "steps": [" ".join(map(str, r)) for r in steps.tolist()]})
+        if store is not None:
+            df["match_id"] = store.seq_match[sids]
+            df["event_index"] = [" ".join(map(str, r)) for r in store.event_idx[pos].tolist()]
+        return df
+
+    def to_csv(self, path: str, store: SequenceStore = None):
+        '''Write every occurrence of every pattern, pattern by pattern, to one CSV.'''
+        header = True
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            for pat in self.patterns:
+                self.to_frame(pat, store).to_csv(f, index=False, header=header)
+                header = False
@@ -0,0 +1,61 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Tuple
+import numpy as np
+
+from .event_cache import load_match_columns, TYPE_CODES
+from .xt_model import XTModel, batch_counts, KIND_ENTRY, KIND_MOVE, KIND_SHOT
+from .sequences import build_sequence_store
+from .store import SequenceStore
+
+
+def xt_columns_from_cache(cols):
+    '''event_cache columns of one match -> add_batch arrays, fully vectorized.'''
+    has_loc = ~np.isnan(cols["x"])
+    typ = cols["type"][has_loc]
+    has_end = ~np.isnan(cols["end_x"][has_loc])
+    move = has_end & (((typ == TYPE_CODES["Pass"]) & cols["pass_ok"][has_loc]) | (typ == TYPE_CODES["Carry"]))
+    kind = np.full(len(typ), KIND_ENTRY, dtype=np.int8)
+    kind[move] = KIND_MOVE
+    kind[typ == TYPE_CODES["Shot"]] = KIND_SHOT
+    return (cols["x"][has_loc], cols["y"][has_loc], cols["end_x"][has_loc], cols["end_y"][has_loc], kind,
+            cols["xg"][has_loc])
+
+
+def map_match(data_dir: str, match_id, nx: int, ny: int) -> Dict[str, Any]:
+    '''
+    Everything one match contributes, computed from its cached columns alone: partial xT counts
+    (xt_model.batch_counts) and the match's sequences as a SequenceStore.
+    '''
+    cols = load_match_columns(data_dir, match_id)
+    counts = batch_counts(*xt_columns_from_cache(cols), nx, ny)
+    store = build_sequence_store([(match_id, cols)], (nx, ny))
+    return {"match_id": match_id, "counts": counts, "store": store}
+
+
+def _map_match(args):
+    return map_match(*args)
+
+
+def preprocess_matches(data_dir: str, matches: List[Dict[str, Any]], nx: int, ny: int, workers: int = 1,
+                       solver: str = "dense", gamma: float = 1.0) -> Tuple[XTModel, SequenceStore]:
+    '''
+    Map every match through map_match (in a process pool when workers > 1) and reduce the partials in
+    match order into an unfitted XTModel and one SequenceStore. Counts are integers and shot xG is added
+    shot by shot, so the result is bit-identical for any worker count.
+    '''
+    xt = XTModel(nx=nx, ny=ny, gamma=gamma, tol=1e-6, max_iter=500, solver=solver)
+    stores = []
+    jobs = [(data_dir, m["match_id"], nx, ny) for m in matches]
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        parts = pool.map(_map_match, jobs, chunksize=max(1, len(jobs) // (8 * workers)))
+    else:
+        pool, parts = None, map(_map_match, jobs)
+    try:
+        for part in parts:
+            xt.add_counts(part["counts"])
+            stores.append(part["store"])
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return xt, SequenceStore.concat(stores, (nx, ny))
@@ -1,5 +1,9 @@
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Union
 from collections import defaultdict
+import numpy as np
+
+from .store import SequenceStore
+from .utils import is_target_token
 
 
 def _project_db(seqs: List[List[str]], occs: List[int], prefix: List[str]):
@@ -33,9 +37,461 @@ def _freq_items(seqs: List[List[str]], ids: List[int], pos: List[int], minsup: i
     return [(it, c) for it, c in counts.items() if c >= minsup]
 
 
-def prefixspan(seqs: List[List[str]], minsup_ratio: float, maxlen: int = 5):
+def encode_sequences(seqs: List[List[str]]) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    '''
+    Encode token sequences into (vocab, items, offsets).
+      vocab:   sorted token list, so integer order matches string order
+      items:   flat array of token ids, all sequences back to back
+      offsets: int64 array of length len(seqs)+1; sequence i is items[offsets[i]:offsets[i+1]]
+    '''
+    vocab = sorted({tok for s in seqs for tok in s})
+    code = {tok: i for i, tok in enumerate(vocab)}
+    dtype = np.uint16 if len(vocab) < 2 ** 16 else np.int32
+    lengths = np.fromiter((len(s) for s in seqs), dtype=np.int64, count=len(seqs))
+    offsets = np.zeros(len(seqs) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    items = np.fromiter((code[tok] for s in seqs for tok in s), dtype=dtype, count=int(offsets[-1]))
+    return vocab, items, offsets
+
+
+def _prev_occurrence(items: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    '''For each flat position, the flat position of the previous occurrence of the same item in the same sequence, else -1.'''
+    M = len(items)
+    seq_of = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    order = np.lexsort((np.arange(M), items))
+    prev = np.full(M, -1, dtype=np.int64)
+    if M > 1:
+        same = (items[order[1:]] == items[order[:-1]]) & (seq_of[order[1:]] == seq_of[order[:-1]])
+        prev[order[1:][same]] = order[:-1][same]
+    return prev
+
+
+def _expand_suffixes(starts: np.ndarray, ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    '''Flatten the ranges [starts[r], ends[r]) into (row, position) arrays.'''
+    lens = ends - starts
+    total = int(lens.sum())
+    rows = np.repeat(np.arange(len(starts)), lens)
+    first = np.cumsum(lens) - lens
+    pos = starts[rows] + (np.arange(total) - first[rows])
+    return rows, pos
+
+
+STAT_KEYS = ("nodes_expanded", "projections", "projected_entries", "positions_scanned", "items_pruned",
+             "subtrees_pruned")
+MODES = ("all", "closed", "maximal")
+
+
+def _new_stats() -> Dict[str, int]:
+    return dict.fromkeys(STAT_KEYS, 0)
+
+
+class _PeriodCheck:
+    '''
+    BIDE backward-extension checks for a prefix, from the flat positions of its first instance in every
+    supporting sequence (firsts, one column per prefix item). The i-th maximum period of a sequence lies
+    strictly between the first instance of prefix[:i] and the last-in-last appearance of prefix[i]; an
+    item e in it means prefix[:i] + (e,) + prefix[i:] occurs in that sequence, so the number of periods
+    containing e is that super-pattern's support. Semi-maximum periods end at the last-in-first
+    appearance instead and drive BackScan pruning.
+    '''
+
+    def __init__(self, items: np.ndarray, offsets: np.ndarray, prev: np.ndarray):
+        self.items, self.offsets, self.prev = items, offsets, prev
+        n_items = int(items.max()) + 1 if len(items) else 0
+        order = np.argsort(items, kind="stable")
+        bounds = np.concatenate(([0], np.cumsum(np.bincount(items, minlength=n_items))))
+        self.positions = [order[bounds[t]:bounds[t + 1]] for t in range(n_items)]
+
+    def has_insertion(self, prefix: Tuple[int, ...], sids: np.ndarray, firsts: np.ndarray, semi: bool,
+                      need: int) -> bool:
+        '''Whether some item occurs in the i-th (semi-)maximum period of at least need sequences, for some i.'''
+        if semi:
+            anchor = firsts[:, -1]
+        else:
+            P = self.positions[prefix[-1]]
+            anchor = P[np.searchsorted(P, self.offsets[sids + 1]) - 1]
+        for i in range(len(prefix) - 1, -1, -1):
+            lo = firsts[:, i - 1] + 1 if i > 0 else self.offsets[sids]
+            if np.count_nonzero(anchor > lo) >= need:
+                rows, j = _expand_suffixes(lo, anchor)
+                j = j[self.prev[j] < lo[rows]]
+                if len(j) and np.bincount(self.items[j]).max() >= need:
+                    return True
+            if i > 0:
+                P = self.positions[prefix[i - 1]]
+                anchor = P[np.searchsorted(P, anchor) - 1]
+        return False
+
+
+def _grow_encoded(items: np.ndarray, ends: np.ndarray, prev: np.ndarray, minsup: int, maxlen: int,
+                  prefix: Tuple[int, ...], sids: np.ndarray, pos: np.ndarray, results: list,
+                  stats: Dict[str, int] = None, mode: str = "all", check: _PeriodCheck = None,
+                  firsts: np.ndarray = None, rule_items: np.ndarray = None):
+    '''
+    Depth-first PrefixSpan from one node. For mode "closed" / "maximal", check and firsts (first-instance
+    positions of prefix, see _PeriodCheck) are required and only closed / maximal patterns are reported,
+    plus, if rule_items (bool per item id) is given, every frequent prefix + (t,) with rule_items[t] whose
+    prefix is closed. Closedness is judged against all super-patterns, also those longer than maxlen, so
+    nodes of length maxlen are scanned (not grown) and BackScan pruning is sound for any maxlen.
+    '''
+    n_items = int(items.max()) + 1 if len(items) else 0
+    st = stats if stats is not None else _new_stats()
+    condensed = mode != "all"
+    if rule_items is not None:
+        rule_items = np.asarray(rule_items, dtype=bool)[:n_items]
+
+    def _grow(prefix: Tuple[int, ...], sids: np.ndarray, pos: np.ndarray, firsts: np.ndarray, kept: bool = False):
+        # kept: already reported by the parent as a rule with a closed antecedent
+        n, m = len(prefix), len(sids)
+        if not condensed and n > 0:
+            results.append((prefix, m))
+        if condensed and n > 0 and check.has_insertion(prefix, sids, firsts, True, m):
+            st["subtrees_pruned"] += 1
+            return
+        if n >= maxlen and not condensed:
+            return
+        st["nodes_expanded"] += 1
+        rows, j = _expand_suffixes(pos, ends[sids])
+        st["positions_scanned"] += len(j)
+        # only the first occurrence of an item in each suffix counts towards support / projection
+        keep = prev[j] < pos[rows]
+        rows, j = rows[keep], j[keep]
+        it = items[j]
+        counts = np.bincount(it, minlength=n_items)
+        frequent = counts >= minsup
+        st["items_pruned"] += int(np.count_nonzero(counts)) - int(np.count_nonzero(frequent))
+        rules = None
+        if condensed and n > 0:
+            closed = None
+            if mode == "closed":
+                closed = report = (not (counts == m).any()
+                                   and not check.has_insertion(prefix, sids, firsts, False, m))
+            else:
+                report = not frequent.any() and not check.has_insertion(prefix, sids, firsts, False, minsup)
+            if n < maxlen and rule_items is not None and (frequent & rule_items).any():
+                if closed is None:
+                    closed = not (counts == m).any() and not check.has_insertion(prefix, sids, firsts, False, m)
+                if closed:
+                    rules = frequent & rule_items
+            if report and not kept:
+                results.append((prefix, m))
+        if n >= maxlen or not frequent.any():
+            return
+        sel = frequent[it]
+        rows, j, it = rows[sel], j[sel], it[sel]
+        order = np.argsort(it, kind="stable")
+        rows, j = rows[order], j[order]
+        freq_ids = np.flatnonzero(frequent)
+        bounds = np.concatenate(([0], np.cumsum(counts[freq_ids])))
+        st["projections"] += len(freq_ids)
+        st["projected_entries"] += int(bounds[-1])
+        for k, t in enumerate(freq_ids):
+            lo, hi = bounds[k], bounds[k + 1]
+            r = rows[lo:hi]
+            child_firsts = np.column_stack((firsts[r], j[lo:hi])) if condensed else None
+            rule = rules is not None and bool(rules[t])
+            if rule:
+                results.append((prefix + (int(t),), int(counts[t])))
+            _grow(prefix + (int(t),), sids[r], j[lo:hi] + 1, child_firsts, rule)
+
+    _grow(prefix, sids, pos, firsts)
+    return results
+
+
+def _dedupe_embeddings(t: np.ndarray, starts: np.ndarray, ends: np.ndarray):
+    '''
+    Order candidate embeddings by (item, end) and keep one per (item, end): the latest start, which
+    leaves the most room under a time window. Returns the kept indices.
+    '''
+    order = np.lexsort((-starts, ends, t))
+    t, e = t[order], ends[order]
+    keep = np.ones(len(order), dtype=bool)
+    keep[1:] = (t[1:] != t[:-1]) | (e[1:] != e[:-1])
+    return order[keep]
+
+
+def _grow_constrained(items: np.ndarray, seq_end: np.ndarray, times: np.ndarray, minsup: int, maxlen: int,
+                      max_gap: float, max_window: float, prefix: Tuple[int, ...], sids: np.ndarray,
+                      starts: np.ndarray, ends: np.ndarray, results: list, stats: Dict[str, int] = None):
+    '''
+    Depth-first PrefixSpan under gap / time-window constraints from one node. A constrained match cannot
+    be represented by its leftmost end alone (a later end may be the only one that can still be extended
+    within max_gap), so the projected database holds every embedding end of the prefix, with the latest
+    start reaching it, as parallel arrays (sids, starts, ends) sorted by end. Extensions are only looked
+    for in (end, end + max_gap] and within max_window seconds of the start, so infeasible extensions are
+    never counted or projected. Support is the number of distinct sequences.
+    '''
+    n_items = int(items.max()) + 1 if len(items) else 0
+    n_seqs = len(seq_end)
+    st = stats if stats is not None else _new_stats()
+    windowed = max_window != float("inf")
+
+    def _grow(prefix: Tuple[int, ...], sids: np.ndarray, starts: np.ndarray, ends: np.ndarray, m: int):
+        results.append((prefix, m))
+        if len(prefix) >= maxlen:
+            return
+        st["nodes_expanded"] += 1
+        hi = seq_end[sids]
+        if max_gap != float("inf"):
+            hi = np.minimum(hi, ends + 1 + int(max_gap))
+        rows, j = _expand_suffixes(ends + 1, hi)
+        st["positions_scanned"] += len(j)
+        if windowed:
+            ok = times[j] - times[starts[rows]] <= max_window
+            rows, j = rows[ok], j[ok]
+        it = items[j].astype(np.int64)
+        # support counts each (item, sequence) pair once
+        pairs = np.unique(it * n_seqs + sids[rows])
+        counts = np.bincount(pairs // n_seqs, minlength=n_items)
+        frequent = counts >= minsup
+        st["items_pruned"] += int(np.count_nonzero(counts)) - int(np.count_nonzero(frequent))
+        if not frequent.any():
+            return
+        sel = frequent[it]
+        rows, j, it = rows[sel], j[sel], it[sel]
+        keep = _dedupe_embeddings(it, starts[rows], j)
+        rows, j, it = rows[keep], j[keep], it[keep]
+        freq_ids = np.flatnonzero(frequent)
+        bounds = np.searchsorted(it, np.append(freq_ids, n_items))
+        st["projections"] += len(freq_ids)
+        st["projected_entries"] += len(j)
+        for k, t in enumerate(freq_ids):
+            lo, hi_k = bounds[k], bounds[k + 1]
+            r = rows[lo:hi_k]
+            _grow(prefix + (int(t),), sids[r], starts[r], j[lo:hi_k], int(counts[t]))
+
+    _grow(prefix, sids, starts, ends, len(np.unique(sids)))
+    return results
+
+
+def _first_item_embeddings(items: np.ndarray, offsets: np.ndarray, t: int):
+    '''Every occurrence of item t as a one-item embedding (sids, starts, ends).'''
+    j = np.flatnonzero(items == t)
+    sids = np.searchsorted(offsets, j, side="right") - 1
+    return sids, j, j
+
+
+def _first_item_projection(items: np.ndarray, offsets: np.ndarray, prev: np.ndarray, t: int):
+    '''Projected database of the 1-item prefix (t,): first occurrence of t in every sequence.'''
+    j = np.flatnonzero((items == t) & (prev < 0))
+    sids = np.searchsorted(offsets, j, side="right") - 1
+    return sids, j + 1
+
+
+# per-process views of the shared database, set up by _attach_shared
+_SHARED = {}
+
+
+def _attach_shared(specs, minsup: int, maxlen: int, mode: str = "all", constraints: Tuple[float, float] = None,
+                   rule_items: np.ndarray = None):
+    from multiprocessing import shared_memory
+    for name, (shm_name, shape, dtype) in specs.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _SHARED[name + "_shm"] = shm
+        _SHARED[name] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    _SHARED["minsup"] = minsup
+    _SHARED["maxlen"] = maxlen
+    _SHARED["mode"] = mode
+    _SHARED["constraints"] = constraints
+    _SHARED["rule_items"] = rule_items
+    if mode != "all":
+        _SHARED["check"] = _PeriodCheck(_SHARED["items"], _SHARED["offsets"], _SHARED["prev"])
+
+
+def _mine_first_item(t: int):
+    items, offsets, prev = _SHARED["items"], _SHARED["offsets"], _SHARED["prev"]
+    if _SHARED["constraints"] is not None:
+        max_gap, max_window = _SHARED["constraints"]
+        stats = _new_stats()
+        sids, starts, ends = _first_item_embeddings(items, offsets, t)
+        found = _grow_constrained(items, offsets[1:], _SHARED.get("times"), _SHARED["minsup"], _SHARED["maxlen"],
+                                  max_gap, max_window, (t,), sids, starts, ends, [], stats)
+        return found, stats
+    sids, pos = _first_item_projection(items, offsets, prev, t)
+    stats = _new_stats()
+    mode = _SHARED["mode"]
+    firsts = (pos - 1)[:, None] if mode != "all" else None
+    found = _grow_encoded(items, offsets[1:], prev, _SHARED["minsup"], _SHARED["maxlen"],
+                          (t,), sids, pos, [], stats, mode, _SHARED.get("check"), firsts, _SHARED["rule_items"])
+    return found, stats
+
+
+def _prefixspan_parallel(items: np.ndarray, offsets: np.ndarray, prev: np.ndarray, minsup: int, maxlen: int,
+                         workers: int, stats: Dict[str, int] = None, mode: str = "all",
+                         constraints: Tuple[float, float] = None, times: np.ndarray = None,
+                         rule_items: np.ndarray = None):
+    '''
+    Split the search by first item and mine each subtree in a process pool. The encoded database
+    lives in shared memory and is attached read-only by every worker instead of being pickled.
+    constraints: (max_gap, max_window) to mine with _grow_constrained (times needed for a finite window).
+    '''
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import shared_memory
+
+    counts = np.bincount(items[prev < 0], minlength=int(items.max()) + 1)
+    firsts = [int(t) for t in np.argsort(-counts, kind="stable") if counts[t] >= minsup]
+    if stats is not None and maxlen >= 1:
+        # the root node, expanded here rather than in a worker
+        stats["nodes_expanded"] += 1
+        stats["positions_scanned"] += len(items)
+        stats["items_pruned"] += int(np.count_nonzero(counts)) - len(firsts)
+        stats["projections"] += len(firsts)
+        # constrained projections hold every occurrence, unconstrained ones the first per sequence
+        sizes = np.bincount(items, minlength=len(counts)) if constraints is not None else counts
+        stats["projected_entries"] += int(sum(sizes[t] for t in firsts))
+    if maxlen < 1 or not firsts:
+        return []
+
+    blocks, specs = [], {}
+    try:
+        arrays = [("items", items), ("offsets", offsets), ("prev", prev)]
+        if times is not None:
+            arrays.append(("times", times))
+        for name, arr in arrays:
+            shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+            blocks.append(shm)
+            np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[:] = arr
+            specs[name] = (shm.name, arr.shape, arr.dtype)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach_shared,
+                                 initargs=(specs, minsup, maxlen, mode, constraints, rule_items)) as pool:
+            # largest subtrees are submitted first; results are merged in a fixed order
+            parts = list(pool.map(_mine_first_item, firsts))
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+    if stats is not None:
+        for _, st in parts:
+            for k in STAT_KEYS:
+                stats[k] += st[k]
+    return [r for part, _ in parts for r in part]
+
+
+def prefixspan_constrained(items: np.ndarray, offsets: np.ndarray, minsup: int, maxlen: int = 5,
+                           max_gap: float = float("inf"), max_window: float = float("inf"), times: np.ndarray = None,
+                           workers: int = 1, stats: Dict[str, int] = None):
+    '''
+    PrefixSpan over an encoded database where consecutive pattern items are at most max_gap steps apart
+    (1 = adjacent steps) and the whole pattern spans at most max_window seconds of times (one timestamp
+    per step, NaN steps cannot be linked under a window). Constraints are enforced during projection
+    (see _grow_constrained). Without constraints the result equals prefixspan_encoded's.
+    Returns [(pattern_ids_tuple, support)], unsorted; workers and stats as for prefixspan_encoded.
+    '''
+    if max_window != float("inf") and times is None:
+        raise ValueError("max_window needs per-step times")
+    prev = _prev_occurrence(items, offsets)
+    if stats is not None:
+        for k in STAT_KEYS:
+            stats.setdefault(k, 0)
+    times = None if max_window == float("inf") else np.asarray(times, dtype=np.float64)
+    if workers > 1 and len(items):
+        return _prefixspan_parallel(items, offsets, prev, minsup, maxlen, workers, stats,
+                                    constraints=(max_gap, max_window), times=times)
+    results = []
+    counts = np.bincount(items[prev < 0], minlength=int(items.max()) + 1) if len(items) else np.zeros(0, int)
+    st = stats if stats is not None else _new_stats()
+    if maxlen < 1:
+        return results
+    frequent = [int(t) for t in np.flatnonzero(counts >= minsup)]
+    st["nodes_expanded"] += 1
+    st["positions_scanned"] += len(items)
+    st["items_pruned"] += int(np.count_nonzero(counts)) - len(frequent)
+    st["projections"] += len(frequent)
+    for t in frequent:
+        sids, starts, ends = _first_item_embeddings(items, offsets, t)
+        st["projected_entries"] += len(ends)
+        _grow_constrained(items, offsets[1:], times, minsup, maxlen, max_gap, max_window, (t,), sids, starts, ends,
+                          results, st)
+    return results
+
+
+def prefixspan_encoded(items: np.ndarray, offsets: np.ndarray, minsup: int, maxlen: int = 5, workers: int = 1,
+                       stats: Dict[str, int] = None, mode: str = "all", rule_items: np.ndarray = None):
+    '''
+    PrefixSpan over an encoded database (see encode_sequences).
+    Projected databases are pseudo-projections: parallel arrays of sequence ids and flat suffix
+    start positions, never copies of the sequences. Returns [(pattern_ids_tuple, support)], unsorted.
+      workers: >1 mines each first-item subtree in a separate process
+      stats:   optional dict, incremented with the search counters in STAT_KEYS (nodes expanded,
+               child projections built and their total size, suffix positions scanned, items
+               seen in a projection but pruned as infrequent, subtrees cut by BackScan)
+      mode:    "all" every frequent pattern; "closed" only patterns with no one-item-longer super-pattern
+               of equal support; "maximal" only patterns with no frequent one-item-longer super-pattern.
+               Super-patterns of any length count, so the result is the unbounded closed / maximal set
+               restricted to length <= maxlen; BackScan prunes subtrees that hold no closed pattern.
+      rule_items: optional bool array over item ids; in the condensed modes every frequent pattern
+               prefix + (t,) with rule_items[t] and a closed prefix is reported as well, so the rules
+               antecedent -> t of closed antecedents all survive the condensation.
+    '''
+    if mode not in MODES:
+        raise ValueError(f"Unknown pattern mode: {mode}")
+    prev = _prev_occurrence(items, offsets)
+    if stats is not None:
+        for k in STAT_KEYS:
+            stats.setdefault(k, 0)
+    if workers > 1 and len(items):
+        return _prefixspan_parallel(items, offsets, prev, minsup, maxlen, workers, stats, mode,
+                                    rule_items=rule_items)
+    N = len(offsets) - 1
+    check = _PeriodCheck(items, offsets, prev) if mode != "all" else None
+    firsts = np.zeros((N, 0), dtype=np.int64) if mode != "all" else None
+    return _grow_encoded(items, offsets[1:], prev, minsup, maxlen,
+                         (), np.arange(N, dtype=np.int64), offsets[:-1].copy(), [], stats, mode, check, firsts,
+                         rule_items)
+
+
+def prefixspan(seqs: Union[List[List[str]], SequenceStore], minsup_ratio: float, maxlen: int = 5,
+               engine: str = "numpy", workers: int = 1, stats: Dict[str, int] = None, mode: str = "all",
+               max_gap: int = 0, max_window: float = 0, keep_rules: bool = True):
+    '''
+    Mine frequent sequential patterns. Returns [(pattern_tokens, support_count)] sorted by
+    (-support, pattern).
+      engine: "numpy" mines an integer-encoded flat database with pseudo-projection;
+              "python" is the original list-of-strings reference implementation.
+      workers: number of processes for the numpy engine (split by first item); output is unchanged.
+    seqs may be token lists or a SequenceStore, which the numpy engine mines without re-encoding.
+    stats: optional dict filled with the numpy engine's search counters (see prefixspan_encoded).
+    mode: "all", "closed" or "maximal" (numpy engine only, see prefixspan_encoded); maxlen <= 0 means
+          no length limit. With keep_rules, the condensed modes also keep every frequent target-ending
+          pattern (utils.is_target_token) whose antecedent is closed: score_patterns then gives exactly
+          the rows of mode "all" for those rules, instead of dropping rules whose pattern is not closed.
+    max_gap: max steps between consecutive pattern items (1 = adjacent), max_window: max seconds between
+          the first and last item (needs a SequenceStore, whose step timestamps are used); 0 = unconstrained.
+          Numpy engine and mode "all" only (see prefixspan_constrained).
+    '''
     N = len(seqs)
     minsup = max(1, int(minsup_ratio * N + 1e-9))
+    if maxlen <= 0:
+        maxlen = float("inf")
+    constrained = max_gap > 0 or max_window > 0
+    if constrained and (engine != "numpy" or mode != "all"):
+        raise ValueError("max_gap / max_window need engine='numpy' and mode='all'")
+    if max_window > 0 and not isinstance(seqs, SequenceStore):
+        raise ValueError("max_window needs a SequenceStore (for the step timestamps)")
+    if engine == "numpy":
+        if isinstance(seqs, SequenceStore):
+            vocab, items, offsets = seqs.vocab, seqs.items, seqs.offsets
+        else:
+            vocab, items, offsets = encode_sequences(seqs)
+        if constrained:
+            found = prefixspan_constrained(items, offsets, minsup, maxlen, max_gap if max_gap > 0 else float("inf"),
+                                           max_window if max_window > 0 else float("inf"),
+                                           seqs.times if max_window > 0 else None, workers=workers, stats=stats)
+        else:
+            rule_items = np.array([is_target_token(t) for t in vocab], dtype=bool) if keep_rules else None
+            found = prefixspan_encoded(items, offsets, minsup, maxlen, workers=workers, stats=stats, mode=mode,
+                                       rule_items=rule_items)
+        found.sort(key=lambda x: (-x[1], x[0]))
+        return [([vocab[t] for t in p], s) for p, s in found]
+    if engine != "python":
+        raise ValueError(f"Unknown PrefixSpan engine: {engine}")
+    if workers > 1:
+        raise ValueError("workers > 1 requires engine='numpy'")
+    if mode != "all":
+        raise ValueError(f"mode='{mode}' requires engine='numpy'")
+    if isinstance(seqs, SequenceStore):
+        seqs = list(seqs)
+
     results = []
 
     def _grow(prefix: List[str], ids: List[int], pos: List[int]):
@@ -0,0 +1,119 @@
+import argparse, json, threading, time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List, Dict, Any, Union
+from urllib.parse import urlparse, parse_qs
+
+from .seq_index import SequenceIndex
+from .scoring import _rule_steps, _row
+
+INDEX_FILE = "query_index.npz"
+
+
+class PatternQuery:
+    '''
+    Ad-hoc pattern lookups over a persisted SequenceIndex (written by main.py --query_index 1):
+
+      q = PatternQuery.from_file("outputs/query_index.npz")
+      q.query("PMF KSF SHOT")          # or q.query("PMF KSF", target="SHOT")
+
+    Rule metrics (support, confidence, lift, avg ΔxT) are computed exactly as score_patterns does, from
+    the same matching code, so a query returns the row score_patterns would give that pattern. The index
+    memoizes prefix matches (and, if constrained, embeddings); both are dropped once together they hold
+    more than max_cached prefixes.
+    '''
+
+    def __init__(self, index: SequenceIndex, max_cached: int = 100000):
+        self.index = index
+        self.max_cached = max_cached
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "PatternQuery":
+        return cls(SequenceIndex.load(path), **kwargs)
+
+    def query(self, pattern: Union[str, List[str]], target: str = None) -> Dict[str, Any]:
+        '''
+        n_sequences, the number of sequences containing pattern (+ target) as a subsequence, and, if it
+        ends in a target token (SHOT/GOAL/*_B), its rule row (None otherwise or without antecedent matches).
+        '''
+        pat = pattern.split() if isinstance(pattern, str) else list(pattern)
+        if target:
+            pat.append(target)
+        t0 = time.perf_counter()
+        index = self.index
+        with self._lock:
+            if len(index._matches) + len(index._embeds) > self.max_cached:
+                index.clear_cache()
+            n_containing = index.support(pat) if pat else 0
+            steps = _rule_steps(index, pat) if index.xt is not None else None
+        rule = None
+        if steps is not None:
+            N = index.n_seqs
+            n_ant, n_hit, to, frm = steps
+            rule = _row(pat, N, n_hit, n_ant, float(index.target_any.sum()) / N, index.xt[to] - index.xt[frm])
+        return {"pattern": " ".join(pat), "n_sequences": index.n_seqs, "sequence_support": n_containing,
+                "unknown_tokens": [t for t in pat if t not in index.code], "rule": rule,
+                "ms": (time.perf_counter() - t0) * 1e3}
+
+
+def _handler(q: PatternQuery):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, code: int, body: Dict[str, Any]):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            if url.path == "/query":
+                if not params.get("pattern"):
+                    self._send(400, {"error": "missing ?pattern="})
+                    return
+                self._send(200, q.query(params["pattern"], params.get("target")))
+            elif url.path == "/vocab":
+                self._send(200, {"vocab": q.index.vocab})
+            elif url.path == "/health":
+                self._send(200, {"n_sequences": q.index.n_seqs, "n_steps": len(q.index.items)})
+            else:
+                self._send(404, {"error": "use /query?pattern=PMF+KSF+SHOT, /vocab or /health"})
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+
+def serve(q: PatternQuery, host: str = "127.0.0.1", port: int = 8765):
+    '''Blocking local HTTP server: GET /query?pattern=PMF+KSF&target=SHOT returns PatternQuery.query as JSON.'''
+    server = ThreadingHTTPServer((host, port), _handler(q))
+    print(f"Serving pattern queries on http://{host}:{server.server_address[1]}/query?pattern=...")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Look up pattern support / confidence / lift / ΔxT in a saved index")
+    ap.add_argument("patterns", nargs="*", help='patterns to look up, e.g. "PMF KSF SHOT"')
+    ap.add_argument("--index", default=f"outputs/{INDEX_FILE}", help="index written by main.py --query_index 1")
+    ap.add_argument("--target", default="", help="append this target token to every pattern (e.g. SHOT)")
+    ap.add_argument("--serve", type=int, default=0, help="port to serve HTTP queries on (0 = just answer patterns)")
+    ap.add_argument("--host", default="127.0.0.1")
+    args = ap.parse_args()
+
+    q = PatternQuery.from_file(args.index)
+    for pat in args.patterns:
+        print(json.dumps(q.query(pat, args.target or None)))
+    if args.serve:
+        serve(q, args.host, args.serve)
+
+
+if __name__ == "__main__":
+    main()
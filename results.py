@@ -0,0 +1,155 @@
+import heapq, os
+from typing import List, Dict, Any, Iterable, Tuple
+import numpy as np
+
+# rule row columns in score_patterns order; the numeric ones can be kept as memory-mapped arrays
+COLUMNS = ("pattern", "length", "support", "support_count", "antecedent_count", "confidence", "lift", "avg_dxt",
+           "target")
+NUMERIC = {"length": np.int32, "support": np.float64, "support_count": np.int64, "antecedent_count": np.int64,
+           "confidence": np.float64, "lift": np.float64, "avg_dxt": np.float64}
+
+
+def rank_key(row: Dict[str, Any]):
+    '''Sort key of score_patterns' ranking (larger is better).'''
+    return row["lift"], row["confidence"], row["support"], row["avg_dxt"]
+
+
+class TopK:
+    '''
+    The k best rows by rank_key in O(k) memory (bounded min-heap). Among equal keys the earlier row wins,
+    so rows() equals the first k rows of the stable ranking of everything pushed. k <= 0 means no limit
+    (every row is kept), as for mine_and_score's top_k.
+    '''
+
+    def __init__(self, k: int):
+        self.k = k
+        self._heap = []
+        self.n_pushed = 0
+
+    def push(self, row: Dict[str, Any]):
+        item = (rank_key(row), -self.n_pushed, row)
+        self.n_pushed += 1
+        if self.k <= 0 or len(self._heap) < self.k:
+            heapq.heappush(self._heap, item)
+        elif item[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, item)
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def rows(self) -> List[Dict[str, Any]]:
+        return [r for *_, r in sorted(self._heap, key=lambda x: x[:2], reverse=True)]
+
+
+class ResultWriter:
+    '''
+    Streams rule rows to disk chunk_rows at a time, so the full rule set never sits in memory:
+      fmt="csv"      one CSV with a header, appended per chunk
+      fmt="parquet"  one Parquet file, one row group per chunk (needs pyarrow)
+    memmap_dir additionally appends each numeric column to <memmap_dir>/<column>.npy; after close(),
+    columns() maps them back as read-only arrays. Rows are written in the order they are produced.
+    '''
+
+    def __init__(self, path: str, fmt: str = "csv", chunk_rows: int = 100000, memmap_dir: str = None):
+        if fmt not in ("csv", "parquet"):
+            raise ValueError(f"Unknown result format: {fmt}")
+        self.path, self.fmt, self.chunk_rows, self.memmap_dir = path, fmt, chunk_rows, memmap_dir
+        self.n_rows = 0
+        self._buf: List[Dict[str, Any]] = []
+        self._parquet = None
+        self._started = False
+        self._raw = {}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if fmt == "csv":
+            open(path, "w", encoding="utf-8").close()
+        if memmap_dir:
+            os.makedirs(memmap_dir, exist_ok=True)
+            self._raw = {c: open(os.path.join(memmap_dir, f"{c}.bin"), "wb") for c in NUMERIC}
+
+    def write(self, row: Dict[str, Any]):
+        self._buf.append(row)
+        if len(self._buf) >= self.chunk_rows:
+            self.flush()
+
+    def write_many(self, rows: Iterable[Dict[str, Any]]):
+        for row in rows:
+            self.write(row)
+
+    def flush(self):
+        if not self._buf:
+            return
+        import pandas as pd
+        df = pd.DataFrame(self._buf, columns=list(COLUMNS))
+        self._write_frame(df)
+        for c, f in self._raw.items():
+            df[c].to_numpy(dtype=NUMERIC[c]).tofile(f)
+        self.n_rows += len(df)
+        self._buf = []
+
+    def _write_frame(self, df):
+        if self.fmt == "csv":
+            df.to_csv(self.path, mode="a", header=not self._started, index=False)
+        else:
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise ImportError("fmt='parquet' needs pyarrow (pip install pyarrow), or use fmt='csv'")
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+        self._started = True
+
+    def close(self):
+        self.flush()
+        if not self._started:
+            # no rows: still leave a readable file with the header / schema
+            import pandas as pd
+            self._write_frame(pd.DataFrame(columns=list(COLUMNS)))
+        if self._parquet is not None:
+            self._parquet.close()
+            self._parquet = None
+        for c, f in self._raw.items():
+            f.close()
+            # wrap the raw column in an .npy header so np.load(mmap_mode="r") works
+            src = os.path.join(self.memmap_dir, f"{c}.bin")
+            dst = np.lib.format.open_memmap(os.path.join(self.memmap_dir, f"{c}.npy"), mode="w+",
+                                            dtype=NUMERIC[c], shape=(self.n_rows,))
+            if self.n_rows:
+                dst[:] = np.memmap(src, dtype=NUMERIC[c], mode="r", shape=(self.n_rows,))
+            dst.flush()
+            del dst
+            os.remove(src)
+        self._raw = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        return load_columns(self.memmap_dir)
+
+
+def load_columns(memmap_dir: str) -> Dict[str, np.ndarray]:
+    '''Numeric rule columns written by ResultWriter(memmap_dir=...), memory-mapped read-only.'''
+    return {c: np.load(os.path.join(memmap_dir, f"{c}.npy"), mmap_mode="r") for c in NUMERIC}
+
+
+def stream_top_k(rows: Iterable[Dict[str, Any]], top_k: int, min_lift: float = 0.0,
+                 writer: ResultWriter = None) -> Tuple[List[Dict[str, Any]], int]:
+    '''
+    Consume rule rows (e.g. scoring.iter_scores) once: rows with lift >= min_lift go to writer, if given,
+    and into a TopK. Returns the ranked top_k rows, equal to the head of score_patterns' ranking, and the
+    number of rows kept.
+    '''
+    top = TopK(top_k)
+    for row in rows:
+        if row["lift"] < min_lift:
+            continue
+        if writer is not None:
+            writer.write(row)
+        top.push(row)
+    return top.rows(), top.n_pushed
@@ -1,6 +1,10 @@
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Union, Iterable, Iterator
 import numpy as np
 
+from .seq_index import SequenceIndex
+from .prefixspan import _prev_occurrence, _expand_suffixes
+from .store import SequenceStore
+
 
 def contains_subseq(seq: List[str], pat: List[str]) -> bool:
     i = 0
@@ -22,8 +26,125 @@ def index_of_subseq(seq: List[str], pat: List[str]):
     return -1
 
 
-def score_patterns(seqs: List[List[str]], grids: List[List[tuple]], patterns: List[Tuple[List[str], int]],
-                   xt_grid: np.ndarray):
+def _rank(out):
+    out.sort(key=lambda x: (-x["lift"], -x["confidence"], -x["support"], -x["avg_dxt"]))
+    return out
+
+
+def _row(pat, N, sup_both, sup_ant, P_target, dxt_values):
+    last = pat[-1]
+    conf = sup_both / sup_ant
+    return {
+        "pattern": " ".join(pat),
+        "length": len(pat),
+        "support": sup_both / N,
+        "support_count": sup_both,
+        "antecedent_count": sup_ant,
+        "confidence": conf,
+        "lift": (conf / P_target) if P_target > 0 else 0.0,
+        "avg_dxt": float(np.mean(dxt_values)) if len(dxt_values) > 0 else 0.0,
+        "target": "SHOT" if last in ("SHOT", "GOAL") else "BOX"
+    }
+
+
+def _rule_steps(index: SequenceIndex, pat: List[str]):
+    '''
+    Matched steps of the rule pat[:-1] -> pat[-1]: (antecedent count, hits, to, frm) with the ΔxT of each
+    hit being xt[to] - xt[frm], or None if pat is not a target-ending rule with antecedent matches.
+    The ΔxT of the matched steps telescopes to xT[target step] - xT[antecedent end] (SHOT) or the xT gain
+    of the target step (BOX). A constrained index (max_gap / max_window) also requires the target within
+    the constraints, so rule support matches what the constrained miner counts.
+    '''
+    if len(pat) < 2:
+        return None
+    last = pat[-1]
+    shot = last in ("SHOT", "GOAL")
+    if not (shot or last.endswith("_B")):
+        return None
+    if index.constrained:
+        n_ant, _, ends, to = index.constrained_rule(pat[:-1], shot)
+        if n_ant == 0:
+            return None
+        return n_ant, len(to), to, (ends if shot else to - 1)
+    sids, ends = index.match_ends(pat[:-1])
+    if len(sids) == 0:
+        return None
+    nxt = index.target_after(sids, ends, shot)
+    hit = nxt >= 0
+    to = nxt[hit]
+    return len(sids), int(hit.sum()), to, (ends[hit] if shot else to - 1)
+
+
+def iter_scores(index: SequenceIndex, patterns: Iterable[Tuple[List[str], int]]) -> Iterator[Dict[str, Any]]:
+    '''
+    Rule rows of score_patterns_index one at a time, in pattern order (unranked), so callers can stream
+    them (results.stream_top_k) instead of holding the whole rule set.
+    '''
+    N = index.n_seqs
+    P_target = float(index.target_any.sum()) / N if N > 0 else 0.0
+    for pat, sup_count in patterns:
+        steps = _rule_steps(index, pat)
+        if steps is None:
+            continue
+        n_ant, n_hit, to, frm = steps
+        yield _row(pat, N, n_hit, n_ant, P_target, index.xt[to] - index.xt[frm])
+
+
+def score_patterns_index(index: SequenceIndex, patterns: List[Tuple[List[str], int]]):
+    '''
+    Single-pass scoring over a prebuilt SequenceIndex (which must carry xT values).
+    Antecedent end positions come from binary searches in the per-token position lists (memoized per
+    antecedent), the following target from the precomputed next-target tables (see _rule_steps).
+    '''
+    return _rank(list(iter_scores(index, patterns)))
+
+
+def dxt_coefficients(index: SequenceIndex, cells: np.ndarray, patterns: List[Tuple[List[str], int]],
+                     n_cells: int):
+    '''
+    avg ΔxT of every scored rule as a linear function of the xT grid: returns (pattern strings, C) with
+    C a (rules, n_cells) CSR matrix such that C @ V.reshape(-1) equals score_patterns_index's avg_dxt
+    for any grid V. cells are the flat grid cells of the index's steps (SequenceStore.cells).
+    Rows follow the order of patterns (not the ranking); rules without hits have an all-zero row.
+    '''
+    from scipy import sparse
+    names, rows, cols, vals = [], [], [], []
+    for pat, _ in patterns:
+        steps = _rule_steps(index, pat)
+        if steps is None:
+            continue
+        _, n_hit, to, frm = steps
+        r = len(names)
+        names.append(" ".join(pat))
+        if n_hit == 0:
+            continue
+        w = 1.0 / n_hit
+        rows.append(np.full(2 * n_hit, r, dtype=np.int64))
+        cols.append(np.concatenate((cells[to], cells[frm])).astype(np.int64))
+        vals.append(np.concatenate((np.full(n_hit, w), np.full(n_hit, -w))))
+    if rows:
+        rows, cols, vals = np.concatenate(rows), np.concatenate(cols), np.concatenate(vals)
+    C = sparse.csr_matrix((vals, (rows, cols)), shape=(len(names), n_cells))  # duplicates are summed
+    return names, C
+
+
+def score_patterns(seqs: Union[List[List[str]], SequenceStore], grids: List[List[tuple]], patterns: List[Tuple[List[str], int]],
+                   xt_grid: np.ndarray, engine: str = "index", max_gap: int = 0, max_window: float = 0):
+    '''
+    Score target-ending patterns (last token SHOT/GOAL or *_B) as antecedent -> target rules.
+      engine: "index" builds a SequenceIndex once and scores every pattern from it;
+              "python" rescans every sequence per pattern (reference implementation).
+    seqs may be a SequenceStore, in which case grids is ignored (the store holds the cells).
+    max_gap / max_window: the prefixspan constraints the patterns were mined with (index engine only).
+    '''
+    if engine == "index":
+        return score_patterns_index(SequenceIndex(seqs, grids, xt_grid, max_gap, max_window), patterns)
+    if engine != "python":
+        raise ValueError(f"Unknown scoring engine: {engine}")
+    if max_gap > 0 or max_window > 0:
+        raise ValueError("max_gap / max_window need engine='index'")
+    if isinstance(seqs, SequenceStore):
+        seqs, grids = seqs.to_lists()
     N = len(seqs)
     target_any = [(("SHOT" in s) or ("GOAL" in s) or any(tok.endswith("_B") for tok in s)) for s in seqs]
     P_target = sum(target_any) / N if N > 0 else 0.0
@@ -79,21 +200,113 @@ def score_patterns(seqs: List[List[str]], grids: List[List[tuple]], patterns: Li
         sup_both = sum(seq_has_both)
         if sup_ant == 0:
             continue
-        conf = sup_both / sup_ant
-        lift = (conf / P_target) if P_target > 0 else 0.0
-        support_ratio = sup_both / N
-        avg_dxt = float(np.mean(dxt_values)) if len(dxt_values) > 0 else 0.0
-
-        out.append({
-            "pattern": " ".join(pat),
-            "length": len(pat),
-            "support": support_ratio,
-            "support_count": sup_both,
-            "antecedent_count": sup_ant,
-            "confidence": conf,
-            "lift": lift,
-            "avg_dxt": avg_dxt,
-            "target": "SHOT" if last in ("SHOT", "GOAL") else "BOX"
-        })
-    out.sort(key=lambda x: (-x["lift"], -x["confidence"], -x["support"], -x["avg_dxt"]))
-    return out
+        out.append(_row(pat, N, sup_both, sup_ant, P_target, dxt_values))
+    return _rank(out)
+
+
+def mine_and_score(seqs: Union[List[List[str]], SequenceStore], grids: List[List[tuple]], xt_grid: np.ndarray,
+                   minsup_ratio: float, maxlen: int = 5, min_lift: float = 0.0, top_k: int = None,
+                   index: SequenceIndex = None):
+    '''
+    PrefixSpan and rule scoring in one pass. Every node of the search already holds the projected
+    database of its prefix, i.e. the greedy leftmost antecedent ends, so the rows for its frequent
+    target children (prefix + SHOT/GOAL/*_B) are computed there and non-target patterns are never stored.
+
+    Subtrees are pruned when no descendant can yield a rule: fewer than minsup projected sequences have
+    a target after the prefix (that count bounds the support of every longer rule), or, with top_k, the
+    best rank any descendant could reach (lift 1/P(target), confidence 1, that support) is below the
+    current k-th row. Rows with lift < min_lift are dropped. Without min_lift/top_k the result equals
+    score_patterns(seqs, grids, prefixspan(seqs, minsup_ratio, maxlen), xt_grid).
+    A prebuilt index (carrying xT values) can be passed instead of seqs / grids / xt_grid.
+    '''
+    if index is None:
+        index = SequenceIndex(seqs, grids, xt_grid)
+    if index.constrained:
+        raise ValueError("mine_and_score does not support max_gap / max_window; use prefixspan + score_patterns")
+    N = index.n_seqs
+    minsup = max(1, int(minsup_ratio * N + 1e-9))
+    P_target = float(index.target_any.sum()) / N if N > 0 else 0.0
+    best_lift = (1.0 / P_target) if P_target > 0 else 0.0
+    if N == 0 or best_lift < min_lift:
+        return []
+
+    items, seq_end = index.items, index.seq_end
+    prev = _prev_occurrence(items, index.offsets)
+    vocab = index.vocab
+    target_kind = [("SHOT" if t in ("SHOT", "GOAL") else "BOX") if (t in ("SHOT", "GOAL") or t.endswith("_B"))
+                   else None for t in vocab]
+    found = []  # (order key, row); order key reproduces score_patterns' stable sort over prefixspan output
+    kth = [None]
+
+    def _rank_key(row):
+        return row["lift"], row["confidence"], row["support"], row["avg_dxt"]
+
+    def _keep(row, order):
+        if row["lift"] < min_lift:
+            return
+        found.append(((-row["lift"], -row["confidence"], -row["support"], -row["avg_dxt"]) + order, row))
+        if top_k and len(found) >= 2 * top_k:
+            found.sort(key=lambda x: x[0])
+            del found[top_k:]
+            kth[0] = _rank_key(found[-1][1])
+
+    def _rules(sids, ends):
+        rules = {}
+        for kind in ("SHOT", "BOX"):
+            nxt = index.target_after(sids, ends, kind == "SHOT")
+            hit = nxt >= 0
+            rules[kind] = (hit, nxt[hit])
+        return rules
+
+    def _grow(prefix: Tuple[int, ...], sids: np.ndarray, pos: np.ndarray):
+        rules = None
+        if prefix:
+            ends = pos - 1
+            rules = _rules(sids, ends)
+            bound = max(int(hit.sum()) for hit, _ in rules.values())
+            if bound < minsup:
+                return
+            if top_k and kth[0] is not None and (best_lift, 1.0, bound / N) < kth[0][:3]:
+                return
+        rows, j = _expand_suffixes(pos, seq_end[sids])
+        keep = prev[j] < pos[rows]
+        rows, j = rows[keep], j[keep]
+        it = items[j]
+        counts = np.bincount(it, minlength=len(vocab))
+        frequent = counts >= minsup
+        if not frequent.any():
+            return
+        freq_ids = np.flatnonzero(frequent)
+
+        if prefix:
+            cache = {}
+            for t in freq_ids:
+                kind = target_kind[t]
+                if kind is None:
+                    continue
+                if kind not in cache:
+                    hit, nxt = rules[kind]
+                    if kind == "SHOT":
+                        dxt = index.xt[nxt] - index.xt[ends[hit]]
+                    else:
+                        dxt = index.xt[nxt] - index.xt[nxt - 1]
+                    cache[kind] = (int(hit.sum()), dxt)
+                sup_both, dxt = cache[kind]
+                pat = [vocab[k] for k in prefix] + [vocab[t]]
+                _keep(_row(pat, N, sup_both, len(sids), P_target, dxt), (-int(counts[t]), prefix + (int(t),)))
+
+        if len(prefix) + 1 >= maxlen:
+            return
+        sel = frequent[it]
+        rows, j, it = rows[sel], j[sel], it[sel]
+        order = np.argsort(it, kind="stable")
+        rows, j = rows[order], j[order]
+        bounds = np.concatenate(([0], np.cumsum(counts[freq_ids])))
+        for k, t in enumerate(freq_ids):
+            lo, hi = bounds[k], bounds[k + 1]
+            _grow(prefix + (int(t),), sids[rows[lo:hi]], j[lo:hi] + 1)
+
+    _grow((), np.arange(N, dtype=np.int64), index.offsets[:-1].copy())
+    found.sort(key=lambda x: x[0])
+    out = [row for _, row in found]
+    return out[:top_k] if top_k else out
@@ -0,0 +1,247 @@
+from typing import List, Tuple, Dict, Union
+import numpy as np
+
+from .prefixspan import encode_sequences, _expand_suffixes
+from .store import SequenceStore
+
+SHOT_TOKENS = ("SHOT", "GOAL")
+
+
+def is_box_token(tok: str) -> bool:
+    return tok.endswith("_B")
+
+
+def _next_flagged(flag: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    '''For each flat position j, the smallest flat position >= j in the same sequence with flag set, else -1.'''
+    M = len(flag)
+    cand = np.where(flag, np.arange(M), M)
+    nxt = np.minimum.accumulate(cand[::-1])[::-1] if M else cand
+    seq_end = np.repeat(offsets[1:], np.diff(offsets))
+    return np.where(nxt < seq_end, nxt, -1)
+
+
+class SequenceIndex:
+    '''
+    Vertical (inverted) index over tokenized possessions, built once:
+      positions[t]  sorted flat positions of token id t (flat position -> (sequence, step) via offsets)
+      next_shot / next_box: first SHOT/GOAL resp. *_B token at or after each flat position, same sequence
+      xt:           xT value of each step's grid cell, when grids and an xT grid are given
+    Pattern matches use the same greedy leftmost semantics as scoring.index_of_subseq.
+    seqs may be a SequenceStore, whose arrays are used as-is and which carries its own grid cells.
+
+    With max_gap / max_window (as in prefixspan; 0 = unconstrained) only embeddings whose consecutive
+    items are at most max_gap steps apart and that span at most max_window seconds count. A match is
+    then the constrained embedding with the earliest end (which is the greedy leftmost match when
+    unconstrained), found from all embedding ends of each prefix (_embeddings).
+    '''
+
+    def __init__(self, seqs: Union[List[List[str]], SequenceStore], grids: List[List[tuple]] = None,
+                 xt_grid: np.ndarray = None, max_gap: int = 0, max_window: float = 0):
+        store = seqs if isinstance(seqs, SequenceStore) else None
+        if max_window > 0 and store is None:
+            raise ValueError("max_window needs a SequenceStore (for the step timestamps)")
+        self.max_gap, self.max_window = max_gap, max_window
+        self.times = store.times if store is not None and max_window > 0 else None
+        if store is not None:
+            self.vocab, self.items, self.offsets = store.vocab, store.items, store.offsets
+        else:
+            self.vocab, self.items, self.offsets = encode_sequences(seqs)
+        self.code = {tok: i for i, tok in enumerate(self.vocab)}
+        self.n_seqs = len(seqs)
+        self.seq_end = self.offsets[1:]
+
+        order = np.argsort(self.items, kind="stable")
+        bounds = np.concatenate(([0], np.cumsum(np.bincount(self.items, minlength=len(self.vocab)))))
+        self.positions = [order[bounds[t]:bounds[t + 1]] for t in range(len(self.vocab))]
+
+        shot_ids = [self.code[t] for t in SHOT_TOKENS if t in self.code]
+        box_ids = [i for i, t in enumerate(self.vocab) if is_box_token(t)]
+        is_shot = np.isin(self.items, shot_ids)
+        is_box = np.isin(self.items, box_ids)
+        self.next_shot = _next_flagged(is_shot, self.offsets)
+        self.next_box = _next_flagged(is_box, self.offsets)
+        self.target_any = np.zeros(self.n_seqs, dtype=bool)
+        seq_of = np.repeat(np.arange(self.n_seqs), np.diff(self.offsets))
+        self.target_any[seq_of[is_shot | is_box]] = True
+
+        self.xt = None
+        if store is not None and xt_grid is not None:
+            self.xt = np.asarray(xt_grid, dtype=np.float64).reshape(-1)[store.cells]
+        elif grids is not None and xt_grid is not None:
+            cells = np.array([c for g in grids for c in g], dtype=np.int64).reshape(-1, 2)
+            self.xt = np.asarray(xt_grid, dtype=np.float64)[cells[:, 0], cells[:, 1]]
+
+        self._matches: Dict[Tuple[int, ...], Tuple[np.ndarray, np.ndarray]] = {}
+        self._embeds: Dict[Tuple[int, ...], Tuple[np.ndarray, ...]] = {}
+
+    @property
+    def constrained(self) -> bool:
+        return self.max_gap > 0 or self.max_window > 0
+
+    def save(self, path: str):
+        '''
+        Persist the built index (vocabulary, inverted token -> flat position lists, next-target tables, step xT)
+        to one .npz, so load() restores it without rebuilding. Flat positions map to (sequence, step) via offsets.
+        '''
+        lens = np.array([len(p) for p in self.positions], dtype=np.int64)
+        np.savez(path, vocab=np.array(self.vocab, dtype=str), items=self.items, offsets=self.offsets,
+                 positions=np.concatenate(self.positions) if self.positions else np.zeros(0, dtype=np.int64),
+                 bounds=np.concatenate(([0], np.cumsum(lens))), next_shot=self.next_shot, next_box=self.next_box,
+                 target_any=self.target_any, xt=self.xt if self.xt is not None else np.zeros(0),
+                 times=self.times if self.times is not None else np.zeros(0),
+                 constraints=np.array([self.max_gap, self.max_window], dtype=np.float64))
+
+    @classmethod
+    def load(cls, path: str) -> "SequenceIndex":
+        '''Index written by save(), ready to query (memoized matches start empty).'''
+        with np.load(path) as f:
+            z = {k: f[k] for k in f.files}
+        index = cls.__new__(cls)
+        index.vocab = [str(t) for t in z["vocab"]]
+        index.items, index.offsets = z["items"], z["offsets"]
+        index.code = {tok: i for i, tok in enumerate(index.vocab)}
+        index.n_seqs = len(index.offsets) - 1
+        index.seq_end = index.offsets[1:]
+        pos, bounds = z["positions"], z["bounds"]
+        index.positions = [pos[bounds[t]:bounds[t + 1]] for t in range(len(index.vocab))]
+        index.next_shot, index.next_box, index.target_any = z["next_shot"], z["next_box"], z["target_any"]
+        index.xt = z["xt"] if len(z["xt"]) == len(index.items) else None
+        index.times = z["times"] if len(z["times"]) == len(index.items) else None
+        max_gap, index.max_window = z["constraints"].tolist()
+        index.max_gap = int(max_gap)
+        index._matches, index._embeds = {}, {}
+        return index
+
+    def clear_cache(self):
+        '''Drop the memoized prefix matches (they grow with every distinct antecedent queried).'''
+        self._matches, self._embeds = {}, {}
+
+    def encode(self, pattern: List[str]):
+        '''Token ids for pattern, or None if any token never occurs.'''
+        ids = [self.code.get(tok) for tok in pattern]
+        return None if any(i is None for i in ids) else tuple(ids)
+
+    def match_ends(self, pattern: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        '''
+        (sequence ids, flat end positions) of the greedy leftmost match of pattern in every sequence
+        that contains it. Prefix results are memoized, so patterns sharing an antecedent share work.
+        '''
+        ids = self.encode(pattern)
+        if ids is None:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty
+        return self._match_ids(ids)
+
+    def _match_ids(self, ids: Tuple[int, ...]):
+        if self.constrained and len(ids) > 0:
+            sids, _, ends, _ = self._embeddings(ids)
+            first = np.flatnonzero(np.diff(sids, prepend=-1) != 0)  # earliest end per sequence
+            return sids[first], ends[first]
+        hit = self._matches.get(ids)
+        if hit is not None:
+            return hit
+        if len(ids) == 0:
+            res = (np.arange(self.n_seqs, dtype=np.int64), self.offsets[:-1] - 1)
+        else:
+            sids, ends = self._match_ids(ids[:-1])
+            P = self.positions[ids[-1]]
+            k = np.searchsorted(P, ends, side="right")
+            ok = k < len(P)
+            sids, nxt = sids[ok], P[k[ok]]
+            ok = nxt < self.seq_end[sids]
+            res = (sids[ok], nxt[ok])
+            self._matches[ids] = res
+        return res
+
+    def _embeddings(self, ids: Tuple[int, ...]):
+        '''
+        Every constrained embedding end of ids, with the latest start reaching it: (sids, starts, ends, parent),
+        sorted by end; parent is the row of the prefix embedding it extends (-1 for one item). Memoized.
+        '''
+        hit = self._embeds.get(ids)
+        if hit is not None:
+            return hit
+        P = self.positions[ids[-1]]
+        if len(ids) == 1:
+            sids = np.searchsorted(self.offsets, P, side="right") - 1
+            res = (sids, P, P, np.full(len(P), -1, dtype=np.int64))
+        else:
+            psids, pstarts, pends, _ = self._embeddings(ids[:-1])
+            hi = self.seq_end[psids]
+            if self.max_gap > 0:
+                hi = np.minimum(hi, pends + 1 + self.max_gap)
+            rows, k = _expand_suffixes(np.searchsorted(P, pends, side="right"), np.searchsorted(P, hi))
+            j = P[k]
+            if self.max_window > 0:
+                ok = self.times[j] - self.times[pstarts[rows]] <= self.max_window
+                rows, j = rows[ok], j[ok]
+            order = np.lexsort((-pstarts[rows], j))
+            rows, j = rows[order], j[order]
+            keep = np.ones(len(j), dtype=bool)
+            keep[1:] = j[1:] != j[:-1]
+            rows, j = rows[keep], j[keep]
+            res = (psids[rows], pstarts[rows], j, rows)
+        self._embeds[ids] = res
+        return res
+
+    def constrained_rule(self, antecedent: List[str], shot: bool):
+        '''
+        Constrained counterpart of match_ends + target_after for a rule antecedent -> target: per sequence
+        with a constrained antecedent match, the earliest-ending embedding followed by a target (first
+        SHOT/GOAL resp. *_B after it) within max_gap steps and max_window seconds of its start.
+        Returns (antecedent support, sids with a hit, antecedent ends, target positions).
+        '''
+        ids = self.encode(antecedent)
+        empty = np.zeros(0, dtype=np.int64)
+        if ids is None or len(ids) == 0:
+            return 0, empty, empty, empty
+        sids, starts, ends, _ = self._embeddings(ids)
+        n_ant = int(np.count_nonzero(np.diff(sids, prepend=-1)))
+        nxt = self.target_after(sids, ends, shot)
+        ok = nxt >= 0
+        if self.max_gap > 0:
+            ok &= nxt - ends <= self.max_gap
+        if self.max_window > 0:
+            ok &= self.times[np.where(ok, nxt, 0)] - self.times[starts] <= self.max_window
+        sids, ends, nxt = sids[ok], ends[ok], nxt[ok]
+        first = np.flatnonzero(np.diff(sids, prepend=-1) != 0)
+        return n_ant, sids[first], ends[first], nxt[first]
+
+    def match_positions(self, pattern: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        '''
+        (sequence ids, flat positions of shape (n, len(pattern))) of the greedy leftmost match of every
+        step of pattern. The match of each prefix is the memoized prefix result, so this costs one
+        searchsorted per step on top of match_ends. Constrained: the steps of the earliest-ending
+        constrained embedding, traced back through the embeddings' parents.
+        '''
+        ids = self.encode(pattern)
+        if ids is None or len(ids) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros((0, len(pattern)), dtype=np.int64)
+        if self.constrained:
+            sids, _, ends, parent = self._embeddings(ids)
+            rows = np.flatnonzero(np.diff(sids, prepend=-1) != 0)
+            pos = np.empty((len(rows), len(ids)), dtype=np.int64)
+            sids = sids[rows]
+            for k in range(len(ids), 0, -1):
+                _, _, ends, parent = self._embeddings(ids[:k])
+                pos[:, k - 1] = ends[rows]
+                rows = parent[rows]
+            return sids, pos
+        sids, ends = self._match_ids(ids)
+        pos = np.empty((len(sids), len(ids)), dtype=np.int64)
+        pos[:, -1] = ends
+        for k in range(len(ids) - 1, 0, -1):
+            s_k, e_k = self._match_ids(ids[:k])
+            pos[:, k - 1] = e_k[np.searchsorted(s_k, sids)]
+        return sids, pos
+
+    def support(self, pattern: List[str]) -> int:
+        return len(self.match_ends(pattern)[0])
+
+    def target_after(self, sids: np.ndarray, ends: np.ndarray, shot: bool) -> np.ndarray:
+        '''Flat position of the first target (SHOT/GOAL if shot, else *_B) strictly after ends, or -1.'''
+        nxt = np.full(len(ends), -1, dtype=np.int64)
+        inside = ends + 1 < self.seq_end[sids]
+        table = self.next_shot if shot else self.next_box
+        nxt[inside] = table[ends[inside] + 1]
+        return nxt
@@ -1,90 +1,291 @@
-from typing import List, Dict, Any, Tuple
-from .utils import pitch_to_grid, token_for_pass, token_for_carry, in_opposition_box
+from typing import List, Dict, Any, Tuple, Iterable
+import numpy as np
+from .utils import pitch_to_grid, pitch_to_grid_np, token_for_pass, token_for_carry, in_opposition_box, dist_dir, \
+    timestamp_seconds
+from .event_cache import TYPE_CODES, PASS_TYPE_CODES
+from .store import SequenceStore
 
+STEP_TYPES = ("Pass", "Carry", "Shot", "Dribble")
 
-def build_possession_sequences(events: List[Dict[str, Any]], grid_shape=(12, 8)) -> Tuple[
+
+def _tokenize_possession(evs: List[Dict[str, Any]], nx: int, ny: int):
+    evs = sorted(evs, key=lambda e: e.get("index", e.get("id", 0)))
+    tokens, grids, used = [], [], []
+    for e in evs:
+        tname = e.get("type", {}).get("name")
+        loc = e.get("location")
+        if not loc or len(loc) < 2:
+            continue
+        x0, y0 = float(loc[0]), float(loc[1])
+
+        if tname == "Pass":
+            pass_dict = e.get("pass", {})
+            end_loc = pass_dict.get("end_location")
+            if not end_loc or len(end_loc) < 2:
+                continue
+            x1, y1 = float(end_loc[0]), float(end_loc[1])
+
+            if pass_dict.get("outcome") is None:
+                tok = token_for_pass(pass_dict, x0, y0, x1, y1)
+                if in_opposition_box(x1, y1, 1):
+                    tok = tok + "_B"
+                tokens.append(tok)
+                grids.append(pitch_to_grid(x0, y0, nx, ny))
+                used.append(e)
+
+        elif tname == "Carry":
+            car = e.get("carry", {})
+            end_loc = car.get("end_location")
+            if not end_loc or len(end_loc) < 2:
+                continue
+            x1, y1 = float(end_loc[0]), float(end_loc[1])
+            tok = token_for_carry(x0, y0, x1, y1)
+            if in_opposition_box(x1, y1, 1):
+                tok = tok + "_B"
+            tokens.append(tok)
+            grids.append(pitch_to_grid(x0, y0, nx, ny))
+            used.append(e)
+
+        elif tname == "Dribble":
+            dr = e.get("dribble", {})
+            end_loc = dr.get("end_location")
+            if end_loc and len(end_loc) >= 2:
+                x1, y1 = float(end_loc[0]), float(end_loc[1])
+                tok = "KSD"
+                if in_opposition_box(x1, y1, 1):
+                    tok = tok + "_B"
+                tokens.append(tok)
+                grids.append(pitch_to_grid(x0, y0, nx, ny))
+                used.append(e)
+
+        elif tname == "Shot":
+            shot = e.get("shot", {})
+            outcome = (shot.get("outcome") or {}).get("name", "")
+            if outcome == "Goal":
+                tok = "GOAL"
+            else:
+                tok = "SHOT"
+            tokens.append(tok)
+            grids.append(pitch_to_grid(x0, y0, nx, ny))
+            used.append(e)
+    return tokens, grids, used
+
+
+def build_possession_sequences(events: Iterable[Dict[str, Any]], grid_shape=(12, 8), keep_events: bool = True,
+                               times: List[List[float]] = None) -> Tuple[
     List[List[str]], List[List[Tuple[int, int]]], List[List[Dict[str, Any]]]]:
     '''
+    events may be a list or a lazy stream (e.g. loader.iter_events) grouped by match_id: possessions
+    are tokenized and released as soon as their match ends, so only one match is held at a time.
     Returns:
       tokens_per_possession: List of token lists
       grids_per_possession:  List of [(gx,gy) per step], aligned with tokens (for pass/carry steps); for 'SHOT' we append end cell.
-      events_per_possession: Original events used for steps (same length as tokens)
+      events_per_possession: Original events used for steps (same length as tokens); empty if keep_events=False
+    If times is a list, each possession's step timestamps in seconds (aligned with tokens) are appended to it,
+    so constrained mining gets its timestamps without keeping the event dicts.
     '''
     nx, ny = grid_shape
+    tokens_all, grids_all, events_all = [], [], []
+
+    def _flush(possessions):
+        for evs in possessions.values():
+            tokens, grids, used = _tokenize_possession(evs, nx, ny)
+            if len(tokens) > 0:
+                tokens_all.append(tokens)
+                grids_all.append(grids)
+                if keep_events:
+                    events_all.append(used)
+                if times is not None:
+                    times.append([timestamp_seconds(e.get("timestamp")) for e in used])
+
     possessions = {}
+    current, done = None, set()
     for ev in events:
-        if ev.get("type", {}).get("name") not in ("Pass", "Carry", "Shot", "Dribble"):
+        if ev.get("type", {}).get("name") not in STEP_TYPES:
             continue
+        mid = ev.get("match_id")
+        if mid != current:
+            if mid in done:
+                raise ValueError(f"events of match {mid} are not contiguous in the event stream")
+            _flush(possessions)
+            possessions = {}
+            done.add(current)
+            current = mid
         team = ev.get("team", {}).get("id")
         pid = ev.get("possession")
-        mid = ev.get("match_id")
         key = (mid, pid, team)
         possessions.setdefault(key, []).append(ev)
+    _flush(possessions)
+    return tokens_all, grids_all, events_all
+
+
+def _token_table():
+    '''Every token the step rules can produce; _tokenize_rows emits indices into this table.'''
+    table = []
+    for L in "SML":
+        for A in "FBL":
+            for typ in ("", "X", "T", "C", "W"):
+                table.append(f"P{L}{A}{typ}")
+    for L in "SML":
+        for A in "FBL":
+            table.append(f"K{L}{A}")
+    table += ["KSD", "SHOT", "GOAL"]
+    return table + [t + "_B" for t in table]
+
+
+TOKEN_TABLE = _token_table()
+_N_BASE = len(TOKEN_TABLE) // 2
+
 
+def _exact_bins(x0, y0, x1, y1):
+    '''Length/angle bins (0..2) like utils.length_bin/angle_bin; values within 1e-9 of a bin edge are
+    recomputed with the scalar math functions so the result is bit-for-bit the same.'''
+    dx, dy = x1 - x0, y1 - y0
+    d = np.hypot(dx, dy)
+    ang = np.degrees(np.arctan2(dy, dx))
+    edge = (np.abs(d - 15) < 1e-9) | (np.abs(d - 30) < 1e-9) | \
+           (np.abs(np.abs(ang) - 45) < 1e-9) | (np.abs(np.abs(ang) - 135) < 1e-9)
+    for r in np.flatnonzero(edge):
+        d[r], ang[r] = dist_dir(x0[r], y0[r], x1[r], y1[r])
+    L = np.where(d < 15, 0, np.where(d < 30, 1, 2))
+    A = np.where((ang >= -45) & (ang <= 45), 0, np.where((ang >= 135) | (ang <= -135), 1, 2))
+    return L, A
+
+
+def _tokenize_rows(c: Dict[str, np.ndarray], nx: int, ny: int):
+    '''Token codes (into TOKEN_TABLE, -1 = no step) and grid cells for every row of the columns c.'''
+    typ = c["type"]
+    x0, y0, x1, y1 = c["x"], c["y"], c["end_x"], c["end_y"]
+    has_loc = ~np.isnan(x0)
+    has_end = ~np.isnan(x1)
+    is_pass, is_carry = typ == TYPE_CODES["Pass"], typ == TYPE_CODES["Carry"]
+    is_drib, is_shot = typ == TYPE_CODES["Dribble"], typ == TYPE_CODES["Shot"]
+    step = has_loc & ((is_pass & has_end & c["pass_ok"]) | ((is_carry | is_drib) & has_end) | is_shot)
+
+    code = np.full(len(typ), -1, dtype=np.int64)
+    mv = step & (is_pass | is_carry)
+    L, A = _exact_bins(x0[mv], y0[mv], x1[mv], y1[mv])
+    p = is_pass[mv]
+    ptyp = c["pass_type"][mv]
+    w = (L == 2) & (np.abs(y1[mv] - y0[mv]) > 30)
+    sub = np.where(c["cross"][mv] | (ptyp == PASS_TYPE_CODES["Cross"]), 1,
+                   np.where(ptyp == PASS_TYPE_CODES["Through Ball"], 2,
+                            np.where(ptyp == PASS_TYPE_CODES["Cut Back"], 3, np.where(w, 4, 0))))
+    code[mv] = np.where(p, (L * 3 + A) * 5 + sub, 45 + L * 3 + A)
+    code[step & is_drib] = 54
+    code[step & is_shot] = np.where(c["goal"][step & is_shot], 56, 55)
+    with np.errstate(invalid="ignore"):
+        box = (x1 >= 102.0) & (y1 >= 18) & (y1 <= 62)
+    code[step & ~is_shot & box] += _N_BASE
+    gx, gy = pitch_to_grid_np(np.where(has_loc, x0, 0.0), np.where(has_loc, y0, 0.0), nx, ny)
+    return code, gx, gy
+
+
+def _step_arrays(c: Dict[str, np.ndarray], match_ord: np.ndarray, nx: int, ny: int):
+    '''
+    Token codes, grid cells, event index, match ordinal and timestamp of every step, in output order, plus
+    the sequence bounds (sequence k is steps bounds[k]:bounds[k+1]). None if there are no steps.
+    '''
+    keep = np.isin(c["type"], [TYPE_CODES[t] for t in STEP_TYPES])
+    c = {k: v[keep] for k, v in c.items()}
+    match_ord = match_ord[keep]
+    n = len(match_ord)
+    if n == 0:
+        return None
+    row = np.arange(n)
+    # possession groups (match, possession, team), numbered by first appearance like the dict grouping
+    order = np.lexsort((row, c["team_id"], c["possession"], match_ord))
+    ks = (match_ord[order], c["possession"][order], c["team_id"][order])
+    new_group = np.ones(n, dtype=bool)
+    new_group[1:] = (ks[0][1:] != ks[0][:-1]) | (ks[1][1:] != ks[1][:-1]) | (ks[2][1:] != ks[2][:-1])
+    gid_sorted = np.cumsum(new_group) - 1
+    first_row = order[new_group]  # lexsort is stable with row as last key, so this is the group's first row
+    group = np.empty(n, dtype=np.int64)
+    group[order] = gid_sorted
+    group_first = first_row[group]
+    # steps within a possession sorted by event index, ties in stream order
+    order = np.lexsort((row, c["index"], group_first))
+    code, gx, gy = _tokenize_rows({k: v[order] for k, v in c.items()}, nx, ny)
+    g = group_first[order]
+    step = code >= 0
+    code, gx, gy, g, src = code[step], gx[step], gy[step], g[step], order[step]
+    if len(code) == 0:
+        return None
+    bounds = np.flatnonzero(np.concatenate(([True], g[1:] != g[:-1], [True])))
+    return code, gx, gy, c["index"][src], match_ord[src], c["timestamp"][src], bounds
+
+
+def _sequences_from_columns(c: Dict[str, np.ndarray], match_ord: np.ndarray, match_ids: List[Any], nx: int, ny: int,
+                            keep_events: bool):
+    steps = _step_arrays(c, match_ord, nx, ny)
+    if steps is None:
+        return [], [], []
+    code, gx, gy, ev_index, ev_match, _, bounds = steps
+    toks = np.array(TOKEN_TABLE, dtype=object)[code].tolist()
+    cells = list(zip(gx.tolist(), gy.tolist()))
     tokens_all, grids_all, events_all = [], [], []
-    for key, evs in possessions.items():
-        evs = sorted(evs, key=lambda e: e.get("index", e.get("id", 0)))
-        tokens, grids, used = [], [], []
-        for e in evs:
-            tname = e.get("type", {}).get("name")
-            loc = e.get("location")
-            if not loc or len(loc) < 2:
-                continue
-            x0, y0 = float(loc[0]), float(loc[1])
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        tokens_all.append(toks[a:b])
+        grids_all.append(cells[a:b])
+    if keep_events:
+        mids = [match_ids[m] for m in ev_match.tolist()]
+        evs = list(zip(mids, ev_index.tolist()))
+        events_all = [evs[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+    return tokens_all, grids_all, events_all
 
-            if tname == "Pass":
-                pass_dict = e.get("pass", {})
-                end_loc = pass_dict.get("end_location")
-                if not end_loc or len(end_loc) < 2:
-                    continue
-                x1, y1 = float(end_loc[0]), float(end_loc[1])
 
-                if pass_dict.get("outcome") is None:
-                    tok = token_for_pass(pass_dict, x0, y0, x1, y1)
-                    if in_opposition_box(x1, y1, 1):
-                        tok = tok + "_B"
-                    tokens.append(tok)
-                    grids.append(pitch_to_grid(x0, y0, nx, ny))
-                    used.append(e)
-
-            elif tname == "Carry":
-                car = e.get("carry", {})
-                end_loc = car.get("end_location")
-                if not end_loc or len(end_loc) < 2:
-                    continue
-                x1, y1 = float(end_loc[0]), float(end_loc[1])
-                tok = token_for_carry(x0, y0, x1, y1)
-                if in_opposition_box(x1, y1, 1):
-                    tok = tok + "_B"
-                tokens.append(tok)
-                grids.append(pitch_to_grid(x0, y0, nx, ny))
-                used.append(e)
+def _iter_column_chunks(match_columns, chunk_matches: int):
+    '''Concatenate (match_id, columns) pairs chunk_matches at a time -> (columns, match ordinal, match ids).'''
+    batch, mids = [], []
+    for mid, cols in match_columns:
+        batch.append(cols)
+        mids.append(mid)
+        if len(batch) >= chunk_matches:
+            yield _concat_chunk(batch, mids)
+            batch, mids = [], []
+    if batch:
+        yield _concat_chunk(batch, mids)
 
-            elif tname == "Dribble":
-                dr = e.get("dribble", {})
-                end_loc = dr.get("end_location")
-                if end_loc and len(end_loc) >= 2:
-                    x1, y1 = float(end_loc[0]), float(end_loc[1])
-                    tok = "KSD"
-                    if in_opposition_box(x1, y1, 1):
-                        tok = tok + "_B"
-                    tokens.append(tok)
-                    grids.append(pitch_to_grid(x0, y0, nx, ny))
-                    used.append(e)
-
-            elif tname == "Shot":
-                shot = e.get("shot", {})
-                outcome = (shot.get("outcome") or {}).get("name", "")
-                if outcome == "Goal":
-                    tok = "GOAL"
-                else:
-                    tok = "SHOT"
-                tokens.append(tok)
-                grids.append(pitch_to_grid(x0, y0, nx, ny))
-                used.append(e)
 
-        if len(tokens) > 0:
-            tokens_all.append(tokens)
-            grids_all.append(grids)
-            events_all.append(used)
+def _concat_chunk(batch, mids):
+    c = {k: np.concatenate([b[k] for b in batch]) for k in batch[0]}
+    match_ord = np.repeat(np.arange(len(batch)), [len(b["type"]) for b in batch])
+    return c, match_ord, mids
+
+
+def build_possession_sequences_columns(match_columns: Iterable[Tuple[Any, Dict[str, np.ndarray]]], grid_shape=(12, 8),
+                                       keep_events: bool = True, chunk_matches: int = 256):
+    '''
+    Vectorized build_possession_sequences over event_cache columns, fed by (match_id, columns) pairs.
+    Distances, angles, bins, box flags and grid cells are computed with NumPy for chunk_matches matches
+    at a time, and possessions are grouped with a lexsort on (match, possession, team, index) instead of
+    dict building. Tokens and grids are identical to build_possession_sequences on the same events;
+    events_per_possession holds (match_id, event index) pairs instead of event dicts.
+    '''
+    nx, ny = grid_shape
+    tokens_all, grids_all, events_all = [], [], []
+    for c, match_ord, mids in _iter_column_chunks(match_columns, chunk_matches):
+        t, g, e = _sequences_from_columns(c, match_ord, mids, nx, ny, keep_events)
+        tokens_all.extend(t)
+        grids_all.extend(g)
+        events_all.extend(e)
     return tokens_all, grids_all, events_all
+
+
+def build_sequence_store(match_columns: Iterable[Tuple[Any, Dict[str, np.ndarray]]], grid_shape=(12, 8),
+                         chunk_matches: int = 256) -> SequenceStore:
+    '''
+    Same sequences as build_possession_sequences_columns, but kept as a SequenceStore (flat token ids,
+    packed cells, event indices, timestamps) without ever materializing per-step Python objects.
+    '''
+    nx, ny = grid_shape
+    parts = []
+    for c, match_ord, mids in _iter_column_chunks(match_columns, chunk_matches):
+        steps = _step_arrays(c, match_ord, nx, ny)
+        if steps is None:
+            continue
+        code, gx, gy, ev_index, ev_match, times, bounds = steps
+        seq_match = np.asarray(mids, dtype=np.int64)[ev_match[bounds[:-1]]]
+        parts.append(SequenceStore.from_codes(code, TOKEN_TABLE, gx * ny + gy, ev_index, seq_match,
+                                              bounds.astype(np.int64), grid_shape, times))
+    return SequenceStore.concat(parts, grid_shape)
@@ -0,0 +1,116 @@
+from typing import List, Tuple, Iterator, Sequence
+import numpy as np
+
+
+class SequenceStore:
+    '''
+    Possession sequences in flat arrays instead of lists of lists:
+      vocab:      sorted token strings (integer order == string order, as prefixspan.encode_sequences)
+      items:      token id per step (uint16)
+      cells:      packed grid cell per step, gx * ny + gy (uint16, fits grids up to 65536 cells)
+      event_idx:  event "index" of the step within its match (int64, -1 if unknown)
+      seq_match:  match id of each sequence (int64, -1 if unknown)
+      offsets:    sequence i is steps offsets[i]:offsets[i+1]
+      times:      event timestamp of the step in seconds within its period (float64, NaN if unknown)
+    '''
+
+    def __init__(self, vocab: List[str], items: np.ndarray, cells: np.ndarray, event_idx: np.ndarray,
+                 seq_match: np.ndarray, offsets: np.ndarray, grid_shape: Tuple[int, int], times: np.ndarray = None):
+        self.vocab = list(vocab)
+        self.items = items
+        self.cells = cells
+        self.event_idx = event_idx
+        self.seq_match = seq_match
+        self.offsets = offsets
+        self.nx, self.ny = grid_shape
+        self.times = np.full(len(items), np.nan) if times is None else times
+
+    @classmethod
+    def from_codes(cls, codes: np.ndarray, table: Sequence[str], cells: np.ndarray, event_idx: np.ndarray,
+                   seq_match: np.ndarray, offsets: np.ndarray, grid_shape: Tuple[int, int],
+                   times: np.ndarray = None) -> "SequenceStore":
+        '''Build from token codes into an arbitrary table; re-encodes ids against a sorted vocabulary.'''
+        used = np.unique(codes)
+        vocab = sorted(table[c] for c in used)
+        pos = {tok: i for i, tok in enumerate(vocab)}
+        remap = np.zeros(len(table), dtype=np.uint16)
+        for c in used:
+            remap[c] = pos[table[c]]
+        return cls(vocab, remap[codes], cells.astype(np.uint16), event_idx, seq_match, offsets, grid_shape, times)
+
+    @classmethod
+    def from_lists(cls, seqs: List[List[str]], grids: List[List[tuple]], grid_shape: Tuple[int, int],
+                   times: List[List[float]] = None) -> "SequenceStore":
+        '''times: optional per-step timestamps in seconds, aligned with seqs.'''
+        vocab = sorted({tok for s in seqs for tok in s})
+        code = {tok: i for i, tok in enumerate(vocab)}
+        lengths = np.fromiter((len(s) for s in seqs), dtype=np.int64, count=len(seqs))
+        offsets = np.zeros(len(seqs) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        M = int(offsets[-1])
+        items = np.fromiter((code[tok] for s in seqs for tok in s), dtype=np.uint16, count=M)
+        g = np.array([c for gs in grids for c in gs], dtype=np.int64).reshape(-1, 2)
+        cells = (g[:, 0] * grid_shape[1] + g[:, 1]).astype(np.uint16)
+        t = None if times is None else np.fromiter((v for ts in times for v in ts), dtype=np.float64, count=M)
+        return cls(vocab, items, cells, np.full(M, -1, dtype=np.int64), np.full(len(seqs), -1, dtype=np.int64),
+                   offsets, grid_shape, t)
+
+    @classmethod
+    def concat(cls, stores: List["SequenceStore"], grid_shape: Tuple[int, int]) -> "SequenceStore":
+        '''Concatenate stores in order, merging their vocabularies.'''
+        vocab = sorted({tok for s in stores for tok in s.vocab})
+        pos = {tok: i for i, tok in enumerate(vocab)}
+        items, cells, ev, sm, lens, times = [], [], [], [], [], []
+        for s in stores:
+            remap = np.array([pos[t] for t in s.vocab], dtype=np.uint16)
+            items.append(remap[s.items] if len(s.vocab) else s.items.astype(np.uint16))
+            cells.append(s.cells)
+            ev.append(s.event_idx)
+            sm.append(s.seq_match)
+            times.append(s.times)
+            lens.append(np.diff(s.offsets))
+        lengths = np.concatenate(lens) if lens else np.zeros(0, dtype=np.int64)
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+
+        def _cat(parts, dtype):
+            return np.concatenate(parts).astype(dtype, copy=False) if parts else np.zeros(0, dtype=dtype)
+
+        return cls(vocab, _cat(items, np.uint16), _cat(cells, np.uint16), _cat(ev, np.int64), _cat(sm, np.int64),
+                   offsets, grid_shape, _cat(times, np.float64))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def n_steps(self) -> int:
+        return int(self.offsets[-1])
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.items, self.cells, self.event_idx, self.seq_match, self.offsets, self.times))
+
+    def grid_xy(self) -> Tuple[np.ndarray, np.ndarray]:
+        '''(gx, gy) arrays of every step.'''
+        c = self.cells.astype(np.int64)
+        return c // self.ny, c % self.ny
+
+    def tokens(self, i: int) -> List[str]:
+        return [self.vocab[t] for t in self.items[self.offsets[i]:self.offsets[i + 1]]]
+
+    def grids(self, i: int) -> List[Tuple[int, int]]:
+        c = self.cells[self.offsets[i]:self.offsets[i + 1]].astype(np.int64)
+        return list(zip((c // self.ny).tolist(), (c % self.ny).tolist()))
+
+    def take(self, flat: np.ndarray) -> Tuple[List[str], List[Tuple[int, int]]]:
+        '''Tokens and (gx, gy) cells at the given flat step positions.'''
+        c = self.cells[flat].astype(np.int64)
+        return [self.vocab[t] for t in self.items[flat]], list(zip((c // self.ny).tolist(), (c % self.ny).tolist()))
+
+    def __iter__(self) -> Iterator[List[str]]:
+        for i in range(len(self)):
+            yield self.tokens(i)
+
+    def to_lists(self) -> Tuple[List[List[str]], List[List[Tuple[int, int]]]]:
+        '''(token lists, grid lists) in the original list-of-lists format.'''
+        return list(self), [self.grids(i) for i in range(len(self))]
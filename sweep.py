@@ -0,0 +1,47 @@
+from itertools import product
+from typing import List, Dict, Any, Tuple
+import pandas as pd
+
+
+def parse_values(spec: str, typ=float) -> list:
+    '''"0.005,0.01" -> [0.005, 0.01]; duplicates dropped, order kept.'''
+    out = []
+    for part in spec.split(","):
+        if part.strip():
+            v = typ(part)
+            if v not in out:
+                out.append(v)
+    return out
+
+
+def sweep_table(patterns: List[Tuple[List[str], int]], scores: List[Dict[str, Any]], n_seqs: int,
+                minsups: List[float], maxlens: List[int], top_ks: List[int], min_lift: float = 0.0) -> pd.DataFrame:
+    '''
+    Results of every (minsup, maxlen, top_k) configuration from one mining run and one scoring pass.
+    patterns must be mined at min(minsups) and max(maxlens), and scores must be score_patterns over them.
+    Pattern support does not depend on the mining parameters, so the patterns of a configuration are the
+    base patterns with support >= its minsup count and length <= its maxlen. Rule rows do not depend on
+    them either, and filtering keeps the ranking order, so each configuration's table is the filtered base
+    ranking, cut at top_k. That is exactly what a separate run with those parameters would report.
+    scores may also hold rows of patterns outside patterns (e.g. scored for another group); those are ignored.
+    maxlen 0 means unlimited.
+    '''
+    support = {" ".join(p): s for p, s in patterns}
+    ranked = pd.DataFrame(scores)
+    if len(ranked) == 0:
+        return ranked
+    ranked = ranked[ranked["lift"] >= min_lift]
+    pat_support = ranked["pattern"].map(support)
+    tables = []
+    for minsup, maxlen in product(minsups, maxlens):
+        minsup_count = max(1, int(minsup * n_seqs + 1e-9))
+        sub = ranked[(pat_support >= minsup_count) & ((ranked["length"] <= maxlen) | (maxlen <= 0))]
+        for top_k in top_ks:
+            t = sub.head(top_k).copy()
+            t.insert(0, "rank", range(1, len(t) + 1))
+            t.insert(0, "top_k", top_k)
+            t.insert(0, "maxlen", maxlen)
+            t.insert(0, "minsup", minsup)
+            t.insert(0, "config", f"minsup={minsup},maxlen={maxlen},top_k={top_k}")
+            tables.append(t)
+    return pd.concat(tables, ignore_index=True)
@@ -0,0 +1,140 @@
+import argparse, json, os
+from typing import List, Dict, Any
+import numpy as np
+
+from .loader import MANIFEST, _atomic_write
+
+# direction of each step, most to least common before skew: forward, diagonals, square, back
+_DIRECTIONS = np.radians([0.0, 35.0, -35.0, 90.0, -90.0, 145.0, -145.0, 180.0])
+_OTHER_TYPES = ["Ball Receipt*", "Pressure", "Ball Recovery", "Duel", "Clearance"]
+WORLD_CUP_MATCHES = 64
+
+
+def _skewed(n: int, skew: float) -> np.ndarray:
+    w = 1.0 / np.arange(1, n + 1) ** skew
+    return w / w.sum()
+
+
+def synthetic_match(match_id: int, n_possessions: int = 180, mean_len: float = 5.0, skew: float = 1.0,
+                    coord_step: float = 0.1, seed: int = 0) -> List[Dict[str, Any]]:
+    '''
+    Events of one StatsBomb-shaped match: possessions alternate between two teams, each a run of
+    Pass / Carry / Dribble steps (1 + Poisson(mean_len - 1) long) that may end in a Shot, with Ball
+    Receipt*, Pressure and similar non-step events mixed in. Step directions are Zipf-skewed towards
+    forward play (skew 0 = uniform), which controls how skewed the token vocabulary is. Locations are
+    rounded to coord_step yards like the open data. Deterministic in (match_id, seed).
+    '''
+    rng = np.random.default_rng([seed, match_id])
+    p_dir = _skewed(len(_DIRECTIONS), skew)
+    teams = (match_id * 10 + 1, match_id * 10 + 2)
+
+    def q(v):
+        return round(round(float(v) / coord_step) * coord_step, 6)
+
+    events, idx, t, team = [], 1, 0.0, 0
+    for poss in range(1, n_possessions + 1):
+        if rng.random() < 0.8:
+            team = 1 - team
+        x, y = rng.uniform(5.0, 80.0), rng.uniform(2.0, 78.0)
+        for k in range(1 + rng.poisson(max(mean_len - 1.0, 0.0))):
+            t += rng.exponential(3.0)
+            e = {"id": f"{match_id}-{idx}", "index": idx, "period": 1 if t < 2700 else 2,
+                 "timestamp": "%02d:%02d:%06.3f" % (t // 3600, t % 3600 // 60, t % 60),
+                 "minute": int(t // 60), "second": int(t % 60), "possession": poss,
+                 "team": {"id": teams[team]}, "location": [q(x), q(y)]}
+            idx += 1
+            shoot = x > 90 and 15 < y < 65 and rng.random() < (x - 90) / 60
+            if shoot:
+                dist = np.hypot(120.0 - x, 40.0 - y)
+                xg = float(np.clip(0.6 * np.exp(-dist / 9.0), 0.01, 0.95))
+                outcome = "Goal" if rng.random() < xg else rng.choice(["Saved", "Off T", "Blocked"])
+                e.update(type={"name": "Shot"}, shot={"statsbomb_xg": xg, "outcome": {"name": outcome}})
+                events.append(e)
+                break
+            typ = rng.choice(["Pass", "Carry", "Dribble"], p=[0.55, 0.38, 0.07])
+            ang = _DIRECTIONS[rng.choice(len(_DIRECTIONS), p=p_dir)] + rng.normal(0.0, 0.2)
+            d = rng.lognormal(2.6 if typ == "Pass" else 1.8, 0.6)
+            x1 = float(np.clip(x + d * np.cos(ang), 0.0, 120.0))
+            y1 = float(np.clip(y + d * np.sin(ang), 0.0, 80.0))
+            if typ == "Pass":
+                sub = {"end_location": [q(x1), q(y1)]}
+                r = rng.random()
+                if x > 80 and (y < 18 or y > 62) and r < 0.3:
+                    sub["cross"] = True
+                elif r < 0.04:
+                    sub["type"] = {"name": "Through Ball"}
+                elif r < 0.05 and x > 100:
+                    sub["type"] = {"name": "Cut Back"}
+                failed = rng.random() < 0.18
+                if failed:
+                    sub["outcome"] = {"name": "Incomplete"}
+                e.update(type={"name": "Pass"}, **{"pass": sub})
+                events.append(e)
+                if failed:
+                    break
+                events.append({"id": f"{match_id}-{idx}", "index": idx, "period": e["period"],
+                               "timestamp": e["timestamp"], "minute": e["minute"], "second": e["second"],
+                               "possession": poss, "team": {"id": teams[team]}, "location": [q(x1), q(y1)],
+                               "type": {"name": "Ball Receipt*"}})
+                idx += 1
+            elif typ == "Carry":
+                e.update(type={"name": "Carry"}, carry={"end_location": [q(x1), q(y1)]})
+                events.append(e)
+            else:
+                e.update(type={"name": "Dribble"}, dribble={"end_location": [q(x1), q(y1)]} if rng.random() < 0.7 else {})
+                events.append(e)
+            if rng.random() < 0.15:
+                o = _OTHER_TYPES[1 + rng.integers(len(_OTHER_TYPES) - 1)]
+                events.append({"id": f"{match_id}-{idx}", "index": idx, "period": e["period"],
+                               "timestamp": e["timestamp"], "minute": e["minute"], "second": e["second"],
+                               "possession": poss, "team": {"id": teams[1 - team]}, "type": {"name": o},
+                               "location": [q(120.0 - x1), q(80.0 - y1)]})
+                idx += 1
+            x, y = x1, y1
+    return events
+
+
+def write_synthetic_dataset(local_dir: str, n_matches: int = WORLD_CUP_MATCHES, competition_id: int = 43,
+                            season_id: int = 3, seed: int = 0, **match_kw) -> List[Dict[str, Any]]:
+    '''
+    Write a synthetic competition in the loader's cache layout (competitions.json, matches/<comp>/<season>.json,
+    events/<match_id>.json, manifest), so ensure_matches / iter_events / the event cache use it without network
+    access. match_kw is passed to synthetic_match. Returns the match dicts.
+    '''
+    os.makedirs(os.path.join(local_dir, "events"), exist_ok=True)
+    os.makedirs(os.path.join(local_dir, "matches", str(competition_id)), exist_ok=True)
+    manifest = {}
+
+    def put(rel: str, obj):
+        data = json.dumps(obj).encode("utf-8")
+        _atomic_write(os.path.join(local_dir, *rel.split("/")), data)
+        manifest[rel] = {"size": len(data)}
+
+    put("competitions.json", [{"competition_id": competition_id, "season_id": season_id,
+                               "competition_name": "Synthetic", "season_name": f"seed {seed}"}])
+    matches = [{"match_id": 100000 + i, "competition": {"competition_id": competition_id},
+                "season": {"season_id": season_id}} for i in range(n_matches)]
+    put(f"matches/{competition_id}/{season_id}.json", matches)
+    for m in matches:
+        put(f"events/{m['match_id']}.json", synthetic_match(m["match_id"], seed=seed, **match_kw))
+    _atomic_write(os.path.join(local_dir, MANIFEST), json.dumps(manifest, indent=1, sort_keys=True).encode("utf-8"))
+    return matches
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Write a synthetic StatsBomb-like competition to a data dir")
+    ap.add_argument("--data_dir", default="synthetic_data")
+    ap.add_argument("--matches", type=int, default=WORLD_CUP_MATCHES)
+    ap.add_argument("--possessions", type=int, default=180, help="possessions per match")
+    ap.add_argument("--mean_len", type=float, default=5.0, help="mean steps per possession")
+    ap.add_argument("--skew", type=float, default=1.0, help="Zipf exponent of step directions (0 = uniform)")
+    ap.add_argument("--coord_step", type=float, default=0.1, help="location resolution in yards")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    ms = write_synthetic_dataset(args.data_dir, args.matches, seed=args.seed, n_possessions=args.possessions,
+                                 mean_len=args.mean_len, skew=args.skew, coord_step=args.coord_step)
+    print(f"Wrote {len(ms)} synthetic matches to {args.data_dir} (use --competitions 43:3)")
+
+
+if __name__ == "__main__":
+    main()
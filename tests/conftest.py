@@ -0,0 +1,9 @@
+import os, sys, types
+
+# the repository root is the sbxt package (python -m sbxt.main); register it under that name so the tests
+# import it the same way whatever the checkout directory is called
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if "sbxt" not in sys.modules:
+    pkg = types.ModuleType("sbxt")
+    pkg.__path__ = [ROOT]
+    sys.modules["sbxt"] = pkg
@@ -0,0 +1,30 @@
+import random
+
+import numpy as np
+import pytest
+
+TOKENS = ["A", "B", "C", "D_B", "SHOT", "GOAL"]
+
+
+def random_corpus(seed, n_seqs=40, max_len=8, tokens=TOKENS, grid=(3, 2)):
+    '''(seqs, grids, times, xt grid) of n_seqs random token sequences, reproducible from seed.'''
+    rng = random.Random(seed)
+    seqs = [[rng.choice(tokens) for _ in range(rng.randint(1, max_len))] for _ in range(n_seqs)]
+    grids = [[(rng.randrange(grid[0]), rng.randrange(grid[1])) for _ in s] for s in seqs]
+    times = [sorted(rng.uniform(0.0, 20.0) for _ in s) for s in seqs]
+    xt = np.random.default_rng(seed).random(grid)
+    return seqs, grids, times, xt
+
+
+def is_subseq(p, q):
+    it = iter(q)
+    return all(x in it for x in p)
+
+
+def assert_rows_equal(got, exp):
+    '''Same rule rows in the same order; float metrics up to summation order.'''
+    assert [r["pattern"] for r in got] == [r["pattern"] for r in exp]
+    for a, b in zip(got, exp):
+        assert a["support_count"] == b["support_count"] and a["antecedent_count"] == b["antecedent_count"]
+        for k in ("support", "confidence", "lift", "avg_dxt"):
+            assert a[k] == pytest.approx(b[k], rel=1e-12, abs=1e-12), (a["pattern"], k)
@@ -0,0 +1,83 @@
+import json, os, sys
+
+import numpy as np
+import pytest
+
+from sbxt import main as sbxt_main
+from sbxt.artifacts import ArtifactCache, data_fingerprint, stage_key
+from sbxt.store import SequenceStore
+from sbxt.synthetic import synthetic_match, write_synthetic_dataset
+from sbxt.xt_model import XTModel
+
+
+def test_data_fingerprint_tracks_matches_and_files(tmp_path):
+    d = str(tmp_path)
+    matches = write_synthetic_dataset(d, n_matches=3, n_possessions=10)
+    fp = data_fingerprint(d, matches)
+    assert data_fingerprint(d, matches) == fp
+    assert data_fingerprint(d, matches[:2]) != fp
+    assert data_fingerprint(d, matches[::-1]) != fp
+    src = os.path.join(d, "events", f"{matches[0]['match_id']}.json")
+    with open(src, "w", encoding="utf-8") as f:
+        json.dump(synthetic_match(matches[0]["match_id"], n_possessions=12, seed=5), f)
+    assert data_fingerprint(d, matches) != fp
+
+
+def test_stage_keys_separate_stages_and_parameters():
+    keys = [stage_key("xt", "fp", 12, 8, "dense", 1.0), stage_key("xt", "fp", 12, 8, "dense", 0.9),
+            stage_key("xt", "fp", 16, 12, "dense", 1.0), stage_key("xt", "fp2", 12, 8, "dense", 1.0),
+            stage_key("sequences", "fp", 12, 8), stage_key("patterns", "seq", 0.005, 5, "all", 0, 0.0),
+            stage_key("patterns", "seq", 0.005, 5, "closed", 0, 0.0),
+            stage_key("patterns", "seq", 0.005, 5, "all", 2, 0.0)]
+    assert len(set(keys)) == len(keys)
+    assert stage_key("xt", "fp", 12, 8, "dense", 1.0) == keys[0]
+
+
+def test_cache_round_trip_and_key_separation(tmp_path):
+    cache = ArtifactCache(str(tmp_path))
+    xt = XTModel(nx=3, ny=2, gamma=0.9, solver="sparse")
+    xt.V = np.arange(6, dtype=np.float64).reshape(3, 2)
+    xt.trace, xt.n_iter, xt.delta, xt.converged = [0.5, 1e-7], 2, 1e-7, True
+    cache.save_xt("k1", xt)
+    got = cache.load_xt("k1")
+    np.testing.assert_array_equal(got.V, xt.V)
+    assert (got.gamma, got.solver, got.n_iter, got.converged, got.trace) == (0.9, "sparse", 2, True, [0.5, 1e-7])
+    assert cache.load_xt("k2") is None
+
+    store = SequenceStore.from_lists([["A", "B"], ["B"]], [[(0, 0), (1, 1)], [(2, 0)]], (3, 2), [[0.0, 1.5], [3.0]])
+    cache.save_sequences("k1", store)
+    got = cache.load_sequences("k1")
+    assert got.to_lists() == store.to_lists()
+    np.testing.assert_array_equal(got.times, store.times)
+
+    # same key, different stage: no collision
+    cache.save_patterns("k1", [(["A"], 1)], {"nodes_expanded": 3})
+    assert cache.load_patterns("k1") == [(["A"], 1)] and cache.pattern_stats("k1") == {"nodes_expanded": 3}
+    assert cache.load_xt("k1") is not None and cache.load_sequences("k1") is not None
+    # an entry without meta.json is an interrupted write
+    os.remove(os.path.join(str(tmp_path), "patterns", "k1", "meta.json"))
+    assert cache.load_patterns("k1") is None
+
+
+def _run(monkeypatch, capsys, data_dir, out_dir, *extra):
+    monkeypatch.setattr(sys, "argv", ["sbxt", "--data_dir", data_dir, "--output_dir", out_dir, "--download", "0",
+                                      "--minsup", "0.01", "--maxlen", "3", "--plot_top", "0", *extra])
+    sbxt_main.main()
+    out = capsys.readouterr().out
+    reused = {stage for stage, msg in (("xt", "Reusing fitted xT"), ("sequences", "Reusing possession"),
+                                      ("patterns", "Reusing mined patterns")) if msg in out}
+    with open(os.path.join(out_dir, "patterns.csv"), encoding="utf-8") as f:
+        return reused, f.read()
+
+
+def test_main_reuses_only_the_stages_whose_inputs_are_unchanged(tmp_path, monkeypatch, capsys):
+    d, out = str(tmp_path / "data"), str(tmp_path / "out")
+    write_synthetic_dataset(d, n_matches=3, n_possessions=80)
+    first = _run(monkeypatch, capsys, d, out)
+    assert first[0] == set()
+    assert _run(monkeypatch, capsys, d, out) == ({"xt", "sequences", "patterns"}, first[1])
+    # the xT fit depends on gamma, sequences and patterns do not
+    assert _run(monkeypatch, capsys, d, out, "--xt_gamma", "0.9")[0] == {"sequences", "patterns"}
+    assert _run(monkeypatch, capsys, d, out, "--minsup", "0.02")[0] == {"xt", "sequences"}
+    assert _run(monkeypatch, capsys, d, out, "--pattern_mode", "closed")[0] == {"xt", "sequences"}
+    assert _run(monkeypatch, capsys, d, out, "--grid_x", "16")[0] == set()
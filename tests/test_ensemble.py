@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from sbxt.ensemble import XTEnsemble, bootstrap_weights, fit_batch
+from sbxt.event_cache import ensure_event_cache
+from sbxt.pipeline import preprocess_matches
+from sbxt.synthetic import write_synthetic_dataset
+
+
+@pytest.fixture(scope="module")
+def dataset(tmp_path_factory):
+    d = str(tmp_path_factory.mktemp("ensemble"))
+    matches = write_synthetic_dataset(d, n_matches=5, n_possessions=60)
+    ensure_event_cache(d, matches)
+    return d, matches
+
+
+@pytest.mark.parametrize("solver,gamma", [("dense", 1.0), ("sparse", 1.0), ("sparse", 0.9), ("direct", 0.9)])
+def test_fit_batch_matches_xt_model(dataset, solver, gamma):
+    d, matches = dataset
+    t = XTEnsemble.collect(d, matches, [(12, 8)]).tensors[(12, 8)]
+    W = np.vstack([np.ones(len(matches)), bootstrap_weights(len(matches), 6, seed=1)])
+    W[-1, 0] = 0.0  # a resample without one match, so some rows of its P are empty
+    V, n_iter, converged = fit_batch(*t.aggregate(W), gamma=gamma, solver=solver)
+    assert V.shape == (len(W), t.N)
+    for b, w in enumerate(W):
+        xt = t.model(w, gamma=gamma, solver=solver)
+        np.testing.assert_allclose(V[b], xt.fit().reshape(-1), rtol=1e-10, atol=1e-12)
+        assert (n_iter[b], converged[b]) == (xt.n_iter, xt.converged)
+    # models converge at different iterations; each stops on its own
+    assert solver == "direct" or len(set(n_iter.tolist())) > 1
+
+
+@pytest.mark.parametrize("solver,gamma", [("dense", 1.0), ("sparse", 1.0), ("direct", 0.9)])
+def test_point_estimate_is_the_main_xt_fit(dataset, solver, gamma):
+    d, matches = dataset
+    xt, _ = preprocess_matches(d, matches, 12, 8, solver=solver, gamma=gamma)
+    xt.fit()
+    res = XTEnsemble.collect(d, matches, [(12, 8)], gamma=gamma, solver=solver).fit(n_boot=5, batch_size=2)
+    r = res[(12, 8)]
+    np.testing.assert_allclose(r["point"], xt.V, rtol=1e-10, atol=1e-12)
+    assert r["samples"].shape == (5, 12, 8) and np.all(r["lo"] <= r["hi"])
+
+
+def test_fine_grid_stays_sparse(dataset):
+    # 120 x 80 cells: a dense (B, N, N) batch would need B * 737 MB
+    d, matches = dataset
+    ens = XTEnsemble.collect(d, matches[:2], [(120, 80)], solver="sparse")
+    V, n_iter, converged = ens.fit_weights((120, 80), bootstrap_weights(2, 4), batch_size=4)
+    assert V.shape == (4, 120, 80) and converged.all()
+
+
+def test_direct_needs_gamma_below_one(dataset):
+    d, matches = dataset
+    with pytest.raises(ValueError):
+        XTEnsemble.collect(d, matches[:1], [(12, 8)], solver="direct")
@@ -0,0 +1,63 @@
+import json, os
+
+import numpy as np
+
+from sbxt import event_cache
+from sbxt.event_cache import events_to_columns, columns_to_events, ensure_event_cache, iter_cached_events
+from sbxt.loader import iter_events
+from sbxt.main import build_xt
+from sbxt.sequences import build_possession_sequences
+from sbxt.synthetic import synthetic_match, write_synthetic_dataset
+
+
+def assert_columns_equal(a, b):
+    assert a.keys() == b.keys()
+    for k in a:
+        assert a[k].dtype == b[k].dtype, k
+        np.testing.assert_array_equal(a[k], b[k], err_msg=k)
+
+
+def test_columns_round_trip():
+    evs = synthetic_match(7, n_possessions=80, seed=1)
+    cols = events_to_columns(evs)
+    assert len(cols["index"]) == len(evs)
+    assert_columns_equal(events_to_columns(list(columns_to_events(cols, 7))), cols)
+
+
+def test_cached_events_give_the_same_sequences_and_xt(tmp_path):
+    matches = write_synthetic_dataset(str(tmp_path), n_matches=3, n_possessions=60)
+    ensure_event_cache(str(tmp_path), matches)
+    raw, cached = list(iter_events(str(tmp_path), matches)), list(iter_cached_events(str(tmp_path), matches))
+    assert build_possession_sequences(cached, (12, 8), keep_events=False)[:2] == \
+        build_possession_sequences(raw, (12, 8), keep_events=False)[:2]
+    np.testing.assert_array_equal(build_xt(cached, 12, 8).V, build_xt(raw, 12, 8).V)
+
+
+def test_cache_invalidation(tmp_path, monkeypatch):
+    d = str(tmp_path)
+    matches = write_synthetic_dataset(d, n_matches=3, n_possessions=20)
+    assert ensure_event_cache(d, matches) == 3
+    assert ensure_event_cache(d, matches) == 0
+
+    # a changed source file is rebuilt, and its columns follow the new content
+    src = os.path.join(d, "events", f"{matches[0]['match_id']}.json")
+    evs = synthetic_match(matches[0]["match_id"], n_possessions=25, seed=9)
+    with open(src, "w", encoding="utf-8") as f:
+        json.dump(evs, f)
+    assert ensure_event_cache(d, matches) == 1
+    assert_columns_equal(event_cache.load_match_columns(d, matches[0]["match_id"], mmap=False),
+                         events_to_columns(evs))
+
+    # an entry without meta.json (interrupted build) is incomplete
+    os.remove(os.path.join(event_cache._match_dir(d, matches[1]["match_id"]), "meta.json"))
+    assert ensure_event_cache(d, matches) == 1
+
+    # validate="hash" ignores a touched mtime, but the first hash run records the hashes
+    assert ensure_event_cache(d, matches, validate="hash") == 3
+    os.utime(src, ns=(0, 0))
+    assert ensure_event_cache(d, matches, validate="hash") == 0
+    assert ensure_event_cache(d, matches) == 3
+
+    # a schema change invalidates every entry
+    monkeypatch.setattr(event_cache, "SCHEMA_VERSION", event_cache.SCHEMA_VERSION + 1)
+    assert ensure_event_cache(d, matches) == 3
@@ -0,0 +1,52 @@
+import random
+
+import numpy as np
+import pytest
+
+from sbxt.event_cache import events_to_columns
+from sbxt.incremental import update_patterns
+from sbxt.pipeline import xt_columns_from_cache
+from sbxt.prefixspan import prefixspan
+from sbxt.synthetic import synthetic_match
+from sbxt.xt_model import XTModel
+from helpers import random_corpus
+
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize("maxlen", [3, 0])
+def test_update_patterns_matches_full_remine(seed, maxlen):
+    seqs, _, _, _ = random_corpus(seed, n_seqs=80, max_len=6)
+    rng = random.Random(seed)
+    ms = rng.choice([0.05, 0.1, 0.2])
+    cut = rng.randint(1, len(seqs) - 1)
+    old, new = seqs[:cut], seqs[cut:]
+    exp = prefixspan(seqs, ms, maxlen)
+    patterns, remined = update_patterns(old, new, prefixspan(old, ms, maxlen), ms, maxlen)
+    assert patterns == exp and not remined
+    # a full re-mine when there are too many candidates gives the same patterns
+    assert update_patterns(old, new, prefixspan(old, ms, maxlen), ms, maxlen, max_candidates=0)[0] == exp
+    assert update_patterns(seqs, [], exp, ms, maxlen) == (exp, False)
+
+
+def _xt(match_ids, gamma):
+    xt = XTModel(nx=12, ny=8, gamma=gamma, tol=1e-6, max_iter=500)
+    for mid in match_ids:
+        xt.add_batch(*xt_columns_from_cache(events_to_columns(synthetic_match(mid, seed=2))))
+    return xt
+
+
+def test_warm_start_reaches_the_cold_fixed_point():
+    gamma = 0.9
+    xt = _xt(range(6), gamma)
+    xt.fit()
+    assert xt.converged
+    V0 = xt.V.copy()
+    for mid in range(6, 10):
+        xt.add_batch(*xt_columns_from_cache(events_to_columns(synthetic_match(mid, seed=2))))
+    xt.fit(V0=V0)
+    cold = _xt(range(10), gamma)
+    cold.fit()
+    assert xt.converged and cold.converged and xt.n_iter < cold.n_iter
+    # both stop within gamma / (1 - gamma) * tol of the fixed point
+    np.testing.assert_allclose(xt.V, cold.V, atol=2 * gamma / (1 - gamma) * 1e-6)
+
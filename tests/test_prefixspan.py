@@ -0,0 +1,148 @@
+import random
+from itertools import product
+
+import numpy as np
+import pytest
+
+from sbxt.prefixspan import prefixspan
+from sbxt.store import SequenceStore
+from sbxt.scoring import score_patterns
+from sbxt.utils import is_target_token
+from helpers import TOKENS, random_corpus, is_subseq, assert_rows_equal
+
+
+@pytest.mark.parametrize("seed", range(8))
+@pytest.mark.parametrize("maxlen", [2, 4, 0])
+def test_numpy_engine_matches_python_reference(seed, maxlen):
+    seqs, _, _, _ = random_corpus(seed, tokens=TOKENS[:2 + seed % 5])
+    ms = random.Random(seed).choice([0.05, 0.1, 0.2])
+    assert prefixspan(seqs, ms, maxlen) == prefixspan(seqs, ms, maxlen, engine="python")
+
+
+@pytest.mark.parametrize("maxlen", [3, 0])
+def test_shared_memory_workers_match_serial(maxlen):
+    seqs, grids, times, _ = random_corpus(11, n_seqs=120)
+    store = SequenceStore.from_lists(seqs, grids, (3, 2), times)
+    stats_1, stats_2 = {}, {}
+    serial = prefixspan(store, 0.05, maxlen, stats=stats_1)
+    assert prefixspan(store, 0.05, maxlen, workers=2, stats=stats_2) == serial
+    assert prefixspan(seqs, 0.05, maxlen, workers=2) == serial
+    assert stats_2 == stats_1
+
+
+def brute_condense(patterns, mode, keep_rules, maxlen=0):
+    '''
+    Closed / maximal subset of a complete (unbounded) frequent-pattern list, by checking one-item-longer
+    super-patterns, plus (keep_rules) every target-ending pattern whose antecedent is closed; cut at maxlen.
+    '''
+    supers = {}
+    for p, s in patterns:
+        supers[tuple(p)] = [t for q, t in patterns if len(q) == len(p) + 1 and is_subseq(p, q)]
+    support = {tuple(p): s for p, s in patterns}
+
+    def closed(p):
+        return support[tuple(p)] not in supers[tuple(p)]
+
+    out = []
+    for p, s in patterns:
+        keep = closed(p) if mode == "closed" else not supers[tuple(p)]
+        if keep_rules and len(p) > 1 and is_target_token(p[-1]) and closed(p[:-1]):
+            keep = True
+        if keep and (maxlen <= 0 or len(p) <= maxlen):
+            out.append((p, s))
+    return sorted(out, key=lambda x: (-x[1], x[0]))
+
+
+@pytest.mark.parametrize("seed", range(8))
+@pytest.mark.parametrize("mode", ["closed", "maximal"])
+@pytest.mark.parametrize("maxlen", [2, 3, 0])
+@pytest.mark.parametrize("keep_rules", [False, True])
+def test_closed_maximal_match_brute_force(seed, mode, maxlen, keep_rules):
+    seqs, _, _, _ = random_corpus(seed, n_seqs=50, max_len=7, tokens=TOKENS[:2 + seed % 5])
+    ms = random.Random(seed).choice([0.05, 0.1, 0.2, 0.3])
+    full = prefixspan(seqs, ms, 0)
+    assert prefixspan(seqs, ms, maxlen, mode=mode, keep_rules=keep_rules) == \
+        brute_condense(full, mode, keep_rules, maxlen)
+    seqs, _, _ = chunk_corpus(seed, n_seqs=30)
+    full = prefixspan(seqs, 0.1, 0)
+    assert prefixspan(seqs, 0.1, maxlen, mode=mode, keep_rules=keep_rules) == \
+        brute_condense(full, mode, keep_rules, maxlen)
+
+
+@pytest.mark.parametrize("mode", ["closed", "maximal"])
+@pytest.mark.parametrize("maxlen", [3, 0])
+def test_condensed_modes_with_workers_match_serial(mode, maxlen):
+    seqs, grids, times, _ = random_corpus(11, n_seqs=120)
+    store = SequenceStore.from_lists(seqs, grids, (3, 2), times)
+    assert prefixspan(store, 0.05, maxlen, mode=mode, workers=2) == prefixspan(store, 0.05, maxlen, mode=mode)
+
+
+def test_condensed_modes_keep_rules_of_closed_antecedents():
+    # A -> SHOT has the support of A B -> SHOT, so the pattern A SHOT is not closed, but the rule differs
+    seqs = [["A", "B", "SHOT"]] * 5 + [["A", "C"]] * 5 + [["C"]] * 10
+    grids = [[(0, 0)] * len(s) for s in seqs]
+    for mode in ("closed", "maximal"):
+        rows = score_patterns(seqs, grids, prefixspan(seqs, 0.1, 5, mode=mode), np.zeros((1, 1)))
+        assert [(r["pattern"], r["confidence"]) for r in rows] == [("A B SHOT", 1.0), ("A SHOT", 0.5)]
+
+
+def chunk_corpus(seed, n_seqs=60):
+    '''Sequences of fixed token chunks, so that many patterns (and rules) are not closed.'''
+    chunks = [("A", "B"), ("C",), ("A", "D_B"), ("SHOT",), ("B", "C"), ("GOAL",)]
+    rng = random.Random(seed)
+    seqs = [[t for _ in range(rng.randint(1, 4)) for t in rng.choice(chunks)] for _ in range(n_seqs)]
+    grids = [[(rng.randrange(3), rng.randrange(2)) for _ in s] for s in seqs]
+    return seqs, grids, np.random.default_rng(seed).random((3, 2))
+
+
+@pytest.mark.parametrize("seed", range(8))
+@pytest.mark.parametrize("mode", ["closed", "maximal"])
+@pytest.mark.parametrize("maxlen", [3, 0])
+def test_condensed_rules_score_as_in_mode_all(seed, mode, maxlen):
+    seqs, grids, xt = chunk_corpus(seed)
+    store = SequenceStore.from_lists(seqs, grids, (3, 2))
+    full = prefixspan(store, 0.05, maxlen)
+    condensed = prefixspan(store, 0.05, maxlen, mode=mode)
+    rows = score_patterns(store, None, condensed, xt)
+    kept = {r["pattern"] for r in rows}
+    assert rows and kept == {" ".join(p) for p, _ in brute_condense(prefixspan(store, 0.05, 0), mode, True, maxlen)
+                             if len(p) > 1 and is_target_token(p[-1])}
+    assert_rows_equal(rows, [r for r in score_patterns(store, None, full, xt) if r["pattern"] in kept])
+
+
+def brute_constrained_support(seqs, times, pattern, gap, win):
+    '''Sequences containing pattern with consecutive items <= gap steps apart and first to last <= win seconds.'''
+    def embeds(s, t, k, last, start):
+        if k == len(pattern):
+            return True
+        hi = len(s) if last < 0 or gap is None else min(len(s), last + gap + 1)
+        for j in range(last + 1, hi):
+            if s[j] == pattern[k]:
+                st = j if k == 0 else start
+                if win is not None and t[j] - t[st] > win:
+                    continue
+                if embeds(s, t, k + 1, j, st):
+                    return True
+        return False
+    return sum(embeds(s, t, 0, -1, -1) for s, t in zip(seqs, times))
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_constrained_mining_matches_brute_force(seed):
+    rng = random.Random(seed)
+    seqs, grids, times, _ = random_corpus(seed, n_seqs=30, max_len=8, tokens=list("abcde"))
+    gap, win = rng.choice([(1, 0), (2, 0), (3, 0), (0, 5.0), (2, 8.0)])
+    ms = rng.choice([0.05, 0.1, 0.2])
+    store = SequenceStore.from_lists(seqs, grids, (3, 2), times)
+    got = prefixspan(store, ms, 4, max_gap=gap, max_window=win)
+    minsup = max(1, int(ms * len(seqs) + 1e-9))
+    exp = []
+    for L in range(1, 5):
+        for p in product(sorted({x for s in seqs for x in s}), repeat=L):
+            c = brute_constrained_support(seqs, times, list(p), gap or None, win or None)
+            if c >= minsup:
+                exp.append((list(p), c))
+    exp.sort(key=lambda x: (-x[1], x[0]))
+    assert got == exp
+    if seed < 3:
+        assert prefixspan(store, ms, 4, max_gap=gap, max_window=win, workers=2) == got
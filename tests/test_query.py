@@ -0,0 +1,87 @@
+import json, threading, urllib.request
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+from helpers import assert_rows_equal, is_subseq, random_corpus
+from sbxt.prefixspan import prefixspan
+from sbxt.query import PatternQuery, _handler
+from sbxt.scoring import score_patterns
+from sbxt.seq_index import SequenceIndex
+from sbxt.store import SequenceStore
+
+
+def _store(seed):
+    seqs, grids, times, xt = random_corpus(seed, n_seqs=60)
+    return SequenceStore.from_lists(seqs, grids, xt.shape, times), seqs, xt
+
+
+def _saved(tmp_path, index):
+    path = str(tmp_path / "index.npz")
+    index.save(path)
+    return SequenceIndex.load(path)
+
+
+@pytest.mark.parametrize("max_gap,max_window", [(0, 0), (2, 0), (0, 8.0), (1, 12.0)])
+def test_save_load_round_trip(tmp_path, max_gap, max_window):
+    store, _, xt = _store(1)
+    index = SequenceIndex(store, xt_grid=xt, max_gap=max_gap, max_window=max_window)
+    got = _saved(tmp_path, index)
+    assert got.vocab == index.vocab and got.n_seqs == index.n_seqs and got.code == index.code
+    assert (got.max_gap, got.max_window, got.constrained) == (max_gap, max_window, index.constrained)
+    for k in ("items", "offsets", "next_shot", "next_box", "target_any", "xt"):
+        np.testing.assert_array_equal(getattr(got, k), getattr(index, k))
+    assert (got.times is None) == (index.times is None)
+    for a, b in zip(got.positions, index.positions):
+        np.testing.assert_array_equal(a, b)
+    # an index without xT still loads (xt stays None)
+    assert _saved(tmp_path, SequenceIndex(store)).xt is None
+
+
+@pytest.mark.parametrize("max_gap,max_window", [(0, 0), (2, 0), (0, 8.0)])
+def test_query_matches_score_patterns(tmp_path, max_gap, max_window):
+    store, seqs, xt = _store(2)
+    patterns = prefixspan(store, 0.02, 4, max_gap=max_gap, max_window=max_window)
+    rows = score_patterns(store, None, patterns, xt, max_gap=max_gap, max_window=max_window)
+    assert rows
+    # max_cached=5 forces evictions between queries; answers must not depend on the memo
+    q = PatternQuery(_saved(tmp_path, SequenceIndex(store, xt_grid=xt, max_gap=max_gap, max_window=max_window)),
+                     max_cached=5)
+    got = [q.query(r["pattern"])["rule"] for r in rows]
+    assert_rows_equal(got, rows)
+    assert len(q.index._matches) + len(q.index._embeds) <= 5 + 4
+    split = rows[0]["pattern"].split()
+    assert q.query(" ".join(split[:-1]), target=split[-1])["rule"] == got[0]
+
+
+def test_query_sequence_support_and_non_rules(tmp_path):
+    store, seqs, xt = _store(3)
+    q = PatternQuery(_saved(tmp_path, SequenceIndex(store, xt_grid=xt)))
+    for pat in (["A"], ["A", "B"], ["B", "A", "C"], ["C", "SHOT"]):
+        res = q.query(pat)
+        assert res["sequence_support"] == sum(is_subseq(pat, s) for s in seqs) and res["n_sequences"] == len(seqs)
+    assert q.query("A B")["rule"] is None  # does not end in a target
+    res = q.query("A NOPE SHOT")
+    assert res["unknown_tokens"] == ["NOPE"] and res["sequence_support"] == 0 and res["rule"] is None
+
+
+def test_http_handler(tmp_path):
+    store, _, xt = _store(4)
+    q = PatternQuery(SequenceIndex(store, xt_grid=xt))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _handler(q))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(f"{base}/query?pattern=A+B&target=SHOT") as r:
+            body = json.loads(r.read())
+        expected = q.query("A B", "SHOT")
+        assert body["rule"] == expected["rule"] and body["sequence_support"] == expected["sequence_support"]
+        with urllib.request.urlopen(f"{base}/vocab") as r:
+            assert json.loads(r.read())["vocab"] == q.index.vocab
+        with pytest.raises(urllib.error.HTTPError) as e:
+            urllib.request.urlopen(f"{base}/query")
+        assert e.value.code == 400
+    finally:
+        server.shutdown()
+        server.server_close()
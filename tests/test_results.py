@@ -0,0 +1,85 @@
+import os, random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from helpers import random_corpus
+from sbxt.prefixspan import prefixspan
+from sbxt.results import COLUMNS, NUMERIC, ResultWriter, TopK, load_columns, stream_top_k
+from sbxt.scoring import _rank, iter_scores, score_patterns
+from sbxt.seq_index import SequenceIndex
+
+
+def _rows(seed, n=200):
+    # few distinct values so that ties (equal rank keys) are common
+    rng = random.Random(seed)
+    return [{"pattern": f"P{i} SHOT", "length": 2, "support": rng.choice([0.1, 0.2]), "support_count": i,
+             "antecedent_count": i + 1, "confidence": rng.choice([0.5, 1.0]), "lift": rng.choice([1.0, 2.0, 3.0]),
+             "avg_dxt": rng.choice([0.0, 0.01]), "target": "SHOT"} for i in range(n)]
+
+
+@pytest.mark.parametrize("k", [0, -1, 1, 7, 200, 500])
+def test_top_k_is_the_head_of_the_stable_ranking(k):
+    rows = _rows(k + 10)
+    top = TopK(k)
+    for r in rows:
+        top.push(r)
+    ranked = _rank(list(rows))
+    assert top.rows() == (ranked if k <= 0 else ranked[:k])
+    assert top.n_pushed == len(rows) and len(top) == (len(rows) if k <= 0 else min(k, len(rows)))
+
+
+def _corpus_rows():
+    seqs, grids, _, xt = random_corpus(11, n_seqs=80)
+    patterns = prefixspan(seqs, 0.02, 4)
+    return SequenceIndex(seqs, grids, xt), patterns, score_patterns(seqs, grids, patterns, xt)
+
+
+@pytest.mark.parametrize("top_k,min_lift", [(10, 0.0), (0, 0.0), (5, 1.1), (5, 99.0)])
+def test_stream_top_k_matches_score_patterns(tmp_path, top_k, min_lift):
+    index, patterns, full = _corpus_rows()
+    kept = [r for r in full if r["lift"] >= min_lift]
+    path = str(tmp_path / "rules.csv")
+    with ResultWriter(path, chunk_rows=7) as w:
+        top, n = stream_top_k(iter_scores(index, patterns), top_k, min_lift, w)
+    assert top == (kept[:top_k] if top_k > 0 else kept) and n == len(kept)
+    df = pd.read_csv(path)
+    assert list(df.columns) == list(COLUMNS) and len(df) == n
+    # written in production order, i.e. unranked
+    assert sorted(df["pattern"]) == sorted(r["pattern"] for r in kept)
+
+
+def test_result_writer_memmap_columns(tmp_path):
+    rows = _rows(3, n=25)
+    mm = str(tmp_path / "cols")
+    w = ResultWriter(str(tmp_path / "out" / "rules.csv"), chunk_rows=4, memmap_dir=mm)
+    w.write_many(rows)
+    w.close()
+    assert w.n_rows == 25 and sorted(os.listdir(mm)) == sorted(f"{c}.npy" for c in NUMERIC)
+    cols = load_columns(mm)
+    assert cols.keys() == w.columns().keys() == NUMERIC.keys()
+    for c, dt in NUMERIC.items():
+        assert isinstance(cols[c], np.memmap) and cols[c].dtype == dt and not cols[c].flags.writeable
+        np.testing.assert_array_equal(cols[c], np.array([r[c] for r in rows], dtype=dt))
+    df = pd.read_csv(str(tmp_path / "out" / "rules.csv"))
+    assert df.to_dict("records") == rows
+
+
+def test_result_writer_empty_and_formats(tmp_path):
+    mm = str(tmp_path / "cols")
+    with ResultWriter(str(tmp_path / "rules.csv"), memmap_dir=mm):
+        pass
+    assert all(len(a) == 0 for a in load_columns(mm).values())
+    assert list(pd.read_csv(str(tmp_path / "rules.csv")).columns) == list(COLUMNS)
+    with pytest.raises(ValueError):
+        ResultWriter(str(tmp_path / "rules.txt"), fmt="txt")
+
+
+def test_result_writer_parquet(tmp_path):
+    pytest.importorskip("pyarrow")
+    rows = _rows(4, n=30)
+    path = str(tmp_path / "rules.parquet")
+    with ResultWriter(path, fmt="parquet", chunk_rows=8) as w:
+        w.write_many(rows)
+    assert pd.read_parquet(path).to_dict("records") == rows
@@ -0,0 +1,88 @@
+import random
+
+import numpy as np
+import pytest
+
+from sbxt.prefixspan import prefixspan
+from sbxt.scoring import score_patterns, mine_and_score
+from sbxt.seq_index import SequenceIndex
+from sbxt.store import SequenceStore
+from helpers import random_corpus, assert_rows_equal
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_index_scoring_matches_python_reference(seed):
+    seqs, grids, _, xt = random_corpus(seed)
+    patterns = prefixspan(seqs, 0.05, 4)
+    exp = score_patterns(seqs, grids, patterns, xt, engine="python")
+    assert exp
+    assert_rows_equal(score_patterns(seqs, grids, patterns, xt), exp)
+    store = SequenceStore.from_lists(seqs, grids, (3, 2))
+    assert_rows_equal(score_patterns(store, None, patterns, xt), exp)
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_mine_and_score_matches_prefixspan_then_score(seed):
+    seqs, grids, _, xt = random_corpus(seed, n_seqs=60)
+    exp = score_patterns(seqs, grids, prefixspan(seqs, 0.05, 4), xt)
+    assert len(exp) > 5
+    assert_rows_equal(mine_and_score(seqs, grids, xt, 0.05, 4), exp)
+    # pruning by the k-th best row keeps the head of the full ranking
+    assert_rows_equal(mine_and_score(seqs, grids, xt, 0.05, 4, top_k=5), exp[:5])
+    assert_rows_equal(mine_and_score(seqs, grids, xt, 0.05, 4, min_lift=1.0),
+                      [r for r in exp if r["lift"] >= 1.0])
+
+
+def brute_rule(seqs, grids, times, xt, antecedent, last, gap, win):
+    '''(antecedent count, rule count, avg ΔxT) of antecedent -> last under the mining constraints.'''
+    shot = last in ("SHOT", "GOAL")
+    is_target = (lambda x: x in ("SHOT", "GOAL")) if shot else (lambda x: x.endswith("_B"))
+    n_ant, dxt = 0, []
+    for s, g, t in zip(seqs, grids, times):
+        v = [xt[c] for c in g]
+        ends = []
+
+        def walk(k, last_j, start):
+            if k == len(antecedent):
+                ends.append((last_j, start))
+                return
+            hi = len(s) if last_j < 0 or gap is None else min(len(s), last_j + gap + 1)
+            for j in range(last_j + 1, hi):
+                if s[j] == antecedent[k]:
+                    st = j if k == 0 else start
+                    if win is None or k == 0 or t[j] - t[st] <= win:
+                        walk(k + 1, j, st)
+        walk(0, -1, -1)
+        if not ends:
+            continue
+        n_ant += 1
+        for e, st in sorted(set(ends)):
+            q = next((j for j in range(e + 1, len(s)) if is_target(s[j])), None)
+            if q is None or (gap is not None and q - e > gap) or (win is not None and t[q] - t[st] > win):
+                continue
+            dxt.append(v[q] - v[e] if shot else v[q] - v[q - 1])
+            break
+    return n_ant, len(dxt), (float(np.mean(dxt)) if dxt else 0.0)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_constrained_scoring_matches_brute_force(seed):
+    rng = random.Random(seed)
+    seqs, grids, times, xt = random_corpus(seed, n_seqs=30, max_len=10, tokens=["A", "B", "C_B", "SHOT", "GOAL"])
+    gap, win = rng.choice([(1, 0), (2, 0), (4, 0), (0, 4.0), (2, 8.0)])
+    store = SequenceStore.from_lists(seqs, grids, (3, 2), times)
+    patterns = prefixspan(store, 0.05, 4, max_gap=gap, max_window=win)
+    rows = {r["pattern"]: r for r in score_patterns(store, None, patterns, xt, max_gap=gap, max_window=win)}
+    n_rules = 0
+    for p, _ in patterns:
+        if len(p) < 2 or not (p[-1] in ("SHOT", "GOAL") or p[-1].endswith("_B")):
+            continue
+        n_ant, n_hit, avg = brute_rule(seqs, grids, times, xt, p[:-1], p[-1], gap or None, win or None)
+        r = rows[" ".join(p)]
+        assert (r["antecedent_count"], r["support_count"]) == (n_ant, n_hit)
+        assert r["avg_dxt"] == pytest.approx(avg, abs=1e-12)
+        n_rules += 1
+    assert n_rules == len(rows) > 0
+    index = SequenceIndex(store, max_gap=gap, max_window=win)
+    for p, c in patterns:
+        assert len(index.match_positions(p)[0]) == c
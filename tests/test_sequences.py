@@ -0,0 +1,62 @@
+import numpy as np
+
+from sbxt.event_cache import events_to_columns
+from sbxt.prefixspan import prefixspan
+from sbxt.sequences import build_possession_sequences, build_possession_sequences_columns, build_sequence_store
+from sbxt.store import SequenceStore
+from sbxt.synthetic import synthetic_match
+
+
+def _matches():
+    return [(mid, synthetic_match(mid, n_possessions=60, seed=3)) for mid in (1, 2, 3)]
+
+
+def test_vectorized_tokenization_matches_dict_path():
+    matches = _matches()
+    events = [dict(e, match_id=mid) for mid, evs in matches for e in evs]
+    tokens, grids, used = build_possession_sequences(events, (12, 8))
+    columns = [(mid, events_to_columns(evs)) for mid, evs in matches]
+    # chunks of 2 matches: one chunk boundary falls between matches
+    tokens_c, grids_c, used_c = build_possession_sequences_columns(columns, (12, 8), chunk_matches=2)
+    assert tokens and tokens_c == tokens
+    assert [[tuple(map(int, c)) for c in g] for g in grids_c] == grids
+    assert [[(e["match_id"], e["index"]) for e in evs] for evs in used] == \
+        [[(mid, int(i)) for mid, i in evs] for evs in used_c]
+
+
+def test_sequence_store_matches_lists():
+    matches = _matches()
+    columns = [(mid, events_to_columns(evs)) for mid, evs in matches]
+    tokens, grids, used = build_possession_sequences_columns(columns, (12, 8))
+    store = build_sequence_store(columns, (12, 8), chunk_matches=2)
+    assert store.to_lists() == (tokens, grids)
+    assert store.vocab == sorted(store.vocab)
+    assert [[(int(store.seq_match[i]), int(e)) for e in store.event_idx[store.offsets[i]:store.offsets[i + 1]]]
+            for i in range(len(store))] == [[(mid, int(e)) for mid, e in evs] for evs in used]
+    # step timestamps are the cached event timestamps
+    ts = {(mid, int(i)): t for mid, c in columns for i, t in zip(c["index"], c["timestamp"])}
+    flat = [(mid, int(e)) for evs in used for mid, e in evs]
+    np.testing.assert_array_equal(store.times, [ts[k] for k in flat])
+    # concat of per-match stores (vocabularies merged) and from_lists give the same store
+    parts = SequenceStore.concat([build_sequence_store([c], (12, 8)) for c in columns], (12, 8))
+    lists = SequenceStore.from_lists(tokens, grids, (12, 8), times=[[ts[(m, int(e))] for m, e in evs] for evs in used])
+    for other in (parts, lists):
+        assert other.to_lists() == (tokens, grids)
+        np.testing.assert_array_equal(other.items, store.items)
+        np.testing.assert_array_equal(other.times, store.times)
+    assert prefixspan(store, 0.02, 3) == prefixspan(tokens, 0.02, 3)
+
+
+def test_dict_path_times_match_columnar_times():
+    matches = _matches()
+    events = [dict(e, match_id=mid) for mid, evs in matches for e in evs]
+    times = []
+    tokens, _, used = build_possession_sequences(events, (12, 8), keep_events=False, times=times)
+    assert used == [] and [len(t) for t in times] == [len(s) for s in tokens]
+    store = build_sequence_store([(mid, events_to_columns(evs)) for mid, evs in matches], (12, 8))
+    np.testing.assert_array_equal(np.concatenate(times), store.times)
+    # so constrained mining gives the same patterns on either path
+    dict_store = SequenceStore.from_lists(*build_possession_sequences(events, (12, 8), keep_events=False)[:2],
+                                          (12, 8), times)
+    assert prefixspan(dict_store, 0.02, 4, max_gap=2, max_window=6.0) == \
+        prefixspan(store, 0.02, 4, max_gap=2, max_window=6.0)
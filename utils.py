@@ -1,5 +1,6 @@
 import math
 from typing import Tuple
+import numpy as np
 
 
 def pitch_to_grid(x: float, y: float, nx: int, ny: int) -> Tuple[int, int]:
@@ -14,10 +15,33 @@ def pitch_to_grid(x: float, y: float, nx: int, ny: int) -> Tuple[int, int]:
     return gx, gy
 
 
+def pitch_to_grid_np(x: np.ndarray, y: np.ndarray, nx: int, ny: int) -> Tuple[np.ndarray, np.ndarray]:
+    '''Vectorized pitch_to_grid: same clipping and binning, element for element.'''
+    x = np.minimum(np.maximum(np.asarray(x, dtype=np.float64), 0.0), 120.0)
+    y = np.minimum(np.maximum(np.asarray(y, dtype=np.float64), 0.0), 80.0)
+    gx = np.minimum((x / (120.0 / nx)).astype(np.int64), nx - 1)
+    gy = np.minimum((y / (80.0 / ny)).astype(np.int64), ny - 1)
+    return gx, gy
+
+
 def cell_id(gx: int, gy: int, nx: int) -> int:
     return gy * nx + gx
 
 
+def timestamp_seconds(ts) -> float:
+    '''StatsBomb "HH:MM:SS.mmm" (time within the period) -> seconds; NaN if missing or malformed.'''
+    try:
+        h, m, sec = str(ts).split(":")
+        return int(h) * 3600 + int(m) * 60 + float(sec)
+    except (ValueError, AttributeError):
+        return float("nan")
+
+
+def format_timestamp(t: float) -> str:
+    '''Inverse of timestamp_seconds.'''
+    return "%02d:%02d:%06.3f" % (t // 3600, t % 3600 // 60, t % 60)
+
+
 def dist_dir(x0, y0, x1, y1):
     dx, dy = x1 - x0, y1 - y0
     d = math.hypot(dx, dy)
@@ -76,3 +100,8 @@ def token_for_carry(x0, y0, x1, y1) -> str:
     L = length_bin(d)
     A = angle_bin(ang)
     return f"K{L}{A}"  # e.g., KSF, KMB, KLL
+
+
+def is_target_token(tok: str) -> bool:
+    '''Tokens a rule can end in: SHOT / GOAL, or a step into the box (*_B).'''
+    return tok in ("SHOT", "GOAL") or tok.endswith("_B")
@@ -1,4 +1,5 @@
 import os
+from typing import List, Tuple
 import numpy as np
 import matplotlib.pyplot as plt
 
@@ -31,3 +32,118 @@ def plot_example_path(xt, grids, tokens, save_path: str, title: str = ""):
     plt.tight_layout()
     plt.savefig(save_path, dpi=200)
     plt.close()
+
+
+# ---- batch rendering: Agg canvases via the Figure API, no pyplot state ----
+
+RENDER_MODES = ("png", "pdf", "sheet")
+_TEMPLATE = None
+
+
+class _ExampleTemplate:
+    '''
+    One Agg figure with the xT heatmap, axes and labels drawn once. Each example restores that background
+    from the saved pixel buffer and draws only its own path, labels and title on top (blitting), so the
+    heatmap is never re-rendered.
+    '''
+
+    def __init__(self, xt: np.ndarray, dpi: int):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        self.fig = Figure(figsize=(10, 6), dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot()
+        self.ax.imshow(np.asarray(xt).T, origin="lower", aspect="auto")
+        self.ax.set_xlabel("X grid")
+        self.ax.set_ylabel("Y grid")
+        self.ax.autoscale(False)
+        # lay out with a title in place so there is room for it; animated artists are left out of the background
+        self.title = self.ax.set_title("Example sequence over xT")
+        self.fig.tight_layout()
+        self.title.set_animated(True)
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.line = self.ax.plot([], [], marker="o", animated=True)[0]
+
+    def render(self, grids, tokens, title: str) -> np.ndarray:
+        '''RGBA pixels of one example (the same picture as plot_example_path).'''
+        self.canvas.restore_region(self.background)
+        self.line.set_data([g[0] for g in grids], [g[1] for g in grids])
+        self.ax.draw_artist(self.line)
+        for (x, y), t in zip(grids, tokens):
+            txt = self.ax.text(x, y, t, fontsize=7, animated=True)
+            self.ax.draw_artist(txt)
+            txt.remove()
+        self.title.set_text(title or "Example sequence over xT")
+        self.fig.draw_artist(self.title)
+        return np.asarray(self.canvas.buffer_rgba()).copy()
+
+
+def _init_renderer(xt: np.ndarray, dpi: int):
+    global _TEMPLATE
+    _TEMPLATE = _ExampleTemplate(xt, dpi)
+
+
+def _render_one(job):
+    import matplotlib.image as mpimg
+    grids, tokens, title, path = job
+    rgba = _TEMPLATE.render(grids, tokens, title)
+    if path is None:
+        return rgba
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    mpimg.imsave(path, rgba)
+    return path
+
+
+def _contact_sheet(pages: List[np.ndarray], cols: int) -> np.ndarray:
+    h, w = pages[0].shape[:2]
+    rows = -(-len(pages) // cols)
+    sheet = np.full((rows * h, cols * w, 4), 255, dtype=np.uint8)
+    for i, p in enumerate(pages):
+        r, c = divmod(i, cols)
+        sheet[r * h:(r + 1) * h, c * w:(c + 1) * w] = p
+    return sheet
+
+
+def render_examples(xt: np.ndarray, examples: List[Tuple[list, list, str, str]], out: str, mode: str = "png",
+                    workers: int = 1, dpi: int = 200, cols: int = 4) -> List[str]:
+    '''
+    Render many example paths over the xT heatmap.
+      examples: (grids, tokens, title, file name) per plot; file names are used by mode "png"
+      mode:     "png" one file per example in the directory out; "pdf" one multi-page PDF at out;
+                "sheet" one PNG contact sheet at out with cols examples per row
+      workers:  processes rendering in parallel, each with its own prebuilt heatmap background
+    Returns the written paths.
+    '''
+    if mode not in RENDER_MODES:
+        raise ValueError(f"Unknown render mode: {mode}")
+    if not examples:
+        return []
+    if mode == "png":
+        jobs = [(g, t, title, os.path.join(out, name)) for g, t, title, name in examples]
+    else:
+        jobs = [(g, t, title, None) for g, t, title, _ in examples]
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_renderer, initargs=(xt, dpi)) as pool:
+            results = list(pool.map(_render_one, jobs, chunksize=max(1, len(jobs) // (4 * workers))))
+    else:
+        _init_renderer(xt, dpi)
+        results = [_render_one(j) for j in jobs]
+    if mode == "png":
+        return results
+
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    if mode == "sheet":
+        import matplotlib.image as mpimg
+        mpimg.imsave(out, _contact_sheet(results, cols))
+        return [out]
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_pdf import PdfPages
+    with PdfPages(out) as pdf:
+        for rgba in results:
+            h, w = rgba.shape[:2]
+            page = Figure(figsize=(w / dpi, h / dpi), dpi=dpi)
+            page.figimage(rgba)
+            pdf.savefig(page)
+    return [out]
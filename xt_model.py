@@ -1,21 +1,76 @@
 import numpy as np
 from typing import Dict, Tuple, List
-from .utils import pitch_to_grid, cell_id
+from .utils import pitch_to_grid, pitch_to_grid_np, cell_id
+
+# event kinds for XTModel.add_batch; every row also counts as an entry to its start cell
+KIND_ENTRY = 0
+KIND_MOVE = 1
+KIND_SHOT = 2
+
+
+SOLVERS = ("dense", "sparse", "direct")
+
+
+def batch_counts(x0, y0, x1, y1, kind, xg, nx: int, ny: int) -> Dict[str, np.ndarray]:
+    '''
+    Partial xT counts of a batch of events (see XTModel.add_batch for the arguments): entry counts per cell,
+    transitions as unique flat (from * N + to) indices with counts, and each shot's cell and xG in row order.
+    '''
+    N = nx * ny
+    kind = np.asarray(kind)
+    gx0, gy0 = pitch_to_grid_np(x0, y0, nx, ny)
+    entries = np.bincount(gx0 * ny + gy0, minlength=N).reshape(nx, ny).astype(np.float64)
+    mv = kind == KIND_MOVE
+    gx1, gy1 = pitch_to_grid_np(np.asarray(x1)[mv], np.asarray(y1)[mv], nx, ny)
+    flat = cell_id(gx0[mv], gy0[mv], nx) * N + cell_id(gx1, gy1, nx)
+    trans_flat, trans_count = np.unique(flat, return_counts=True)
+    sh = kind == KIND_SHOT
+    return {"entries": entries, "trans_flat": trans_flat, "trans_count": trans_count,
+            "shot_gx": gx0[sh], "shot_gy": gy0[sh], "shot_xg": np.asarray(xg, dtype=np.float64)[sh]}
 
 
 class XTModel:
-    def __init__(self, nx=12, ny=8, gamma=1.0, tol=1e-6, max_iter=500):
+    '''
+    solver:
+      "dense"  N x N transition counts, einsum value iteration (original)
+      "sparse" transition counts as scipy.sparse CSR, value iteration with sparse mat-vec products
+      "direct" sparse counts, V = r + gamma P V solved with one sparse LU solve (needs gamma < 1,
+               otherwise the fixed point is not unique)
+    The sparse solvers keep memory O(nnz) instead of O(N^2), which makes 120x80 grids practical.
+    "direct" gives the exact fixed point; value iteration stops once max |V_new - V| < tol, which for
+    gamma < 1 leaves it up to gamma / (1 - gamma) * tol away from it (9e-6 at gamma 0.9, tol 1e-6).
+    '''
+
+    def __init__(self, nx=12, ny=8, gamma=1.0, tol=1e-6, max_iter=500, solver="dense"):
+        if solver not in SOLVERS:
+            raise ValueError(f"Unknown xT solver: {solver}")
         self.nx = nx
         self.ny = ny
         self.N = nx * ny
         self.gamma = gamma
         self.tol = tol
         self.max_iter = max_iter
+        self.solver = solver
         self.entries = np.zeros((self.nx, self.ny), dtype=np.float64)
-        self.trans = np.zeros((self.N, self.N), dtype=np.float64)
+        if solver == "dense":
+            self.trans = np.zeros((self.N, self.N), dtype=np.float64)
+        else:
+            from scipy import sparse
+            self.trans = sparse.csr_matrix((self.N, self.N), dtype=np.float64)
+        self._pending = []
         self.shots = np.zeros((self.nx, self.ny), dtype=np.float64)
         self.shot_xg = np.zeros((self.nx, self.ny), dtype=np.float64)
         self.V = np.zeros((self.nx, self.ny), dtype=np.float64)
+        # filled by fit(): iterations run, last max |V_new - V|, whether that fell below tol, and the
+        # max |V_new - V| of every iteration (empty for the direct solver)
+        self.n_iter = 0
+        self.delta = float("inf")
+        self.converged = False
+        self.trace: List[float] = []
+
+    @property
+    def sparse(self) -> bool:
+        return self.solver != "dense"
 
     def add_entry(self, x: float, y: float):
         gx, gy = pitch_to_grid(x, y, self.nx, self.ny)
@@ -26,14 +81,58 @@ class XTModel:
         g1 = pitch_to_grid(x1, y1, self.nx, self.ny)
         i = cell_id(*g0, self.nx)
         j = cell_id(*g1, self.nx)
-        self.trans[i, j] += 1
+        if self.sparse:
+            self._pending.append(i * self.N + j)
+        else:
+            self.trans[i, j] += 1
+
+    def _add_transitions(self, flat: np.ndarray, cnt: np.ndarray = None):
+        if cnt is None:
+            flat, cnt = np.unique(flat, return_counts=True)
+        if self.sparse:
+            from scipy import sparse
+            self.trans = self.trans + sparse.csr_matrix(
+                (cnt.astype(np.float64), (flat // self.N, flat % self.N)), shape=(self.N, self.N))
+        else:
+            self.trans.reshape(-1)[flat] += cnt
+
+    def transitions(self):
+        '''Transition count matrix (dense ndarray or CSR, by solver), including pending scalar adds.'''
+        if self._pending:
+            pending, self._pending = self._pending, []
+            self._add_transitions(np.asarray(pending, dtype=np.int64))
+        return self.trans
 
     def add_shot(self, x: float, y: float, xg: float):
         gx, gy = pitch_to_grid(x, y, self.nx, self.ny)
         self.shots[gx, gy] += 1
         self.shot_xg[gx, gy] += xg
 
-    def fit(self):
+    def add_batch(self, x0, y0, x1, y1, kind, xg):
+        '''
+        Vectorized add_entry/add_transition/add_shot over arrays of events with a start location.
+          kind: KIND_ENTRY (entry only), KIND_MOVE (entry + transition to (x1, y1)), KIND_SHOT (entry + shot with xg)
+        Counts accumulate in row order, so the result equals calling the scalar methods one event at a time.
+        '''
+        self.add_counts(batch_counts(x0, y0, x1, y1, kind, xg, self.nx, self.ny))
+
+    def add_counts(self, counts: Dict[str, np.ndarray]):
+        '''Add partial counts from batch_counts (e.g. one match, possibly computed in another process).'''
+        self.entries += counts["entries"]
+        if len(counts["trans_flat"]):
+            self._add_transitions(counts["trans_flat"], counts["trans_count"])
+        gxs, gys = counts["shot_gx"], counts["shot_gy"]
+        if len(gxs):
+            # shot xG is summed shot by shot so the float result does not depend on how rows were batched
+            np.add.at(self.shots, (gxs, gys), 1)
+            np.add.at(self.shot_xg, (gxs, gys), counts["shot_xg"])
+
+    def fit(self, V0: np.ndarray = None):
+        '''
+        Value iteration from V0 (default zeros). Warm-starting from a previous converged V reaches the
+        same fixed point in fewer iterations; a V that stopped at max_iter without converging depends on
+        the starting point, so only warm-start from a converged fit.
+        '''
         entries = self.entries.copy()
         entries[entries == 0] = 1.0
 
@@ -42,22 +141,64 @@ class XTModel:
         nonzero = self.shots > 0
         avg_xg[nonzero] = (self.shot_xg[nonzero] / self.shots[nonzero])
 
+        if self.sparse:
+            start = None if V0 is None else np.asarray(V0, dtype=np.float64).reshape(-1)
+            V = self._fit_sparse((P_shot * avg_xg).reshape(-1), start).reshape(self.nx, self.ny)
+            self.V = V
+            return V
+
         row_sum = self.trans.sum(axis=1, keepdims=True)
         row_sum[row_sum == 0] = 1.0
         P_move = (self.trans / row_sum).reshape(self.nx, self.ny, self.nx, self.ny)
 
-        V = np.zeros_like(self.V)
+        V = np.zeros_like(self.V) if V0 is None else np.array(V0, dtype=np.float64)
+        self.n_iter, self.delta, self.converged, self.trace = 0, float("inf"), False, []
         for it in range(self.max_iter):
             V_new = P_shot * avg_xg
             mv = np.einsum("ijxy,xy->ij", P_move, V)
             V_new += self.gamma * mv
             delta = np.max(np.abs(V_new - V))
             V = V_new
+            self.n_iter, self.delta = it + 1, float(delta)
+            self.trace.append(self.delta)
             if delta < self.tol:
+                self.converged = True
                 break
         self.V = V
         return V
 
+    def _fit_sparse(self, reward: np.ndarray, V0: np.ndarray = None) -> np.ndarray:
+        '''
+        Same model as the dense fit on flattened cells (the row/column order of trans, matching the
+        dense reshape): V = r + gamma P V with P the row-normalised transition counts.
+        '''
+        from scipy import sparse
+        from scipy.sparse.linalg import spsolve
+        trans = self.transitions().tocsr()
+        row_sum = np.asarray(trans.sum(axis=1)).ravel()
+        row_sum[row_sum == 0] = 1.0
+        P = sparse.diags(1.0 / row_sum) @ trans
+
+        if self.solver == "direct":
+            if self.gamma >= 1.0:
+                raise ValueError("solver='direct' needs gamma < 1; use 'sparse' value iteration for gamma = 1")
+            A = (sparse.identity(self.N, format="csc") - self.gamma * P).tocsc()
+            self.n_iter, self.delta, self.converged, self.trace = 0, 0.0, True, []
+            return spsolve(A, reward)
+
+        V = np.zeros(self.N, dtype=np.float64) if V0 is None else V0.copy()
+        self.n_iter, self.delta, self.converged, self.trace = 0, float("inf"), False, []
+        for it in range(self.max_iter):
+            V_new = reward + self.gamma * (P @ V)
+            delta = np.max(np.abs(V_new - V))
+            V = V_new
+            self.n_iter, self.delta = it + 1, float(delta)
+            self.trace.append(self.delta)
+            if delta < self.tol:
+                self.converged = True
+                break
+        return V
+
     def value_of(self, x, y):
         gx, gy = pitch_to_grid(x, y, self.nx, self.ny)
         return self.V[gx, gy]